@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-19 13:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('appointment', 'Appointment'), ('slot', 'Appointment Slot'), ('selftest', 'Self Test')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('doctor_id', models.BigIntegerField(blank=True, null=True)),
+                ('patient_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Change',
+                'verbose_name_plural': 'Changes',
+                'indexes': [models.Index(fields=['doctor_id', 'id'], name='change_doctor_seq_idx'), models.Index(fields=['patient_id', 'id'], name='change_patient_seq_idx'), models.Index(fields=['kind', 'id'], name='change_kind_seq_idx'), models.Index(fields=['changed_at'], name='change_changed_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Change(models.Model):
+    """
+    One entry in the delta-sync change feed.
+
+    ``id`` is the monotonic change sequence clients keep as their
+    high-water mark. Owner ids are plain columns, not foreign keys, so
+    tombstones outlive the rows they describe.
+    """
+    KIND_CHOICES = [
+        ('appointment', 'Appointment'),
+        ('slot', 'Appointment Slot'),
+        ('selftest', 'Self Test'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    doctor_id = models.BigIntegerField(null=True, blank=True)
+    patient_id = models.BigIntegerField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"#{self.id} {self.kind} {self.object_id} {action}"
+
+    class Meta:
+        verbose_name = "Change"
+        verbose_name_plural = "Changes"
+        indexes = [
+            # Each client reads its own slice of the feed from a sequence number
+            models.Index(fields=['doctor_id', 'id'], name='change_doctor_seq_idx'),
+            models.Index(fields=['patient_id', 'id'], name='change_patient_seq_idx'),
+            models.Index(fields=['kind', 'id'], name='change_kind_seq_idx'),
+            models.Index(fields=['changed_at'], name='change_changed_at_idx'),
+        ]
@@ -0,0 +1,57 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from healthcare.keyset import InvalidCursor, keyset_page
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the view's ``ordering`` columns.
+
+    Unlike DRF's CursorPagination, the cursor holds every ordering column,
+    so ties on the first one are resolved by the index, not by an OFFSET.
+    """
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = keyset_page(
+                queryset,
+                view.ordering,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+            )
+        except InvalidCursor as e:
+            raise NotFound(str(e))
+        return self.page.items
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.page.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
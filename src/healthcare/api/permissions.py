@@ -0,0 +1,33 @@
+from rest_framework.permissions import BasePermission
+
+from healthcare.tokens import ClaimsUser
+
+
+def api_role(request):
+    """``(role, profile_id, approved)`` for a JWT or session-authenticated request"""
+    user = request.user
+    if isinstance(user, ClaimsUser):
+        # Straight from the token's claims, without a query
+        return user.role, user.profile_id, user.approval_status == 'approved'
+    role_profile = request.role_profile
+    profile = role_profile.profile
+    if profile is None:
+        return None, None, False
+    return role_profile.role, profile.pk, getattr(profile, 'approval_status', None) == 'approved'
+
+
+class IsPatient(BasePermission):
+    message = 'Only patients can access this endpoint.'
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and api_role(request)[0] == 'patient'
+
+
+class IsPatientOrApprovedDoctor(BasePermission):
+    message = 'Only patients and approved doctors can access this endpoint.'
+
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            return False
+        role, _, approved = api_role(request)
+        return role == 'patient' or (role == 'doctor' and approved)
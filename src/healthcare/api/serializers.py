@@ -0,0 +1,93 @@
+from rest_framework import serializers
+
+from appointment.models import Appointment, AppointmentSlot
+from doctor.models import Doctor
+from selftest.models import SelfTest, SymptomReport
+
+
+class SparseFieldsetSerializer(serializers.ModelSerializer):
+    """Return only the fields named in ``?fields=a,b`` (all fields by default)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+
+def requested_fields(request):
+    """The ``?fields=`` set, or None when every field was asked for"""
+    if request is None or not request.query_params.get('fields'):
+        return None
+    return {name.strip() for name in request.query_params['fields'].split(',') if name.strip()}
+
+
+class DoctorSerializer(SparseFieldsetSerializer):
+    name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Doctor
+        fields = ['id', 'name', 'specialization', 'experience_years']
+
+    def get_name(self, doctor):
+        return f'Dr. {doctor.user.get_full_name()}'
+
+
+class AppointmentSlotSerializer(SparseFieldsetSerializer):
+    doctor_name = serializers.SerializerMethodField()
+    start_time = serializers.TimeField(read_only=True)
+    end_time = serializers.TimeField(read_only=True)
+
+    class Meta:
+        model = AppointmentSlot
+        fields = [
+            'id', 'doctor', 'doctor_name', 'date', 'slot_type', 'start_time', 'end_time', 'is_available',
+            'updated_at',
+        ]
+
+    def get_doctor_name(self, slot):
+        return f'Dr. {slot.doctor.user.get_full_name()}'
+
+
+class AppointmentSerializer(SparseFieldsetSerializer):
+    doctor_name = serializers.SerializerMethodField()
+    patient_name = serializers.SerializerMethodField()
+    specialization = serializers.CharField(source='doctor.specialization', read_only=True)
+
+    class Meta:
+        model = Appointment
+        fields = [
+            'id', 'doctor', 'doctor_name', 'specialization', 'patient', 'patient_name',
+            'appointment_slot', 'appointment_date', 'duration_minutes', 'status', 'reason',
+            'notes', 'created_at', 'updated_at',
+        ]
+
+    def get_doctor_name(self, appointment):
+        return f'Dr. {appointment.doctor.user.get_full_name()}'
+
+    def get_patient_name(self, appointment):
+        return appointment.patient.user.get_full_name() if appointment.patient else None
+
+
+class SymptomReportSerializer(serializers.ModelSerializer):
+    symptom = serializers.CharField(source='symptom.name')
+
+    class Meta:
+        model = SymptomReport
+        fields = ['symptom', 'severity', 'duration_days', 'notes']
+
+
+class SelfTestSerializer(SparseFieldsetSerializer):
+    symptoms = SymptomReportSerializer(source='symptom_reports', many=True, read_only=True)
+
+    class Meta:
+        model = SelfTest
+        fields = [
+            'id', 'risk_level', 'predicted_diseases', 'ai_recommendation', 'additional_notes',
+            'symptoms', 'created_at', 'updated_at',
+        ]
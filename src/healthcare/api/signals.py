@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appointment.models import Appointment, AppointmentSlot
+from selftest.models import SelfTest
+from .models import Change
+
+
+# Changes are logged right after the write on the same connection, so inside
+# atomic() they commit or roll back with it. Views run in autocommit, where
+# the change commits just after the write and a failure in between can lose
+# it; wrap writes in atomic() where the feed must not miss them.
+
+
+def record_change(kind, object_id, doctor_id=None, patient_id=None, deleted=False):
+    Change.objects.create(
+        kind=kind, object_id=object_id, doctor_id=doctor_id, patient_id=patient_id, deleted=deleted,
+    )
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def appointment_changed(sender, instance, signal, **kwargs):
+    record_change('appointment', instance.id, instance.doctor_id, instance.patient_id, signal is post_delete)
+    if not instance.appointment_slot_id:
+        return
+    # Booking claims the slot, and deleting the appointment reopens it, with
+    # queryset.update(), which sends no signal. Skip a slot that a cascade
+    # has already removed, so its tombstone stays the latest change.
+    if signal is post_save or AppointmentSlot.objects.filter(id=instance.appointment_slot_id).exists():
+        record_change('slot', instance.appointment_slot_id, instance.doctor_id)
+
+
+@receiver([post_save, post_delete], sender=AppointmentSlot)
+def slot_changed(sender, instance, signal, **kwargs):
+    record_change('slot', instance.id, instance.doctor_id, deleted=signal is post_delete)
+
+
+@receiver([post_save, post_delete], sender=SelfTest)
+def selftest_changed(sender, instance, signal, **kwargs):
+    record_change('selftest', instance.id, patient_id=instance.patient_id, deleted=signal is post_delete)
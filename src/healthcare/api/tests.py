@@ -0,0 +1,361 @@
+from datetime import timedelta
+from io import StringIO
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from appointment.models import Appointment, AppointmentSlot
+from appointment.services import BookingResult, book_slot
+from healthcare.keyset import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from healthcare.testing import create_doctor, create_patient
+from healthcare.tokens import issue_tokens, revocation_filter
+from selftest.models import SelfTest, Symptom, SymptomReport
+from .models import Change
+
+
+def api_url(name):
+    return reverse(f'api:{name}', kwargs={'version': 'v1'})
+
+
+class KeysetPageTestCase(TestCase):
+    """Keyset pages cover every row once, including rows that tie on the first column"""
+
+    def setUp(self):
+        self.patient = create_patient('keyset_patient')
+        for _ in range(7):
+            SelfTest.objects.create(patient=self.patient, risk_level='low')
+        # Same timestamp for all but one row, so only ``id`` breaks the tie
+        SelfTest.objects.exclude(pk=SelfTest.objects.order_by('id').last().pk).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+
+    def test_pages_cover_all_rows_in_order(self):
+        ordering = ('-created_at', '-id')
+        expected = list(SelfTest.objects.order_by(*ordering).values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(SelfTest.objects.all(), ordering, cursor, page_size=3)
+            seen.extend(test.id for test in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        self.assertEqual(seen, expected)
+
+    def test_cursor_keeps_microseconds(self):
+        created_at = timezone.now().replace(microsecond=123456)
+        values = decode_cursor(encode_cursor([created_at, 5]), SelfTest, ('-created_at', '-id'))
+
+        self.assertEqual(values, [created_at, 5])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not-a-cursor', SelfTest, ('-created_at', '-id'))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor([1]), SelfTest, ('-created_at', '-id'))
+
+
+class APITestCase(TestCase):
+    """Versioned read-only API with JWT or session authentication"""
+
+    def setUp(self):
+        cache.clear()
+        revocation_filter.reset()
+        revocation_filter.sync(force=True)
+        self.doctor = create_doctor('api_doctor')
+        self.other_doctor = create_doctor('api_other_doctor')
+        self.pending_doctor = create_doctor('api_pending_doctor', approval_status='pending')
+        self.patient = create_patient('api_patient')
+        self.other_patient = create_patient('api_other_patient')
+        today = timezone.localdate()
+
+        self.slots = []
+        for day in range(1, 4):
+            for slot_type in ('morning_1', 'afternoon_1'):
+                self.slots.append(AppointmentSlot.objects.create(
+                    doctor=self.doctor, date=today + timedelta(days=day), slot_type=slot_type,
+                ))
+        AppointmentSlot.objects.create(doctor=self.pending_doctor, date=today + timedelta(days=1), slot_type='morning_1')
+        AppointmentSlot.objects.create(doctor=self.doctor, date=today - timedelta(days=1), slot_type='morning_1')
+
+        for i, slot in enumerate(self.slots[:3]):
+            patient = self.patient if i < 2 else self.other_patient
+            Appointment.objects.create(
+                patient=patient, doctor=self.doctor, appointment_slot=slot,
+                appointment_date=timezone.make_aware(timezone.datetime.combine(slot.date, slot.start_time)),
+            )
+            slot.is_available = False
+            slot.save()
+
+    def client_for(self, user, role_profile=None):
+        client = APIClient()
+        access_token = issue_tokens(user, role_profile).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        return client
+
+    def test_requires_authentication(self):
+        response = APIClient().get(api_url('appointment_list'))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_unknown_version(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get('/api/v2/appointments/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_patient_appointments(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get(api_url('appointment_list'))
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual({a['patient'] for a in results}, {self.patient.id})
+        # Newest first
+        self.assertGreater(results[0]['appointment_date'], results[1]['appointment_date'])
+
+    def test_doctor_appointments(self):
+        client = self.client_for(self.doctor.user)
+
+        response = client.get(api_url('appointment_list'))
+
+        self.assertEqual(len(response.json()['results']), 3)
+
+    def test_unapproved_doctor_forbidden(self):
+        client = self.client_for(self.pending_doctor.user)
+
+        response = client.get(api_url('appointment_list'))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_appointment_queries_constant(self):
+        client = self.client_for(self.doctor.user)
+
+        # One query for the page; users come from the same join
+        with self.assertNumQueries(1):
+            response = client.get(api_url('appointment_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sparse_fieldsets(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get(api_url('appointment_list'), {'fields': 'id,status'})
+
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'status'})
+
+    def test_sparse_fieldsets_skip_joins(self):
+        client = self.client_for(self.patient.user)
+
+        with self.assertNumQueries(1) as context:
+            client.get(api_url('appointment_list'), {'fields': 'id,status'})
+
+        self.assertNotIn('auth_user', context.captured_queries[0]['sql'])
+
+    def test_unknown_field(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get(api_url('appointment_list'), {'fields': 'id,password'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_slots_follow_cursor(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get(api_url('slot_list'), {'page_size': 2})
+        body = response.json()
+        seen = [slot['id'] for slot in body['results']]
+        while body['next']:
+            body = client.get(body['next']).json()
+            seen.extend(slot['id'] for slot in body['results'])
+
+        # Open future slots of approved doctors, in (date, slot_type) order
+        expected = [slot.id for slot in sorted(self.slots[3:], key=lambda s: (s.date, s.slot_type, s.id))]
+        self.assertEqual(seen, expected)
+
+    def test_doctor_sees_own_slots(self):
+        client = self.client_for(self.doctor.user)
+
+        response = client.get(api_url('slot_list'), {'fields': 'id,is_available'})
+
+        results = response.json()['results']
+        expected = [slot.id for slot in sorted(self.slots, key=lambda s: (s.date, s.slot_type, s.id))]
+        self.assertEqual([slot['id'] for slot in results], expected)
+        self.assertEqual(sum(not slot['is_available'] for slot in results), 3)
+
+    def test_invalid_cursor(self):
+        client = self.client_for(self.patient.user)
+
+        response = client.get(api_url('slot_list'), {'cursor': 'garbage'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_doctor_list(self):
+        client = self.client_for(self.patient.user)
+
+        with self.assertNumQueries(1):
+            response = client.get(api_url('doctor_list'))
+
+        self.assertEqual(
+            [doctor['id'] for doctor in response.json()['results']],
+            [self.doctor.id, self.other_doctor.id],
+        )
+
+    def test_selftests(self):
+        symptom = Symptom.objects.create(name='Cough')
+        test = SelfTest.objects.create(patient=self.patient, risk_level='low')
+        SymptomReport.objects.create(self_test=test, symptom=symptom, severity=2, duration_days=3)
+        SelfTest.objects.create(patient=self.other_patient, risk_level='high')
+        client = self.client_for(self.patient.user)
+
+        # The page and one prefetch for the symptom reports with their symptoms
+        with self.assertNumQueries(2):
+            response = client.get(api_url('selftest_list'))
+
+        results = response.json()['results']
+        self.assertEqual([t['id'] for t in results], [test.id])
+        self.assertEqual(results[0]['symptoms'][0]['symptom'], 'Cough')
+
+    def test_selftests_patients_only(self):
+        client = self.client_for(self.doctor.user)
+
+        response = client.get(api_url('selftest_list'))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_session_authentication(self):
+        self.client.login(username='api_patient', password='testpass123')
+
+        response = self.client.get(api_url('appointment_list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTestCase(TestCase):
+    """The change feed returns only what changed since the client's high-water mark"""
+
+    def setUp(self):
+        cache.clear()
+        revocation_filter.reset()
+        revocation_filter.sync(force=True)
+        self.doctor = create_doctor('feed_doctor')
+        self.other_doctor = create_doctor('feed_other_doctor')
+        self.patient = create_patient('feed_patient')
+        self.slot = AppointmentSlot.objects.create(
+            doctor=self.doctor, date=timezone.localdate() + timedelta(days=1), slot_type='morning_1',
+        )
+        self.patient_client = self.client_for(self.patient.user)
+        self.doctor_client = self.client_for(self.doctor.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_tokens(user).access_token}')
+        return client
+
+    def poll(self, client, since, **params):
+        response = client.get(api_url('changes'), {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def mark(self, client):
+        return client.get(api_url('changes')).json()['next_since']
+
+    def test_booking_shows_up_once(self):
+        since = self.mark(self.patient_client)
+
+        result = book_slot(self.patient, self.slot.id, 'Checkup')
+        self.assertEqual(result.status, BookingResult.BOOKED)
+        body = self.poll(self.patient_client, since)
+
+        self.assertEqual([a['id'] for a in body['appointments']], [result.appointment.id])
+        self.assertEqual(body['slots'][0]['id'], self.slot.id)
+        self.assertFalse(body['slots'][0]['is_available'])
+        self.assertGreater(body['next_since'], since)
+        # Nothing new on the next poll
+        again = self.poll(self.patient_client, body['next_since'])
+        self.assertEqual((again['appointments'], again['slots']), ([], []))
+        self.assertEqual(again['next_since'], body['next_since'])
+
+    def test_deletions_are_tombstones(self):
+        appointment = book_slot(self.patient, self.slot.id, 'Checkup').appointment
+        slot_id = self.slot.id
+        since = self.mark(self.doctor_client)
+
+        self.slot.delete()
+        body = self.poll(self.doctor_client, since)
+
+        self.assertEqual(body['deleted']['appointments'], [appointment.id])
+        self.assertEqual(body['deleted']['slots'], [slot_id])
+        self.assertEqual((body['appointments'], body['slots']), ([], []))
+
+    def test_scoped_to_client(self):
+        since = self.mark(self.doctor_client)
+        AppointmentSlot.objects.create(
+            doctor=self.other_doctor, date=timezone.localdate() + timedelta(days=2), slot_type='morning_1',
+        )
+        other_patient = create_patient('feed_other_patient')
+        SelfTest.objects.create(patient=other_patient, risk_level='low')
+        own_test = SelfTest.objects.create(patient=self.patient, risk_level='low')
+
+        self.assertEqual(self.poll(self.doctor_client, since)['slots'], [])
+        body = self.poll(self.patient_client, since, doctor=self.doctor.id)
+        self.assertEqual([t['id'] for t in body['selftests']], [own_test.id])
+        self.assertEqual(body['slots'], [])
+
+    @mock.patch('api.views.ChangeFeed.limit', 2)
+    def test_has_more(self):
+        since = self.mark(self.doctor_client)
+        for day in range(2, 5):
+            AppointmentSlot.objects.create(
+                doctor=self.doctor, date=timezone.localdate() + timedelta(days=day), slot_type='morning_1',
+            )
+
+        first = self.poll(self.doctor_client, since)
+        second = self.poll(self.doctor_client, first['next_since'])
+
+        self.assertTrue(first['has_more'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(len(first['slots']) + len(second['slots']), 3)
+
+    def test_settle_window(self):
+        since = self.mark(self.doctor_client)
+        self.slot.save()
+
+        with self.settings(CHANGE_FEED_SETTLE_SECONDS=60):
+            body = self.poll(self.doctor_client, since)
+
+        self.assertEqual((body['slots'], body['next_since']), ([], since))
+
+    def test_mark_respects_settle_window(self):
+        Change.objects.update(changed_at=timezone.now() - timedelta(minutes=5))
+        since = self.mark(self.doctor_client)
+        self.slot.save()
+
+        with self.settings(CHANGE_FEED_SETTLE_SECONDS=60):
+            mark = self.mark(self.doctor_client)
+        body = self.poll(self.doctor_client, mark)
+
+        self.assertEqual(mark, since)
+        self.assertEqual([slot['id'] for slot in body['slots']], [self.slot.id])
+
+    def test_pruned_feed_is_gone(self):
+        since = self.mark(self.doctor_client)
+        for _ in range(2):
+            self.slot.save()
+        Change.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        self.slot.save()
+
+        call_command('prune_changes', stdout=StringIO())
+        response = self.doctor_client.get(api_url('changes'), {'since': since})
+
+        self.assertEqual(response.status_code, 410)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('doctors/', views.DoctorList.as_view(), name='doctor_list'),
+    path('slots/', views.AppointmentSlotList.as_view(), name='slot_list'),
+    path('appointments/', views.AppointmentList.as_view(), name='appointment_list'),
+    path('selftests/', views.SelfTestList.as_view(), name='selftest_list'),
+    path('changes/', views.ChangeFeed.as_view(), name='changes'),
+]
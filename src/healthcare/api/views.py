@@ -0,0 +1,233 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Prefetch, Q
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from appointment.models import Appointment, AppointmentSlot
+from doctor.models import Doctor
+from healthcare.routers import read_from_replica
+from selftest.models import SelfTest, SymptomReport
+from .models import Change
+from .pagination import KeysetPagination
+from .permissions import IsPatient, IsPatientOrApprovedDoctor, api_role
+from .serializers import (
+    AppointmentSerializer, AppointmentSlotSerializer, DoctorSerializer, SelfTestSerializer,
+    requested_fields,
+)
+
+
+# Read-only v1 API. Listings page with KeysetPagination over each view's
+# ``ordering``, whose columns are covered by an index, and only join the
+# relations the requested ``?fields=`` need.
+
+
+def wants(request, *names):
+    """Whether any of ``names`` is in the response (all fields by default)"""
+    requested = requested_fields(request)
+    return requested is None or bool(requested.intersection(names))
+
+
+def parse_date(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return timezone.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError({name: 'Use YYYY-MM-DD.'})
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class DoctorList(generics.ListAPIView):
+    """Approved doctors, optionally filtered by ``?specialization=``"""
+    serializer_class = DoctorSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated]
+    ordering = ('id',)
+
+    def get_queryset(self):
+        doctors = Doctor.objects.filter(approval_status='approved')
+        specialization = self.request.query_params.get('specialization')
+        if specialization:
+            doctors = doctors.filter(specialization=specialization)
+        if wants(self.request, 'name'):
+            doctors = doctors.select_related('user')
+        return doctors
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class AppointmentSlotList(generics.ListAPIView):
+    """
+    Slots from ``?date_from=`` (default today) to ``?date_to=``.
+
+    Doctors see all of their own slots; everyone else sees open slots of
+    approved doctors, optionally for one ``?doctor=``.
+    """
+    serializer_class = AppointmentSlotSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated]
+    ordering = ('date', 'slot_type', 'id')
+
+    def get_queryset(self):
+        role, profile_id, _ = api_role(self.request)
+        if role == 'doctor':
+            slots = AppointmentSlot.objects.filter(doctor_id=profile_id)
+        else:
+            slots = AppointmentSlot.objects.filter(is_available=True, doctor__approval_status='approved')
+            doctor_id = self.request.query_params.get('doctor')
+            if doctor_id:
+                if not doctor_id.isdigit():
+                    raise ValidationError({'doctor': 'Must be a doctor id.'})
+                slots = slots.filter(doctor_id=doctor_id)
+
+        slots = slots.filter(date__gte=parse_date(self.request, 'date_from') or timezone.localdate())
+        date_to = parse_date(self.request, 'date_to')
+        if date_to:
+            slots = slots.filter(date__lte=date_to)
+        if wants(self.request, 'doctor_name'):
+            slots = slots.select_related('doctor__user')
+        return slots
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class AppointmentList(generics.ListAPIView):
+    """The patient's or doctor's booked appointments, newest first, optionally by ``?status=``"""
+    serializer_class = AppointmentSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsPatientOrApprovedDoctor]
+    ordering = ('-appointment_date', '-id')
+
+    def get_queryset(self):
+        role, profile_id, _ = api_role(self.request)
+        if role == 'patient':
+            appointments = Appointment.objects.filter(patient_id=profile_id)
+        else:
+            appointments = Appointment.objects.filter(doctor_id=profile_id, patient__isnull=False)
+        status = self.request.query_params.get('status')
+        if status:
+            appointments = appointments.filter(status=status)
+
+        related = []
+        if wants(self.request, 'doctor_name', 'specialization'):
+            related.append('doctor__user')
+        if wants(self.request, 'patient_name'):
+            related.append('patient__user')
+        if related:
+            # Never select_related() with no arguments, which follows every foreign key
+            appointments = appointments.select_related(*related)
+        return appointments
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class SelfTestList(generics.ListAPIView):
+    """The patient's self-tests, newest first"""
+    serializer_class = SelfTestSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsPatient]
+    ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        _, profile_id, _ = api_role(self.request)
+        tests = SelfTest.objects.filter(patient_id=profile_id)
+        if wants(self.request, 'symptoms'):
+            tests = tests.prefetch_related(
+                Prefetch('symptom_reports', queryset=SymptomReport.objects.select_related('symptom'))
+            )
+        return tests
+
+
+# Change kind -> response key and serializer
+FEED_KINDS = {
+    'appointment': ('appointments', AppointmentSerializer),
+    'slot': ('slots', AppointmentSlotSerializer),
+    'selftest': ('selftests', SelfTestSerializer),
+}
+
+
+@method_decorator(read_from_replica, name='dispatch')
+class ChangeFeed(APIView):
+    """
+    Appointments, slots and self-tests changed after ``?since=``, the
+    ``next_since`` of the previous response, with the ids of deleted ones.
+
+    Without ``since`` only the current ``next_since`` is returned: take it
+    before the initial full download, then poll with it. A ``since`` older
+    than the retained feed gets 410 and the client must download again.
+    Patients also see slot changes, optionally for one ``?doctor=``.
+    """
+    permission_classes = [IsPatientOrApprovedDoctor]
+    limit = 500
+
+    def get(self, request, version=None):
+        since = request.query_params.get('since')
+        if since is None:
+            latest = self.settled(Change.objects.all()).aggregate(latest=Max('id'))['latest']
+            return Response({'next_since': latest or 0})
+        if not since.isdigit():
+            raise ValidationError({'since': 'Must be the next_since of a previous response.'})
+        since = int(since)
+        oldest = Change.objects.aggregate(oldest=Min('id'))['oldest']
+        if oldest is not None and since < oldest - 1:
+            return Response({'error': 'Changes since this point were pruned; download again.'}, status=status.HTTP_410_GONE)
+
+        role, profile_id, _ = api_role(request)
+        changes = self.settled(Change.objects.filter(self.get_scope(role, profile_id), id__gt=since))
+        rows = list(changes.order_by('id').values_list('id', 'kind', 'object_id', 'deleted')[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        # Only the latest change per object matters
+        latest = {(kind, object_id): deleted for _, kind, object_id, deleted in rows}
+        response = {
+            'since': since,
+            'next_since': rows[-1][0] if rows else since,
+            'has_more': has_more,
+            'deleted': {},
+        }
+        for kind, (key, serializer_class) in FEED_KINDS.items():
+            changed_ids = [object_id for (k, object_id), deleted in latest.items() if k == kind and not deleted]
+            objects = self.get_queryset(kind, role, profile_id).filter(id__in=changed_ids) if changed_ids else []
+            response[key] = serializer_class(objects, many=True).data
+            response['deleted'][key] = [object_id for (k, object_id), deleted in latest.items() if k == kind and deleted]
+        return Response(response)
+
+    def settled(self, changes):
+        settle = getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 1)
+        if settle:
+            # Leave out the newest changes until transactions that took an
+            # earlier sequence number have committed
+            changes = changes.filter(changed_at__lt=timezone.now() - timedelta(seconds=settle))
+        return changes
+
+    def get_scope(self, role, profile_id):
+        if role == 'doctor':
+            return Q(doctor_id=profile_id)
+        slots = Q(kind='slot')
+        doctor_id = self.request.query_params.get('doctor')
+        if doctor_id:
+            if not doctor_id.isdigit():
+                raise ValidationError({'doctor': 'Must be a doctor id.'})
+            slots &= Q(doctor_id=doctor_id)
+        return Q(patient_id=profile_id) | slots
+
+    def get_queryset(self, kind, role, profile_id):
+        if kind == 'appointment':
+            appointments = Appointment.objects.select_related('doctor__user', 'patient__user')
+            if role == 'doctor':
+                return appointments.filter(doctor_id=profile_id)
+            return appointments.filter(patient_id=profile_id)
+        if kind == 'slot':
+            slots = AppointmentSlot.objects.select_related('doctor__user')
+            if role == 'doctor':
+                return slots.filter(doctor_id=profile_id)
+            return slots.filter(doctor__approval_status='approved')
+        return SelfTest.objects.filter(patient_id=profile_id).prefetch_related(
+            Prefetch('symptom_reports', queryset=SymptomReport.objects.select_related('symptom'))
+        )
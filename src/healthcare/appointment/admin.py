@@ -8,6 +8,7 @@ class AppointmentSlotAdmin(admin.ModelAdmin):
     search_fields = ['doctor__user__first_name', 'doctor__user__last_name']
     readonly_fields = ['created_at']
     date_hierarchy = 'date'
+    list_select_related = ['doctor__user', 'appointment']
     
     def has_appointment(self, obj):
         return hasattr(obj, 'appointment') and obj.appointment is not None
@@ -22,3 +23,4 @@ class AppointmentAdmin(admin.ModelAdmin):
                     'doctor__user__first_name', 'doctor__user__last_name', 'reason']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'appointment_date'
+    list_select_related = ['patient__user', 'doctor__user', 'appointment_slot__doctor__user']
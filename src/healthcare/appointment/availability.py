@@ -0,0 +1,75 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from healthcare.caching import aget_or_build, get_or_build
+from healthcare.routers import primary_reads
+
+# Per-doctor availability versions are bumped by appointment.signals whenever
+# a slot, appointment, doctor or doctor's user changes, or a booked patient's
+# name or email (shown on the doctor calendar). Versions start from a
+# microsecond timestamp so an evicted key can't come back with an old value.
+# Responses are validated by ETag only: HTTP dates have one-second
+# resolution, so two changes within a second would share a Last-Modified.
+VERSION_KEY = 'availability:version:{}'
+PAYLOAD_KEY = 'availability:payload:{}:{}:{}:{}'
+ALL_DOCTORS = 'all'
+PAYLOAD_TIMEOUT = 60 * 60
+
+
+def get_availability_version(doctor_id=ALL_DOCTORS) -> int:
+    """Return the current availability version for a doctor (or all doctors)"""
+    key = VERSION_KEY.format(doctor_id)
+    version = cache.get(key)
+    if version is None:
+        version = _now_us()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_availability_version(doctor_id) -> None:
+    """Invalidate cached availability for a doctor and the all-doctors view"""
+    bump_availability_versions([doctor_id])
+
+
+def bump_availability_versions(doctor_ids) -> None:
+    """bump_availability_version for many doctors in one cache round trip"""
+    keys = [VERSION_KEY.format(doctor_id) for doctor_id in doctor_ids] + [VERSION_KEY.format(ALL_DOCTORS)]
+    current = cache.get_many(keys)
+    now = _now_us()
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, timeout=None)
+
+
+def availability_etag(kind, doctor_id, day) -> str:
+    version = get_availability_version(doctor_id or ALL_DOCTORS)
+    return f'{kind}-{doctor_id or ALL_DOCTORS}-{day}-{version}'
+
+
+def get_cached_payload(kind, doctor_id, day, builder):
+    """
+    Return the payload for (kind, doctor, day), building it on a miss.
+
+    Keys embed the availability version, so a bump makes old payloads
+    unreachable and they simply expire. Concurrent misses on a hot key
+    build it once (healthcare.caching.get_or_build).
+    """
+    doctor_id = doctor_id or ALL_DOCTORS
+    key = PAYLOAD_KEY.format(kind, doctor_id, day, get_availability_version(doctor_id))
+    # Built from the primary so a lagging replica can't be cached under the new version
+    with primary_reads():
+        return get_or_build(key, builder, PAYLOAD_TIMEOUT)
+
+
+async def aget_cached_payload(kind, doctor_id, day, builder):
+    """Async get_cached_payload; ``builder`` is a coroutine function"""
+    doctor_id = doctor_id or ALL_DOCTORS
+    version = await sync_to_async(get_availability_version)(doctor_id)
+    key = PAYLOAD_KEY.format(kind, doctor_id, day, version)
+    with primary_reads():
+        return await aget_or_build(key, builder, PAYLOAD_TIMEOUT)
+
+
+def _now_us() -> int:
+    return time.time_ns() // 1000
@@ -1,173 +1,314 @@
 import json
 import os
-from typing import List, Dict, Tuple
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterator, List, Dict, Mapping, Tuple
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from doctor.models import Doctor
-from django.db.models import Q
+from doctor.directory import get_directory
+from healthcare.async_views import run_cpu_bound
+from healthcare.caching import get_or_build, make_key
+from selftest.ai_engine import get_ai_engine
+from .conversation import MAX_CANDIDATES, Conversation, apply_filters, parse_refinement, strip_refinement
+from .matcher import PhraseMatch, PhraseMatcher
+from .semantic import SPECIALIST_SPECIALIZATIONS, get_semantic_matcher
+
+
+KNOWLEDGE_FILE = os.path.join(settings.BASE_DIR, 'appointment', 'data', 'chatbot_knowledge.json')
+# Semantic ranking results, keyed by the knowledge file's mtime
+SEMANTIC_RANK_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class ChatbotKnowledge:
+    """Immutable, pre-indexed chatbot knowledge shared by all requests"""
+    disease_specialization_map: Mapping[str, Tuple[str, ...]]
+    specialization_keywords: Mapping[str, Tuple[str, ...]]
+    keyword_specializations: Mapping[str, Tuple[str, ...]]
+    specialization_diseases: Mapping[str, Tuple[str, ...]]
+    specialization_info: Mapping[str, Mapping]
+    quick_suggestions: Tuple[str, ...]
+    matcher: PhraseMatcher
+    mtime: float
+
+
+_knowledge = None
+_knowledge_lock = threading.Lock()
+
+
+def get_knowledge() -> ChatbotKnowledge:
+    """
+    Return the shared knowledge tables, reloading them if the data file changed.
+
+    Only a stat() call is paid per request; the file is parsed and the
+    matcher compiled once per modification.
+    """
+    try:
+        mtime = os.stat(KNOWLEDGE_FILE).st_mtime
+    except OSError:
+        mtime = None
+    
+    knowledge = _knowledge
+    if knowledge is None or (mtime is not None and mtime != knowledge.mtime):
+        knowledge = reload_knowledge()
+    return knowledge
+
+
+def reload_knowledge() -> ChatbotKnowledge:
+    """Rebuild the knowledge tables from the data file"""
+    global _knowledge
+    with _knowledge_lock:
+        _knowledge = _build_knowledge(KNOWLEDGE_FILE)
+        return _knowledge
+
+
+def _build_knowledge(file_path: str) -> ChatbotKnowledge:
+    try:
+        mtime = os.stat(file_path).st_mtime
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        mtime, data = None, {}
+    
+    diseases = {
+        disease: tuple(specs)
+        for disease, specs in data.get('disease_specializations', {}).items()
+    }
+    keywords = {
+        spec: tuple(spec_keywords)
+        for spec, spec_keywords in data.get('specialization_keywords', {}).items()
+    }
+    
+    keyword_specializations = {}
+    for spec, spec_keywords in keywords.items():
+        for keyword in spec_keywords:
+            keyword_specializations.setdefault(keyword, []).append(spec)
+    
+    specialization_diseases = {}
+    for disease, specs in diseases.items():
+        for spec in specs:
+            specialization_diseases.setdefault(spec, []).append(disease)
+    
+    return ChatbotKnowledge(
+        disease_specialization_map=MappingProxyType(diseases),
+        specialization_keywords=MappingProxyType(keywords),
+        keyword_specializations=MappingProxyType(
+            {k: tuple(v) for k, v in keyword_specializations.items()}
+        ),
+        specialization_diseases=MappingProxyType(
+            {k: tuple(v) for k, v in specialization_diseases.items()}
+        ),
+        specialization_info=MappingProxyType({
+            spec: MappingProxyType({
+                key: tuple(value) if isinstance(value, list) else value
+                for key, value in info.items()
+            })
+            for spec, info in data.get('specialization_info', {}).items()
+        }),
+        quick_suggestions=tuple(data.get('quick_suggestions', [])),
+        matcher=PhraseMatcher(list(diseases) + list(keyword_specializations)),
+        mtime=mtime,
+    )
 
 
 class AppointmentChatbot:
     """AI Chatbot for appointment recommendations based on diseases and criteria"""
     
     def __init__(self):
-        self.disease_specialization_map = self._load_disease_specialization_mapping()
-        self.specialization_keywords = self._load_specialization_keywords()
+        knowledge = get_knowledge()
+        self.knowledge = knowledge
+        self.disease_specialization_map = knowledge.disease_specialization_map
+        self.specialization_keywords = knowledge.specialization_keywords
+        self.keyword_specializations = knowledge.keyword_specializations
+        self.specialization_diseases = knowledge.specialization_diseases
+        self.matcher = knowledge.matcher
     
-    def _load_disease_specialization_mapping(self) -> Dict:
-        """Load disease to specialization mapping"""
-        return {
-            # Cardiovascular diseases
-            "heart disease": ["Cardiology", "Internal Medicine"],
-            "chest pain": ["Cardiology", "Emergency Medicine", "Internal Medicine"],
-            "high blood pressure": ["Cardiology", "Internal Medicine", "Family Medicine"],
-            "heart attack": ["Cardiology", "Emergency Medicine"],
-            "arrhythmia": ["Cardiology"],
-            "heart failure": ["Cardiology", "Internal Medicine"],
-            
-            # Respiratory diseases
-            "asthma": ["Pulmonology", "Internal Medicine", "Family Medicine"],
-            "pneumonia": ["Pulmonology", "Internal Medicine", "Emergency Medicine"],
-            "bronchitis": ["Pulmonology", "Internal Medicine", "Family Medicine"],
-            "cough": ["Pulmonology", "Internal Medicine", "Family Medicine"],
-            "shortness of breath": ["Pulmonology", "Cardiology", "Internal Medicine"],
-            "lung disease": ["Pulmonology"],
-            
-            # Gastrointestinal diseases
-            "stomach pain": ["Gastroenterology", "Internal Medicine", "Family Medicine"],
-            "nausea": ["Gastroenterology", "Internal Medicine", "Family Medicine"],
-            "diarrhea": ["Gastroenterology", "Internal Medicine", "Family Medicine"],
-            "constipation": ["Gastroenterology", "Internal Medicine", "Family Medicine"],
-            "acid reflux": ["Gastroenterology", "Internal Medicine"],
-            "ulcer": ["Gastroenterology", "Internal Medicine"],
-            
-            # Neurological diseases
-            "headache": ["Neurology", "Internal Medicine", "Family Medicine"],
-            "migraine": ["Neurology", "Internal Medicine"],
-            "seizure": ["Neurology", "Emergency Medicine"],
-            "stroke": ["Neurology", "Emergency Medicine"],
-            "memory loss": ["Neurology", "Geriatrics"],
-            "dizziness": ["Neurology", "Internal Medicine", "ENT"],
-            
-            # Orthopedic conditions
-            "back pain": ["Orthopedics", "Physical Medicine", "Family Medicine"],
-            "joint pain": ["Orthopedics", "Rheumatology", "Internal Medicine"],
-            "fracture": ["Orthopedics", "Emergency Medicine"],
-            "arthritis": ["Rheumatology", "Orthopedics", "Internal Medicine"],
-            "muscle pain": ["Orthopedics", "Physical Medicine", "Family Medicine"],
-            
-            # Dermatological conditions
-            "skin rash": ["Dermatology", "Family Medicine", "Internal Medicine"],
-            "acne": ["Dermatology", "Family Medicine"],
-            "eczema": ["Dermatology", "Allergy and Immunology"],
-            "psoriasis": ["Dermatology"],
-            "skin cancer": ["Dermatology", "Oncology"],
-            
-            # Endocrine disorders
-            "diabetes": ["Endocrinology", "Internal Medicine", "Family Medicine"],
-            "thyroid": ["Endocrinology", "Internal Medicine"],
-            "weight loss": ["Endocrinology", "Internal Medicine", "Family Medicine"],
-            "weight gain": ["Endocrinology", "Internal Medicine", "Family Medicine"],
-            
-            # Mental health
-            "depression": ["Psychiatry", "Psychology", "Family Medicine"],
-            "anxiety": ["Psychiatry", "Psychology", "Family Medicine"],
-            "stress": ["Psychiatry", "Psychology", "Family Medicine"],
-            "insomnia": ["Psychiatry", "Sleep Medicine", "Internal Medicine"],
-            
-            # Women's health
-            "pregnancy": ["Obstetrics and Gynecology", "Family Medicine"],
-            "menstrual": ["Obstetrics and Gynecology", "Family Medicine"],
-            "pelvic pain": ["Obstetrics and Gynecology", "Internal Medicine"],
-            
-            # General symptoms
-            "fever": ["Internal Medicine", "Family Medicine", "Emergency Medicine"],
-            "fatigue": ["Internal Medicine", "Family Medicine"],
-            "weight loss": ["Internal Medicine", "Oncology", "Endocrinology"],
-            "pain": ["Internal Medicine", "Family Medicine", "Pain Management"],
-            "infection": ["Internal Medicine", "Family Medicine", "Infectious Disease"],
-            
-            # Emergency conditions
-            "emergency": ["Emergency Medicine"],
-            "trauma": ["Emergency Medicine", "Surgery"],
-            "accident": ["Emergency Medicine", "Surgery", "Orthopedics"],
-        }
-    
-    def _load_specialization_keywords(self) -> Dict:
-        """Load keywords for each specialization"""
-        return {
-            "Cardiology": ["heart", "cardiac", "cardiovascular", "chest pain", "blood pressure", "arrhythmia"],
-            "Pulmonology": ["lung", "respiratory", "breathing", "cough", "asthma", "pneumonia"],
-            "Gastroenterology": ["stomach", "digestive", "intestinal", "bowel", "liver", "gallbladder"],
-            "Neurology": ["brain", "neurological", "headache", "seizure", "stroke", "memory"],
-            "Orthopedics": ["bone", "joint", "muscle", "fracture", "spine", "back pain"],
-            "Dermatology": ["skin", "rash", "acne", "eczema", "mole", "dermatitis"],
-            "Endocrinology": ["diabetes", "thyroid", "hormone", "metabolism", "weight"],
-            "Psychiatry": ["mental", "depression", "anxiety", "stress", "mood", "psychiatric"],
-            "Obstetrics and Gynecology": ["women", "pregnancy", "gynecological", "menstrual", "reproductive"],
-            "Emergency Medicine": ["emergency", "urgent", "trauma", "accident", "critical"],
-            "Internal Medicine": ["general", "internal", "primary care", "chronic", "medical"],
-            "Family Medicine": ["family", "primary", "general practice", "preventive"],
-            "Pediatrics": ["children", "pediatric", "infant", "child", "adolescent"],
-            "Surgery": ["surgical", "operation", "procedure", "tumor", "mass"],
-            "Oncology": ["cancer", "tumor", "oncology", "chemotherapy", "radiation"],
-            "Rheumatology": ["arthritis", "autoimmune", "joint inflammation", "lupus"],
-            "Urology": ["kidney", "bladder", "urinary", "prostate", "urological"],
-            "ENT": ["ear", "nose", "throat", "sinus", "hearing", "voice"],
-            "Ophthalmology": ["eye", "vision", "sight", "retina", "glaucoma"],
-            "Anesthesiology": ["anesthesia", "pain management", "surgical anesthesia"],
-        }
-    
-    def analyze_user_input(self, user_message: str, criteria: Dict = None) -> Dict:
+    def analyze_user_input(self, user_message: str, criteria: Dict = None, use_ml: bool = False,
+                           conversation: Conversation = None) -> Dict:
         """
         Analyze user input and recommend doctors
         
         Args:
             user_message: User's description of disease/symptoms
             criteria: Additional criteria like location, experience, etc.
+            use_ml: Also rank specializations with the self-test ML models
+            conversation: Session state; follow-ups such as "10+ years" or
+                "morning slots" filter its candidates instead of re-analyzing
         
         Returns:
             Dict with recommended doctors and analysis
         """
-        user_message_lower = user_message.lower()
+        refined = self._refine(conversation, user_message, criteria or {})
+        if refined:
+            return refined
         
-        # Find matching specializations
-        recommended_specializations = self._find_specializations(user_message_lower)
+        analysis = self._analyze(user_message, use_ml)
         
         # Get available doctors
-        recommended_doctors = self._get_recommended_doctors(
-            recommended_specializations, 
-            criteria or {}
-        )
+        recommended_doctors = self._recommend(analysis, criteria or {}, conversation)
         
         # Generate response message
         response_message = self._generate_response_message(
             user_message, 
-            recommended_specializations, 
+            analysis['specializations'], 
             recommended_doctors
         )
         
         return {
             'message': response_message,
             'recommended_doctors': recommended_doctors,
+            **analysis
+        }
+    
+    async def aanalyze_user_input(self, user_message: str, criteria: Dict = None, use_ml: bool = False,
+                                  conversation: Conversation = None) -> Dict:
+        """Async analyze_user_input; matching and inference run on the CPU pool"""
+        refined = await sync_to_async(self._refine)(conversation, user_message, criteria or {})
+        if refined:
+            return refined
+        
+        analysis = await run_cpu_bound(self._analyze, user_message, use_ml)
+        
+        # The directory may need rebuilding from the database
+        recommended_doctors = await sync_to_async(self._recommend)(analysis, criteria or {}, conversation)
+        
+        return {
+            'message': self._generate_response_message(
+                user_message,
+                analysis['specializations'],
+                recommended_doctors
+            ),
+            'recommended_doctors': recommended_doctors,
+            **analysis
+        }
+    
+    def stream_analysis(self, user_message: str, criteria: Dict = None, use_ml: bool = False,
+                        conversation: Conversation = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yield the analysis as (event, data) pairs as soon as each part is ready
+        
+        'analysis' (specializations, confidence, matches) comes first and
+        costs only the phrase matching; one 'doctor' event follows per
+        recommended doctor, then the summary 'message'.
+        """
+        refined = self._refine(conversation, user_message, criteria or {})
+        if refined:
+            yield 'analysis', {key: value for key, value in refined.items()
+                               if key not in ('message', 'recommended_doctors')}
+            for doctor in refined['recommended_doctors']:
+                yield 'doctor', doctor
+            yield 'message', {'response': refined['message']}
+            return
+        
+        analysis = self._analyze(user_message, use_ml)
+        yield 'analysis', analysis
+        
+        recommended_doctors = []
+        for doctor in self._recommend(analysis, criteria or {}, conversation):
+            recommended_doctors.append(doctor)
+            yield 'doctor', doctor
+        
+        yield 'message', {
+            'response': self._generate_response_message(
+                user_message,
+                analysis['specializations'],
+                recommended_doctors
+            )
+        }
+    
+    def _recommend(self, analysis: Dict, criteria: Dict, conversation: Conversation = None) -> List[Dict]:
+        """Recommend doctors and remember the wider candidate set for follow-ups"""
+        # One ranking serves both: the top 10 and the follow-up candidates
+        candidates = self._get_recommended_doctors(analysis['specializations'], criteria, limit=MAX_CANDIDATES)
+        
+        if conversation is not None:
+            conversation.start(analysis['specializations'], analysis['confidence'], candidates)
+        
+        return candidates[:10]
+    
+    def _refine(self, conversation: Conversation, user_message: str, criteria: Dict) -> Dict:
+        """Answer a follow-up turn by filtering the conversation's candidates"""
+        if conversation is None or not conversation.active:
+            return None
+        
+        # New symptoms or conditions start a fresh analysis, whether named
+        # exactly or only recognised by similarity ("coughing")
+        filters = parse_refinement(user_message)
+        if not filters or self.matcher.find_all(user_message):
+            return None
+        if self._find_similar_specializations(strip_refinement(user_message)):
+            return None
+        
+        conversation.filters.update(filters)
+        conversation.turns += 1
+        
+        active_filters = dict(conversation.filters)
+        try:
+            min_experience = int(criteria.get('min_experience') or 0)
+        except (TypeError, ValueError):
+            min_experience = 0
+        active_filters['min_experience'] = max(active_filters.get('min_experience', 0), min_experience)
+        
+        doctors = apply_filters(conversation.candidates, active_filters)[:10]
+        
+        return {
+            'message': self._generate_refinement_message(active_filters, doctors),
+            'recommended_doctors': doctors,
+            'specializations': conversation.specializations,
+            'confidence': conversation.confidence,
+            'matches': [],
+            'ml_analysis': None,
+            'refinement': active_filters
+        }
+    
+    def _analyze(self, user_message: str, use_ml: bool = False) -> Dict:
+        """Match the message and rank specializations, without touching doctors"""
+        user_message_lower = user_message.lower()
+        
+        # Find all disease and keyword mentions in one pass
+        # Spans refer to the message as typed
+        matches = self.matcher.find_all(user_message)
+        
+        # Find matching specializations
+        recommended_specializations = self._find_specializations(user_message_lower, matches)
+        
+        ml_analysis = None
+        if use_ml:
+            ml_analysis = get_ai_engine().predict_from_text(user_message_lower)
+            recommended_specializations = self._merge_ml_specializations(
+                recommended_specializations,
+                ml_analysis['predicted_diseases']
+            )
+        
+        return {
             'specializations': recommended_specializations,
-            'confidence': self._calculate_confidence(user_message_lower, recommended_specializations)
+            'confidence': self._calculate_confidence(user_message_lower, recommended_specializations, matches),
+            'matches': [match._asdict() for match in matches],
+            'ml_analysis': ml_analysis,
+            'refinement': None
         }
     
-    def _find_specializations(self, user_input: str) -> List[Dict]:
+    def _find_specializations(self, user_input: str, matches: List[PhraseMatch] = None) -> List[Dict]:
         """Find matching specializations based on user input"""
+        if matches is None:
+            matches = self.matcher.find_all(user_input)
+        
         specialization_scores = {}
         
-        # Check disease mapping
-        for disease, specializations in self.disease_specialization_map.items():
-            if disease in user_input:
-                for spec in specializations:
-                    specialization_scores[spec] = specialization_scores.get(spec, 0) + 3
+        # Each distinct phrase counts once, however often it is mentioned
+        for phrase in dict.fromkeys(match.phrase for match in matches):
+            # Check disease mapping
+            for spec in self.disease_specialization_map.get(phrase, []):
+                specialization_scores[spec] = specialization_scores.get(spec, 0) + 3
+            
+            # Check keyword mapping
+            for spec in self.keyword_specializations.get(phrase, []):
+                specialization_scores[spec] = specialization_scores.get(spec, 0) + 1
         
-        # Check keyword mapping
-        for specialization, keywords in self.specialization_keywords.items():
-            for keyword in keywords:
-                if keyword in user_input:
-                    specialization_scores[specialization] = specialization_scores.get(specialization, 0) + 1
+        # No exact phrase: fall back to TF-IDF similarity ("can't catch my breath")
+        if not specialization_scores:
+            return self._find_similar_specializations(user_input)
         
         # Sort by score and return top specializations
         sorted_specs = sorted(specialization_scores.items(), key=lambda x: x[1], reverse=True)
@@ -181,49 +322,71 @@ class AppointmentChatbot:
             for spec, score in sorted_specs[:5]
         ]
     
-    def _get_recommended_doctors(self, specializations: List[Dict], criteria: Dict) -> List[Dict]:
+    def _find_similar_specializations(self, user_input: str) -> List[Dict]:
+        """Rank specializations by vector-space similarity to the user input"""
+        text = ' '.join(user_input.lower().split())
+        ranked = get_or_build(
+            make_key('semantic_rank', self.knowledge.mtime, text),
+            lambda: get_semantic_matcher(self.knowledge).rank(text),
+            SEMANTIC_RANK_TIMEOUT
+        )
+        return [
+            {
+                'name': spec,
+                'score': round(similarity, 3),
+                'relevance': min(round(similarity * 100), 100)
+            }
+            for spec, similarity in ranked
+        ]
+    
+    def _merge_ml_specializations(self, specializations: List[Dict], predicted_diseases: List[Dict]) -> List[Dict]:
+        """Raise specializations backed by an ML disease prediction"""
+        merged = {spec['name']: dict(spec) for spec in specializations}
+        for disease in predicted_diseases:
+            name = SPECIALIST_SPECIALIZATIONS.get(disease['specialist'])
+            if not name:
+                continue
+            spec = merged.setdefault(name, {'name': name, 'score': 0, 'relevance': 0})
+            spec['relevance'] = max(spec['relevance'], min(round(disease['probability']), 100))
+            spec.setdefault('predicted_disease', disease['name'])
+        
+        return sorted(merged.values(), key=lambda x: (x['relevance'], x['score']), reverse=True)[:5]
+    
+    def _get_recommended_doctors(self, specializations: List[Dict], criteria: Dict, limit: int = 10) -> List[Dict]:
         """Get recommended doctors based on specializations and criteria"""
         if not specializations:
             # If no specific specialization found, recommend general practitioners
             specializations = [{'name': 'Internal Medicine'}, {'name': 'Family Medicine'}]
         
-        # Build query
-        spec_names = [spec['name'] for spec in specializations]
-        query = Q(specialization__in=spec_names) & Q(approval_status='approved')
-        
-        # Apply additional criteria
-        if criteria.get('min_experience'):
-            query &= Q(experience_years__gte=criteria['min_experience'])
+        # Merge the cached, experience-sorted directory lists
+        try:
+            min_experience = int(criteria.get('min_experience') or 0)
+        except (TypeError, ValueError):
+            min_experience = 0
         
-        # Get doctors
-        doctors = Doctor.objects.filter(query).select_related('user').order_by('-experience_years')[:10]
+        doctors = get_directory().top_doctors(
+            [spec['name'] for spec in specializations],
+            min_experience=min_experience,
+            limit=limit
+        )
         
         recommended_doctors = []
         for doctor in doctors:
             # Calculate relevance score
             relevance = 50  # Base score
             for spec in specializations:
-                if spec['name'] == doctor.specialization:
+                if spec['name'] == doctor['specialization']:
                     relevance += spec.get('relevance', 50)
                     break
             
             # Experience bonus
-            if doctor.experience_years > 10:
+            if doctor['experience_years'] > 10:
                 relevance += 20
-            elif doctor.experience_years > 5:
+            elif doctor['experience_years'] > 5:
                 relevance += 10
             
-            relevance = min(relevance, 100)
-            
-            recommended_doctors.append({
-                'id': doctor.id,
-                'name': doctor.user.get_full_name(),
-                'specialization': doctor.specialization,
-                'experience_years': doctor.experience_years,
-                'phone': doctor.phone,
-                'license_number': doctor.license_number,
-                'relevance_score': relevance
-            })
+            doctor['relevance_score'] = min(relevance, 100)
+            recommended_doctors.append(doctor)
         
         # Sort by relevance score
         recommended_doctors.sort(key=lambda x: x['relevance_score'], reverse=True)
@@ -247,6 +410,29 @@ class AppointmentChatbot:
             response_parts.append(f"Based on your description, I recommend consulting with a {top_spec['name']} specialist.")
         
         # Doctor recommendations with direct links
+        response_parts.extend(self._doctor_link_lines(doctors))
+        
+        return "\n".join(response_parts)
+    
+    def _generate_refinement_message(self, filters: Dict, doctors: List[Dict]) -> str:
+        """Generate the response to a follow-up filter"""
+        described = []
+        if filters.get('min_experience'):
+            described.append(f"{filters['min_experience']}+ years of experience")
+        if filters.get('slot_period'):
+            described.append(f"{filters['slot_period']} slots available")
+        description = ' and '.join(described)
+        
+        if not doctors:
+            return (f"None of the doctors I suggested have {description}. "
+                    "Try relaxing the filter or describe your symptoms again.")
+        
+        return "\n".join([f"Here are the doctors I suggested that have {description}:"]
+                         + self._doctor_link_lines(doctors))
+    
+    def _doctor_link_lines(self, doctors: List[Dict]) -> List[str]:
+        """Doctor recommendations with profile and booking links"""
+        response_parts = []
         if len(doctors) == 1:
             doctor = doctors[0]
             response_parts.append(f"I found an excellent doctor for you:")
@@ -263,72 +449,38 @@ class AppointmentChatbot:
         # Next steps
         response_parts.append("\n💡 Click the links above to view doctor profiles and book appointments directly!")
         response_parts.append("You can also use the 'Profile' and 'Book Now' buttons in the doctor cards below.")
-        
-        return "\n".join(response_parts)
+        return response_parts
     
-    def _calculate_confidence(self, user_input: str, specializations: List[Dict]) -> int:
+    def _calculate_confidence(self, user_input: str, specializations: List[Dict],
+                              matches: List[PhraseMatch] = None) -> int:
         """Calculate confidence score for the recommendation"""
         if not specializations:
             return 30
         
+        if matches is None:
+            matches = self.matcher.find_all(user_input)
+        
         # Base confidence on number of matching keywords/diseases
         confidence = min(specializations[0].get('relevance', 50), 90)
         
         # Boost confidence for specific disease mentions
-        for disease in self.disease_specialization_map.keys():
-            if disease in user_input:
-                confidence = min(confidence + 20, 95)
-                break
+        if any(match.phrase in self.disease_specialization_map for match in matches):
+            confidence = min(confidence + 20, 95)
         
         return max(confidence, 40)  # Minimum 40% confidence
     
     def get_quick_suggestions(self) -> List[str]:
         """Get quick suggestion prompts for users"""
-        return [
-            "I have chest pain and shortness of breath",
-            "I'm experiencing severe headaches",
-            "I have stomach pain and nausea",
-            "I need help with diabetes management",
-            "I have back pain that won't go away",
-            "I'm feeling anxious and depressed",
-            "I have a skin rash that's spreading",
-            "I need a general health checkup",
-            "I'm pregnant and need prenatal care",
-            "I have joint pain and stiffness"
-        ]
+        return list(self.knowledge.quick_suggestions)
     
     def get_specialization_info(self, specialization: str) -> Dict:
         """Get information about a specific specialization"""
-        info_map = {
-            "Cardiology": {
-                "description": "Heart and cardiovascular system specialists",
-                "treats": ["Heart disease", "High blood pressure", "Chest pain", "Arrhythmia"],
-                "when_to_see": "Chest pain, heart palpitations, high blood pressure"
-            },
-            "Pulmonology": {
-                "description": "Lung and respiratory system specialists",
-                "treats": ["Asthma", "Pneumonia", "Bronchitis", "Lung disease"],
-                "when_to_see": "Persistent cough, breathing difficulties, chest congestion"
-            },
-            "Gastroenterology": {
-                "description": "Digestive system specialists",
-                "treats": ["Stomach pain", "Acid reflux", "Ulcers", "Liver disease"],
-                "when_to_see": "Stomach pain, digestive issues, bowel problems"
-            },
-            "Neurology": {
-                "description": "Brain and nervous system specialists",
-                "treats": ["Headaches", "Seizures", "Stroke", "Memory problems"],
-                "when_to_see": "Severe headaches, neurological symptoms, memory issues"
-            },
-            "Internal Medicine": {
-                "description": "General adult medicine specialists",
-                "treats": ["General health", "Chronic diseases", "Preventive care"],
-                "when_to_see": "General health concerns, routine checkups, chronic conditions"
-            }
-        }
+        info = self.knowledge.specialization_info.get(specialization)
+        if info is not None:
+            return {key: list(value) if isinstance(value, tuple) else value for key, value in info.items()}
         
-        return info_map.get(specialization, {
+        return {
             "description": f"{specialization} specialist",
             "treats": ["Various conditions in this specialty"],
             "when_to_see": "Conditions related to this medical specialty"
-        }) 
\ No newline at end of file
+        }
@@ -0,0 +1,121 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import AppointmentSlot
+
+
+# Chatbot conversations live in the cache, keyed by session, so follow-up
+# turns can filter the previous turn's candidate doctors instead of
+# re-running the analysis.
+CONVERSATION_KEY = 'chatbot:conversation:{}'
+MAX_CANDIDATES = 50
+MAX_TURNS = 20
+AVAILABILITY_DAYS = 30
+
+# Only explicit filter cues count: "10+ years", "10 years of experience".
+# "For (over) 2 years" describes symptoms instead.
+_YEARS = r'(?:years?|yrs?)\b'
+EXPERIENCE_RE = re.compile(
+    rf'(\d{{1,2}})\s*\+\s*{_YEARS}'
+    rf'|(\d{{1,2}})\s*{_YEARS}\s*(?:of\s+)?(?:experience|exp)\b'
+)
+SLOT_PERIOD_RE = re.compile(r'\b(morning|afternoon)\s+(?:slots?|appointments?|times?)\b')
+SLOT_PERIODS = {
+    period: tuple(slot_type for slot_type in AppointmentSlot.SLOT_TIMES if slot_type.startswith(period))
+    for period in ('morning', 'afternoon')
+}
+
+
+@dataclass
+class Conversation:
+    """Specializations and candidate doctors from the last full analysis"""
+    session_key: Optional[str] = None
+    specializations: List[Dict] = field(default_factory=list)
+    confidence: int = 0
+    candidates: List[Dict] = field(default_factory=list)
+    filters: Dict = field(default_factory=dict)
+    turns: int = 0
+
+    @property
+    def active(self):
+        return bool(self.candidates) and self.turns < MAX_TURNS
+
+    def start(self, specializations: List[Dict], confidence: int, candidates: List[Dict]) -> None:
+        """Replace the state with a fresh analysis"""
+        self.specializations = specializations
+        self.confidence = confidence
+        self.candidates = candidates[:MAX_CANDIDATES]
+        self.filters = {}
+        self.turns = 1
+
+
+def load_conversation(session_key) -> Conversation:
+    conversation = cache.get(CONVERSATION_KEY.format(session_key)) if session_key else None
+    return conversation or Conversation(session_key=session_key)
+
+
+def save_conversation(conversation: Conversation) -> None:
+    if conversation.session_key:
+        cache.set(
+            CONVERSATION_KEY.format(conversation.session_key),
+            conversation,
+            timeout=getattr(settings, 'CHATBOT_CONVERSATION_TTL', 30 * 60)
+        )
+
+
+def clear_conversation(session_key) -> None:
+    cache.delete(CONVERSATION_KEY.format(session_key))
+
+
+def parse_refinement(message: str) -> Dict:
+    """Extract follow-up filters such as "10+ years" or "morning slots" """
+    message = message.lower()
+    filters = {}
+
+    experience = EXPERIENCE_RE.search(message)
+    if experience:
+        filters['min_experience'] = int(next(group for group in experience.groups() if group))
+
+    period = SLOT_PERIOD_RE.search(message)
+    if period:
+        filters['slot_period'] = period.group(1)
+
+    return filters
+
+
+def strip_refinement(message: str) -> str:
+    """``message`` without its filter cues, i.e. whatever else the user said"""
+    message = message.lower()
+    return SLOT_PERIOD_RE.sub(' ', EXPERIENCE_RE.sub(' ', message))
+
+
+def apply_filters(candidates: List[Dict], filters: Dict) -> List[Dict]:
+    """
+    Narrow cached candidates down to those matching ``filters``.
+
+    Experience is checked in memory; slot periods cost one query limited
+    to the candidate ids.
+    """
+    min_experience = filters.get('min_experience') or 0
+    doctors = [doctor for doctor in candidates if doctor['experience_years'] >= min_experience]
+
+    period = filters.get('slot_period')
+    if period and doctors:
+        today = date.today()
+        available = set(
+            AppointmentSlot.objects.filter(
+                doctor_id__in=[doctor['id'] for doctor in doctors],
+                slot_type__in=SLOT_PERIODS[period],
+                is_available=True,
+                appointment__isnull=True,
+                date__range=[today, today + timedelta(days=AVAILABILITY_DAYS)],
+            ).values_list('doctor_id', flat=True).distinct()
+        )
+        doctors = [doctor for doctor in doctors if doctor['id'] in available]
+
+    return doctors
@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Iterable, List, NamedTuple
+
+
+class PhraseMatch(NamedTuple):
+    phrase: str
+    start: int
+    end: int
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of lowercase phrases.
+
+    ``find_all`` reports every phrase occurrence, overlapping ones included,
+    in a single linear pass over the text. Matches must start and end on a
+    word boundary so short phrases such as "ear" don't fire inside "heart";
+    a trailing plural "s"/"es" is tolerated ("headaches" matches "headache").
+    Spans index the text as given, even where lowercasing changes its
+    length (e.g. "İ" lowercases to two code points).
+    """
+
+    PLURAL_SUFFIXES = ('s', 'es')
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for phrase in dict.fromkeys(p.lower() for p in phrases if p):
+            self._add(phrase)
+        self._build_failure_links()
+
+    def _add(self, phrase: str) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self.phrases))
+        self.phrases.append(phrase)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[PhraseMatch]:
+        """Return all word-bounded phrase matches in order of their end position"""
+        text, offsets = self._lower(text)
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for phrase_id in self._output[state]:
+                phrase = self.phrases[phrase_id]
+                start = index + 1 - len(phrase)
+                end = index + 1
+                if self._is_bounded(text, start, end):
+                    matches.append(PhraseMatch(phrase, offsets[start], offsets[end - 1] + 1))
+        return matches
+
+    @staticmethod
+    def _lower(text: str):
+        """Lowercase ``text``, with the original index of every lowered character"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered, range(len(text))
+        chars, offsets = [], []
+        for index, char in enumerate(text):
+            for lower_char in char.lower():
+                chars.append(lower_char)
+                offsets.append(index)
+        return ''.join(chars), offsets
+
+    def _is_bounded(self, text: str, start: int, end: int) -> bool:
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end == len(text) or not text[end].isalnum():
+            return True
+        for suffix in self.PLURAL_SUFFIXES:
+            suffix_end = end + len(suffix)
+            if text.startswith(suffix, end) and (suffix_end == len(text) or not text[suffix_end].isalnum()):
+                return True
+        return False
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def mark_booked_slots_unavailable(apps, schema_editor):
+    """Booked slots must not be claimable by the conditional UPDATE in book_slot"""
+    AppointmentSlot = apps.get_model('appointment', 'AppointmentSlot')
+    AppointmentSlot.objects.filter(appointment__isnull=False).update(is_available=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0002_alter_appointment_duration_minutes_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_booked_slots_unavailable, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-19 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0003_sync_slot_availability'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentslot',
+            index=models.Index(fields=['is_available', 'date', 'slot_type'], name='slot_available_date_idx'),
+        ),
+    ]
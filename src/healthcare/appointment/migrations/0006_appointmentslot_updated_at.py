@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-19 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0005_appointment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentslot',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
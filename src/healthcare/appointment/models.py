@@ -27,6 +27,7 @@ class AppointmentSlot(models.Model):
     slot_type = models.CharField(max_length=20, choices=SLOT_CHOICES)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     @property
     def start_time(self):
@@ -49,6 +50,9 @@ class AppointmentSlot(models.Model):
     
     class Meta:
         unique_together = ['doctor', 'date', 'slot_type']
+        indexes = [
+            models.Index(fields=['is_available', 'date', 'slot_type'], name='slot_available_date_idx'),
+        ]
         verbose_name = "Appointment Slot"
         verbose_name_plural = "Appointment Slots"
         ordering = ['date', 'slot_type']
@@ -87,3 +91,8 @@ class Appointment(models.Model):
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
         ordering = ['-appointment_date']
+        indexes = [
+            # Keyset pagination of a patient's or doctor's appointments
+            models.Index(fields=['patient', 'appointment_date', 'id'], name='appointment_patient_date_idx'),
+            models.Index(fields=['doctor', 'appointment_date', 'id'], name='appointment_doctor_date_idx'),
+        ]
@@ -0,0 +1,153 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+
+SELFTEST_DATA_DIR = os.path.join(settings.BASE_DIR, 'selftest', 'data')
+
+# Self-test data names specialists and symptom categories rather than the
+# chatbot's specializations; map them onto the chatbot vocabulary
+SPECIALIST_SPECIALIZATIONS = {
+    'Allergist': 'Internal Medicine',
+    'Cardiologist': 'Cardiology',
+    'Dermatologist': 'Dermatology',
+    'ENT Specialist': 'ENT',
+    'Endocrinologist': 'Endocrinology',
+    'Gastroenterologist': 'Gastroenterology',
+    'General Practitioner': 'Family Medicine',
+    'Hematologist': 'Internal Medicine',
+    'Internal Medicine': 'Internal Medicine',
+    'Nephrologist': 'Urology',
+    'Neurologist': 'Neurology',
+    'Psychiatrist or Psychologist': 'Psychiatry',
+    'Pulmonologist': 'Pulmonology',
+    'Rheumatologist': 'Rheumatology',
+    'Sleep Medicine Specialist': 'Neurology',
+    'Urologist': 'Urology',
+}
+
+CATEGORY_SPECIALIZATIONS = {
+    'Cardiovascular': 'Cardiology',
+    'Dermatological': 'Dermatology',
+    'ENT': 'ENT',
+    'Gastrointestinal': 'Gastroenterology',
+    'General': 'Family Medicine',
+    'Mental Health': 'Psychiatry',
+    'Musculoskeletal': 'Orthopedics',
+    'Neurological': 'Neurology',
+    'Ophthalmological': 'Ophthalmology',
+    'Respiratory': 'Pulmonology',
+    'Sleep': 'Neurology',
+    'Urological': 'Urology',
+}
+
+# Cosine similarity below this is treated as noise
+MIN_SIMILARITY = 0.1
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def _strip_stop_words(text: str) -> str:
+    return ' '.join(
+        word for word in _WORD_RE.findall(text.lower())
+        if word not in ENGLISH_STOP_WORDS
+    )
+
+
+class SemanticMatcher:
+    """
+    TF-IDF similarity between free text and each specialization.
+
+    Every specialization gets one document made of its diseases, keywords,
+    description and the matching self-test diseases and symptoms. Character
+    n-grams make "breath" match "breathless" and tolerate typos. Documents
+    are vectorised once into an L2-normalised sparse matrix, so scoring a
+    message is a single sparse matrix-vector product.
+    """
+
+    def __init__(self, documents: Dict[str, str]):
+        self.specializations = list(documents)
+        self.vectorizer = TfidfVectorizer(
+            analyzer='char_wb',
+            ngram_range=(3, 5),
+            preprocessor=_strip_stop_words,
+            sublinear_tf=True,
+        )
+        self.matrix = self.vectorizer.fit_transform(documents.values())
+
+    def rank(self, text: str, limit: int = 5,
+             min_similarity: float = MIN_SIMILARITY) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (specialization, similarity) pairs, best first"""
+        if not self.specializations or not _strip_stop_words(text):
+            return []
+        query = self.vectorizer.transform([text])
+        scores = (self.matrix @ query.T).toarray().ravel()
+        ranked = sorted(
+            (
+                (self.specializations[i], float(scores[i]))
+                for i in scores.nonzero()[0]
+                if scores[i] >= min_similarity
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return ranked[:limit]
+
+
+def build_documents(knowledge, data_dir: str = SELFTEST_DATA_DIR) -> Dict[str, str]:
+    """Collect the text describing each specialization"""
+    texts = {}
+
+    def add(spec, *parts):
+        if spec:
+            texts.setdefault(spec, [spec]).extend(part for part in parts if part)
+
+    for spec, keywords in knowledge.specialization_keywords.items():
+        add(spec, *keywords)
+    for disease, specs in knowledge.disease_specialization_map.items():
+        for spec in specs:
+            add(spec, disease)
+    for spec, info in knowledge.specialization_info.items():
+        add(spec, info.get('description'), info.get('when_to_see'), *info.get('treats', ()))
+
+    for disease in _load_json(data_dir, 'diseases.json').get('diseases', []):
+        add(
+            SPECIALIST_SPECIALIZATIONS.get(disease.get('specialist')),
+            disease.get('name'), disease.get('description'), *disease.get('symptoms', [])
+        )
+    for symptom in _load_json(data_dir, 'symptoms.json').get('symptoms', []):
+        add(
+            CATEGORY_SPECIALIZATIONS.get(symptom.get('category')),
+            symptom.get('name'), symptom.get('description'), *symptom.get('keywords', [])
+        )
+
+    return {spec: '. '.join(parts) for spec, parts in texts.items()}
+
+
+def _load_json(data_dir: str, filename: str) -> Dict:
+    try:
+        with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_semantic_matcher(knowledge) -> SemanticMatcher:
+    """Return the matcher for ``knowledge``, fitting it once per knowledge reload"""
+    global _matcher
+    cached = _matcher
+    if cached is None or cached[0] is not knowledge:
+        with _matcher_lock:
+            cached = _matcher
+            if cached is None or cached[0] is not knowledge:
+                cached = _matcher = (knowledge, SemanticMatcher(build_documents(knowledge)))
+    return cached[1]
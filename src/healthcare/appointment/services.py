@@ -0,0 +1,218 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import Appointment, AppointmentSlot
+
+
+# SQLite reports write contention as "database is locked" instead of
+# blocking like PostgreSQL's row locks; retry the claim a few times
+LOCK_RETRIES = 10
+LOCK_RETRY_DELAY = 0.02
+
+
+@dataclass
+class BookingResult:
+    """Outcome of a booking attempt"""
+
+    BOOKED = 'booked'
+    TAKEN = 'taken'
+    PAST = 'past'
+    NOT_FOUND = 'not_found'
+    BUSY = 'busy'
+
+    status: str
+    appointment: Optional[Appointment] = None
+
+    @property
+    def success(self):
+        return self.status == self.BOOKED
+
+
+def book_slot(patient, slot_id, reason: str) -> BookingResult:
+    """
+    Book an appointment slot for a patient.
+
+    The slot is claimed with a single conditional UPDATE on
+    ``AppointmentSlot.is_available`` so that, among concurrent requests for
+    the same slot, exactly one sees a row count of 1. Every other request
+    gets a ``TAKEN`` result instead of hitting the OneToOne constraint.
+    """
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return _claim_and_book(patient, slot_id, reason)
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            time.sleep(LOCK_RETRY_DELAY * (attempt + 1) * random.uniform(0.5, 1.5))
+    return BookingResult(BookingResult.BUSY)
+
+
+def _claim_and_book(patient, slot_id, reason: str) -> BookingResult:
+    """Claim the slot and create the appointment in one transaction"""
+    with transaction.atomic():
+        claimed = AppointmentSlot.objects.filter(
+            id=slot_id,
+            is_available=True,
+            appointment__isnull=True,
+            date__gte=date.today(),
+        ).update(is_available=False, updated_at=timezone.now())
+
+        if not claimed:
+            return _unclaimed_result(slot_id)
+
+        slot = AppointmentSlot.objects.select_related('doctor', 'doctor__user').get(id=slot_id)
+
+        try:
+            # Savepoint keeps the outer transaction usable if a legacy row
+            # (booked before is_available was maintained) slips through
+            with transaction.atomic():
+                appointment = Appointment.objects.create(
+                    patient=patient,
+                    doctor=slot.doctor,
+                    appointment_slot=slot,
+                    appointment_date=timezone.make_aware(
+                        timezone.datetime.combine(slot.date, slot.start_time)
+                    ),
+                    status='scheduled',
+                    reason=reason,
+                )
+        except IntegrityError:
+            transaction.set_rollback(True)
+            return BookingResult(BookingResult.TAKEN)
+
+    return BookingResult(BookingResult.BOOKED, appointment)
+
+
+def _unclaimed_result(slot_id) -> BookingResult:
+    """Explain why a slot could not be claimed"""
+    slot = AppointmentSlot.objects.filter(id=slot_id).only('date').first()
+    if slot is None:
+        return BookingResult(BookingResult.NOT_FOUND)
+    if slot.date < date.today():
+        return BookingResult(BookingResult.PAST)
+    return BookingResult(BookingResult.TAKEN)
+
+
+# Slot types in chronological order; slot_type strings don't sort by time
+SLOT_ORDER = Case(
+    *[
+        When(slot_type=slot_type, then=Value(position))
+        for position, slot_type in enumerate(
+            sorted(AppointmentSlot.SLOT_TIMES, key=lambda key: AppointmentSlot.SLOT_TIMES[key][0])
+        )
+    ],
+    output_field=IntegerField(),
+)
+
+MAX_NEXT_SLOTS = 50
+
+
+def find_next_available_slots(specialization: str, start_date: Optional[date] = None,
+                              end_date: Optional[date] = None, slot_types=None,
+                              limit: int = 10):
+    """
+    Return the earliest free slots across all approved doctors of a specialization.
+
+    A single query over the ``slot_available_date_idx`` index, ordered by
+    date and slot start time, replaces browsing each doctor's calendar.
+    Today's slots that have already started are skipped.
+    """
+    now = timezone.localtime()
+    today = now.date()
+    start_date = max(start_date or today, today)
+    limit = max(1, min(limit, MAX_NEXT_SLOTS))
+
+    slots = AppointmentSlot.objects.filter(
+        is_available=True,
+        appointment__isnull=True,
+        date__gte=start_date,
+        doctor__specialization__iexact=specialization,
+        doctor__approval_status='approved',
+    )
+
+    if end_date:
+        slots = slots.filter(date__lte=end_date)
+
+    started = [
+        slot_type for slot_type, (start_time, _) in AppointmentSlot.SLOT_TIMES.items()
+        if start_time <= now.time()
+    ]
+    if start_date == today and started:
+        slots = slots.exclude(date=today, slot_type__in=started)
+
+    if slot_types:
+        slots = slots.filter(slot_type__in=slot_types)
+
+    return list(
+        slots.select_related('doctor', 'doctor__user')
+        .annotate(slot_order=SLOT_ORDER)
+        .order_by('date', 'slot_order', '-doctor__experience_years', 'id')[:limit]
+    )
+
+
+# Dashboard counters are cached briefly; set DASHBOARD_STATS_TIMEOUT = 0 to disable
+DOCTOR_STATS_KEY = 'dashboard:doctor:{}:{}'
+PATIENT_STATS_KEY = 'dashboard:patient:{}'
+
+
+def get_doctor_dashboard_stats(doctor) -> dict:
+    """Doctor dashboard counters: one conditional aggregate over slots, one over appointments"""
+    today = date.today()
+
+    def compute():
+        stats = AppointmentSlot.objects.filter(doctor=doctor).aggregate(
+            total_slots=Count('id'),
+            booked_slots=Count('id', filter=Q(appointment__isnull=False)),
+            available_slots=Count('id', filter=Q(appointment__isnull=True, date__gte=today)),
+            today_slots=Count('id', filter=Q(date=today)),
+        )
+        # Appointments need not have a slot, so count them directly
+        stats.update(Appointment.objects.filter(doctor=doctor).aggregate(
+            completed_appointments=Count('id', filter=Q(status='completed')),
+        ))
+        return stats
+
+    return _cached_stats(DOCTOR_STATS_KEY.format(doctor.id, today), compute)
+
+
+def get_patient_dashboard_stats(patient) -> dict:
+    """All patient dashboard counters in one conditional-aggregate query"""
+    return _cached_stats(
+        PATIENT_STATS_KEY.format(patient.id),
+        lambda: Appointment.objects.filter(patient=patient).aggregate(
+            total_appointments=Count('id'),
+            completed_appointments=Count('id', filter=Q(status='completed')),
+            cancelled_appointments=Count('id', filter=Q(status='cancelled')),
+        )
+    )
+
+
+def invalidate_dashboard_stats(doctor_id=None, patient_id=None) -> None:
+    """Drop cached dashboard counters after an appointment or slot change"""
+    keys = []
+    if doctor_id:
+        keys.append(DOCTOR_STATS_KEY.format(doctor_id, date.today()))
+    if patient_id:
+        keys.append(PATIENT_STATS_KEY.format(patient_id))
+    if keys:
+        cache.delete_many(keys)
+
+
+def _cached_stats(key, compute) -> dict:
+    timeout = getattr(settings, 'DASHBOARD_STATS_TIMEOUT', 30)
+    if not timeout:
+        return compute()
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, timeout=timeout)
+    return stats
@@ -0,0 +1,62 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from doctor.models import Doctor
+from doctor.signals import doctors_bulk_updated
+from patient.signals import patients_renamed
+from .availability import bump_availability_version, bump_availability_versions
+from .models import Appointment, AppointmentSlot
+from .services import invalidate_dashboard_stats
+
+
+def _bump_on_commit(doctor_id):
+    # Bumping before commit would let a concurrent reader cache the
+    # pre-commit state under the new version
+    transaction.on_commit(partial(bump_availability_version, doctor_id))
+
+
+@receiver([post_save, post_delete], sender=AppointmentSlot)
+@receiver([post_save, post_delete], sender=Appointment)
+def slot_or_appointment_changed(sender, instance, **kwargs):
+    """Bump the doctor's availability version when a slot or booking changes"""
+    _bump_on_commit(instance.doctor_id)
+    transaction.on_commit(partial(
+        invalidate_dashboard_stats,
+        doctor_id=instance.doctor_id,
+        patient_id=getattr(instance, 'patient_id', None),
+    ))
+
+
+@receiver(post_delete, sender=Appointment)
+def release_slot(sender, instance, **kwargs):
+    """Reopen the slot of a deleted appointment; book_slot only claims available slots"""
+    if instance.appointment_slot_id:
+        AppointmentSlot.objects.filter(id=instance.appointment_slot_id).update(
+            is_available=True, updated_at=timezone.now()
+        )
+
+
+@receiver(post_save, sender=Doctor)
+def doctor_changed(sender, instance, **kwargs):
+    """Doctor details are part of the availability payloads"""
+    _bump_on_commit(instance.id)
+
+
+@receiver(doctors_bulk_updated)
+def doctors_bulk_changed(sender, doctor_ids, **kwargs):
+    """Batched counterpart of doctor_changed for bulk and user updates"""
+    bump_availability_versions(doctor_ids)
+
+
+@receiver(patients_renamed)
+def patients_renamed_changed(sender, user_ids, **kwargs):
+    """Doctor calendars show the names of booked patients"""
+    doctor_ids = set(
+        Appointment.objects.filter(patient__user_id__in=user_ids).values_list('doctor_id', flat=True)
+    )
+    if doctor_ids:
+        bump_availability_versions(doctor_ids)
@@ -1,3 +1,795 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from doctor.directory import get_directory
+from doctor.models import Doctor
+from healthcare.testing import QueryCountAssertionsMixin, create_doctor, create_patient
+from . import chatbot as chatbot_module
+from .chatbot import AppointmentChatbot, get_knowledge
+from .conversation import MAX_CANDIDATES, MAX_TURNS, Conversation, parse_refinement
+from .matcher import PhraseMatch, PhraseMatcher
+from .models import Appointment, AppointmentSlot
+from .semantic import SemanticMatcher, get_semantic_matcher
+from .services import BookingResult, book_slot, find_next_available_slots
+
+
+class BookingServiceTestCase(TestCase):
+    """Test the atomic slot booking service"""
+
+    def setUp(self):
+        self.doctor = create_doctor()
+        self.patient = create_patient()
+        self.slot = AppointmentSlot.objects.create(
+            doctor=self.doctor,
+            date=date.today() + timedelta(days=1),
+            slot_type='morning_1'
+        )
+
+    def test_book_available_slot(self):
+        """Booking a free slot creates an appointment and marks the slot unavailable"""
+        result = book_slot(self.patient, self.slot.id, 'Checkup')
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.appointment.patient, self.patient)
+        self.assertEqual(result.appointment.doctor, self.doctor)
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_available)
+
+    def test_book_taken_slot(self):
+        """A second booking of the same slot is reported as taken"""
+        book_slot(self.patient, self.slot.id, 'Checkup')
+        other = create_patient('other_patient')
+
+        result = book_slot(other, self.slot.id, 'Checkup')
+
+        self.assertEqual(result.status, BookingResult.TAKEN)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_book_legacy_booked_slot(self):
+        """Slots with an appointment but a stale is_available flag are not claimable"""
+        Appointment.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            appointment_slot=self.slot,
+            appointment_date=timezone.now() + timedelta(days=1)
+        )
+
+        result = book_slot(create_patient('other_patient'), self.slot.id, 'Checkup')
+
+        self.assertEqual(result.status, BookingResult.TAKEN)
+        self.slot.refresh_from_db()
+        self.assertTrue(self.slot.is_available)
+
+    def test_deleted_appointment_reopens_slot(self):
+        """Deleting a booking, directly or with its patient, makes the slot bookable again"""
+        deletions = [lambda appointment: appointment.delete(), lambda appointment: appointment.patient.delete()]
+        for i, delete in enumerate(deletions):
+            result = book_slot(create_patient(f'reopen_patient_{i}'), self.slot.id, 'Checkup')
+            self.assertTrue(result.success)
+
+            delete(result.appointment)
+
+            self.slot.refresh_from_db()
+            self.assertTrue(self.slot.is_available)
+        self.assertTrue(book_slot(self.patient, self.slot.id, 'Checkup').success)
+
+    def test_book_past_and_missing_slot(self):
+        """Past and unknown slots return explicit statuses"""
+        past_slot = AppointmentSlot.objects.create(
+            doctor=self.doctor,
+            date=date.today() - timedelta(days=1),
+            slot_type='morning_1'
+        )
+
+        self.assertEqual(book_slot(self.patient, past_slot.id, 'x').status, BookingResult.PAST)
+        self.assertEqual(book_slot(self.patient, 999999, 'x').status, BookingResult.NOT_FOUND)
+
+    def test_book_view_taken_slot_redirects(self):
+        """The booking view redirects with an error instead of raising IntegrityError"""
+        client = Client()
+        client.force_login(self.patient.user)
+        book_slot(create_patient('other_patient'), self.slot.id, 'Checkup')
+
+        response = client.post(
+            reverse('patient:book_appointment', args=[self.slot.id]),
+            {'reason': 'Checkup'}
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Appointment.objects.filter(patient=self.patient).count(), 0)
+
+    def test_book_view_busy_asks_to_retry(self):
+        """Running out of lock retries is not reported as a taken slot"""
+        client = Client()
+        client.force_login(self.patient.user)
+
+        with mock.patch('patient.appointment_views.book_slot', return_value=BookingResult(BookingResult.BUSY)):
+            response = client.post(
+                reverse('patient:book_appointment', args=[self.slot.id]),
+                {'reason': 'Checkup'}
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Please try again', [str(m) for m in response.context['messages']][0])
+
+
+class NextAvailableSlotsTestCase(TestCase):
+    """Test the earliest-free-slot search across a specialization"""
+
+    def setUp(self):
+        self.senior = create_doctor('senior_doctor', experience_years=20)
+        self.junior = create_doctor('junior_doctor', experience_years=2)
+        self.other = create_doctor('other_doctor', specialization='Neurology')
+        self.tomorrow = date.today() + timedelta(days=1)
+        self.day_after = date.today() + timedelta(days=2)
+
+        self.junior_morning = AppointmentSlot.objects.create(
+            doctor=self.junior, date=self.tomorrow, slot_type='morning_2'
+        )
+        self.senior_afternoon = AppointmentSlot.objects.create(
+            doctor=self.senior, date=self.tomorrow, slot_type='afternoon_1'
+        )
+        self.senior_later = AppointmentSlot.objects.create(
+            doctor=self.senior, date=self.day_after, slot_type='morning_1'
+        )
+        AppointmentSlot.objects.create(doctor=self.other, date=self.tomorrow, slot_type='morning_1')
+
+    def test_slots_in_chronological_order(self):
+        """Slots are ordered by date then start time, not by slot_type string"""
+        slots = find_next_available_slots('cardiology')
+
+        self.assertEqual(slots, [self.junior_morning, self.senior_afternoon, self.senior_later])
+
+    def test_booked_and_unapproved_slots_excluded(self):
+        """Booked slots and slots of unapproved doctors are skipped"""
+        book_slot(create_patient(), self.junior_morning.id, 'Checkup')
+        Doctor.objects.filter(id=self.senior.id).update(approval_status='pending')
+
+        self.assertEqual(find_next_available_slots('Cardiology'), [])
+
+    def test_date_window_and_slot_type_filters(self):
+        """Date window, slot types and limit narrow the result"""
+        self.assertEqual(
+            find_next_available_slots('Cardiology', start_date=self.day_after),
+            [self.senior_later]
+        )
+        self.assertEqual(
+            find_next_available_slots('Cardiology', end_date=self.tomorrow, slot_types=['afternoon_1']),
+            [self.senior_afternoon]
+        )
+        self.assertEqual(len(find_next_available_slots('Cardiology', limit=1)), 1)
+
+    def test_started_slots_today_excluded(self):
+        """At noon, today's morning slots are gone but its afternoon slots remain"""
+        today = date.today()
+        morning = AppointmentSlot.objects.create(doctor=self.junior, date=today, slot_type='morning_1')
+        afternoon = AppointmentSlot.objects.create(doctor=self.junior, date=today, slot_type='afternoon_2')
+        noon = timezone.make_aware(datetime.combine(today, time(12, 0)))
+
+        with mock.patch('appointment.services.timezone.localtime', return_value=noon):
+            slots = find_next_available_slots('Cardiology')
+
+        self.assertNotIn(morning, slots)
+        self.assertEqual(slots[0], afternoon)
+
+    def test_next_slots_api(self):
+        """The API returns slots with doctor details in one request"""
+        client = Client()
+        client.force_login(create_patient().user)
+
+        response = client.get(
+            reverse('appointment:next_available_slots', args=['Cardiology']),
+            {'slot_types': 'morning_1,morning_2', 'limit': 5}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([s['id'] for s in data['slots']], [self.junior_morning.id, self.senior_later.id])
+        self.assertEqual(data['slots'][0]['doctor']['id'], self.junior.id)
+
+        response = client.get(
+            reverse('appointment:next_available_slots', args=['Cardiology']),
+            {'start': 'not-a-date'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(
+            reverse('appointment:next_available_slots', args=['Cardiology']),
+            {'slot_types': 'morning_1,evening'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('evening', response.json()['error'])
+
+
+class AvailabilityCachingTestCase(TestCase):
+    """Test ETag handling and payload caching of the availability endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = create_doctor()
+        self.patient = create_patient()
+        self.slot_date = date.today() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot = AppointmentSlot.objects.create(
+                doctor=self.doctor, date=self.slot_date, slot_type='morning_1'
+            )
+        self.client = Client()
+        self.client.force_login(self.patient.user)
+        self.urls = [
+            (reverse('patient:available_slots_api'),
+             {'date': self.slot_date.strftime('%Y-%m-%d'), 'doctor_id': self.doctor.id}),
+            (reverse('appointment:doctor_availability', args=[self.doctor.id]), {}),
+        ]
+
+    def test_not_modified_until_availability_changes(self):
+        """Polling with If-None-Match returns 304 until a booking bumps the version"""
+        for (url, params), new_slot_type in zip(self.urls, ['afternoon_1', 'afternoon_2']):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+            self.assertNotIn('Last-Modified', response)
+
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                AppointmentSlot.objects.create(
+                    doctor=self.doctor, date=self.slot_date, slot_type=new_slot_type
+                )
+
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_payload_cached_per_version(self):
+        """Repeated polling is served from cache; bookings invalidate it"""
+        url, params = self.urls[0]
+        self.assertEqual(len(self.client.get(url, params).json()['slots']), 1)
+
+        with self.assertNumQueries(2):  # session and user lookups only
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.json()['slots']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(self.patient, self.slot.id, 'Checkup')
+
+        self.assertEqual(self.client.get(url, params).json()['slots'], [])
+
+    def test_doctor_rename_changes_etag(self):
+        """Payloads carry the doctor's name, so renaming the user invalidates them"""
+        url, params = self.urls[1]
+        response = self.client.get(url, params)
+        etag = response['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.user.last_name = 'Renamed'
+            self.doctor.user.save()
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', json.dumps(response.json()))
+
+    def test_calendars_cached_until_booking(self):
+        """Both month calendars reuse the cached slot list until a booking bumps the version"""
+        params = {'year': self.slot_date.year, 'month': self.slot_date.month}
+        doctor_client = Client()
+        doctor_client.force_login(self.doctor.user)
+
+        response = self.client.get(reverse('patient:appointment_calendar'), params)
+        self.assertEqual([slot.id for slot in response.context['available_slots']], [self.slot.id])
+        response = doctor_client.get(reverse('doctor:appointment_calendar'), params)
+        self.assertEqual(len(response.context['slots']), 1)
+
+        with mock.patch.object(AppointmentSlot.objects, 'filter', side_effect=AssertionError('cache miss')):
+            self.client.get(reverse('patient:appointment_calendar'), params)
+            doctor_client.get(reverse('doctor:appointment_calendar'), params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(self.patient, self.slot.id, 'Checkup')
+
+        response = self.client.get(reverse('patient:appointment_calendar'), params)
+        self.assertEqual(response.context['available_slots'], [])
+        response = doctor_client.get(reverse('doctor:appointment_calendar'), params)
+        self.assertEqual(response.context['slots'][0].appointment.patient, self.patient)
+
+    def test_doctor_calendar_shows_renamed_patient(self):
+        """The doctor calendar lists booked patients, so renaming one invalidates it"""
+        params = {'year': self.slot_date.year, 'month': self.slot_date.month}
+        doctor_client = Client()
+        doctor_client.force_login(self.doctor.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            book_slot(self.patient, self.slot.id, 'Checkup')
+        doctor_client.get(reverse('doctor:appointment_calendar'), params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.user.last_name = 'Renamed'
+            self.patient.user.save()
+
+        response = doctor_client.get(reverse('doctor:appointment_calendar'), params)
+        self.assertEqual(response.context['slots'][0].appointment.patient.user.last_name, 'Renamed')
+
+
+class AsyncApiViewsTestCase(TestCase):
+    """Test the async JSON endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor = create_doctor('async_doctor', 'Cardiology', 12)
+            AppointmentSlot.objects.create(
+                doctor=self.doctor, date=date.today() + timedelta(days=1), slot_type='morning_1'
+            )
+        self.patient = create_patient('async_patient')
+
+    def test_views_are_coroutines(self):
+        from doctor.appointment_views import patient_search_api
+        from patient.appointment_views import available_slots_api
+        from selftest.views import quick_symptom_search_api
+        from . import views
+
+        for view in [views.chatbot_analyze, views.doctor_availability, available_slots_api,
+                     quick_symptom_search_api, patient_search_api]:
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+
+    async def test_concurrent_chatbot_requests(self):
+        await sync_to_async(self.async_client.force_login)(self.patient.user)
+        url = reverse('appointment:chatbot_analyze')
+
+        responses = await asyncio.gather(*[
+            self.async_client.post(url, {'message': 'arrhythmia'}, content_type='application/json')
+            for _ in range(5)
+        ])
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['doctors'][0]['id'], self.doctor.id)
+
+    async def test_availability_conditional_get(self):
+        await sync_to_async(self.async_client.force_login)(self.patient.user)
+        url = reverse('appointment:doctor_availability', args=[self.doctor.id])
+
+        response = await self.async_client.get(url)
+        self.assertEqual(len(response.json()['available_slots']), 1)
+
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = await self.async_client.get(reverse('appointment:doctor_availability', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_login_and_method_required(self):
+        url = reverse('appointment:chatbot_analyze')
+
+        response = await self.async_client.post(url, {'message': 'cough'}, content_type='application/json')
+        self.assertEqual(response.status_code, 302)
+
+        await sync_to_async(self.async_client.force_login)(self.patient.user)
+        self.assertEqual((await self.async_client.get(url)).status_code, 405)
+
+
+class ListingQueryCountTestCase(QueryCountAssertionsMixin, TestCase):
+    """Listing views and admin changelists must not issue per-row queries"""
+
+    def setUp(self):
+        self.doctor = create_doctor()
+        self.admin_user = User.objects.create_superuser('listing_admin', 'admin@test.com', 'testpass123')
+        self.booked = 0
+        self.add_bookings(2)
+
+    def add_bookings(self, count):
+        for _ in range(count):
+            self.booked += 1
+            slot = AppointmentSlot.objects.create(
+                doctor=self.doctor,
+                date=date.today() + timedelta(days=self.booked),
+                slot_type='morning_1'
+            )
+            book_slot(create_patient(f'listing_patient_{self.booked}'), slot.id, 'Checkup')
+
+    def test_appointment_list(self):
+        self.assertConstantQueries(reverse('appointment:list'), lambda: self.add_bookings(3))
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin_user)
+        for url in [
+            reverse('admin:appointment_appointment_changelist'),
+            reverse('admin:appointment_appointmentslot_changelist'),
+        ]:
+            self.assertConstantQueries(url, lambda: self.add_bookings(3))
+
+
+class PhraseMatcherTestCase(TestCase):
+    """Test the Aho-Corasick phrase matcher"""
+
+    def test_overlapping_matches_with_positions(self):
+        matcher = PhraseMatcher(['pain', 'chest pain', 'heart'])
+
+        self.assertEqual(matcher.find_all('Chest pain near the heart'), [
+            PhraseMatch('chest pain', 0, 10),
+            PhraseMatch('pain', 6, 10),
+            PhraseMatch('heart', 20, 25),
+        ])
+
+    def test_word_boundaries_and_plurals(self):
+        matcher = PhraseMatcher(['ear', 'ulcer', 'headache'])
+
+        self.assertEqual(matcher.find_all('my heart and ulcerative colitis'), [])
+        self.assertEqual(
+            [m.phrase for m in matcher.find_all('ear pain, ulcers and headaches')],
+            ['ear', 'ulcer', 'headache']
+        )
+
+    def test_spans_index_original_text(self):
+        matcher = PhraseMatcher(['headache'])
+        # 'İ' lowercases to 'i' plus a combining dot, one code point longer
+        text = 'İİ headache'
+
+        self.assertEqual(len(text.lower()), len(text) + 2)
+        [match] = matcher.find_all(text)
+        self.assertEqual(text[match.start:match.end], 'headache')
+
+
+class ChatbotMatchingTestCase(TestCase):
+    """Test specialization matching in the appointment chatbot"""
+
+    def setUp(self):
+        self.chatbot = AppointmentChatbot()
+
+    def test_disease_and_keyword_scores(self):
+        """Diseases score 3 and keywords 1 per distinct mention"""
+        scores = {
+            spec['name']: spec['score']
+            for spec in self.chatbot._find_specializations('chest pain, chest pain and a cough')
+        }
+
+        # "chest pain" + "pain" diseases, "chest pain" keyword
+        self.assertEqual(scores['Cardiology'], 4)
+        # "cough" disease and keyword
+        self.assertEqual(scores['Pulmonology'], 4)
+
+    def test_no_substring_false_hits(self):
+        """Short keywords no longer fire inside longer words"""
+        specs = [spec['name'] for spec in self.chatbot._find_specializations('my heart races')]
+
+        self.assertIn('Cardiology', specs)
+        self.assertNotIn('ENT', specs)
+
+    def test_analysis_reports_match_positions(self):
+        result = self.chatbot.analyze_user_input('I have severe headaches')
+
+        self.assertEqual(result['specializations'][0]['name'], 'Neurology')
+        self.assertEqual(result['matches'], [{'phrase': 'headache', 'start': 14, 'end': 22}])
+
+    def test_ml_analysis_is_opt_in(self):
+        self.assertIsNone(self.chatbot.analyze_user_input('fever and a cough')['ml_analysis'])
+
+        result = self.chatbot.analyze_user_input('fever and a cough', use_ml=True)
+
+        self.assertEqual(
+            [s['symptom_name'] for s in result['ml_analysis']['symptoms']], ['Fever', 'Cough']
+        )
+        spec_names = [spec['name'] for spec in result['specializations']]
+        self.assertEqual(len(spec_names), len(set(spec_names)))
+
+
+class SemanticMatcherTestCase(TestCase):
+    """Test the TF-IDF fallback for free-text chatbot input"""
+
+    def setUp(self):
+        self.chatbot = AppointmentChatbot()
+
+    def test_paraphrases_reach_the_right_specialization(self):
+        for message, expected in [
+            ("I can't catch my breath", 'Pulmonology'),
+            ('my heartbeats feel irregular', 'Cardiology'),
+            ('my knees ache when I climb stairs', 'Orthopedics'),
+            ('itchy red blotches all over', 'Dermatology'),
+        ]:
+            with self.subTest(message=message):
+                result = self.chatbot.analyze_user_input(message)
+                # No seeded keyword or disease: only the similarity ranking applies
+                self.assertEqual(result['matches'], [])
+                self.assertEqual(result['specializations'][0]['name'], expected)
+
+    def test_exact_matches_take_precedence(self):
+        specs = self.chatbot._find_specializations('i have asthma')
+
+        self.assertEqual(specs[0]['score'], 4)
+
+    def test_unrelated_text_has_no_ranking(self):
+        self.assertEqual(self.chatbot._find_specializations('hello there'), [])
+
+    def test_matrix_fitted_once_per_knowledge(self):
+        knowledge = get_knowledge()
+        matcher = get_semantic_matcher(knowledge)
+
+        self.assertIs(get_semantic_matcher(knowledge), matcher)
+        self.assertEqual(matcher.matrix.shape[0], len(matcher.specializations))
+        self.assertIsInstance(SemanticMatcher({'Cardiology': 'heart'}).rank('heart')[0][1], float)
+
+
+class ChatbotStreamTestCase(TestCase):
+    """Test the server-sent events chatbot endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctors = [create_doctor(f'stream_{i}', 'Cardiology', 5 + i) for i in range(2)]
+        self.client.force_login(create_patient('stream_patient').user)
+
+    def post(self, payload):
+        return self.client.post(
+            reverse('appointment:chatbot_stream'), json.dumps(payload), content_type='application/json'
+        )
+
+    def read_events(self, response):
+        events = []
+        for block in b''.join(response.streaming_content).decode().strip().split('\n\n'):
+            event, data = block.split('\n')
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_analysis_streams_before_doctors(self):
+        response = self.post({'message': 'I have arrhythmia'})
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self.read_events(response)
+        self.assertEqual(
+            [event for event, _ in events], ['analysis', 'doctor', 'doctor', 'message', 'done']
+        )
+        self.assertEqual(events[0][1]['specializations'][0]['name'], 'Cardiology')
+        self.assertEqual([data['id'] for event, data in events[1:3]], [d.id for d in reversed(self.doctors)])
+        self.assertIn('Cardiology specialist', events[3][1]['response'])
+
+    def test_stream_matches_batch_analysis(self):
+        message = 'persistent cough and asthma'
+        events = dict(self.read_events(self.post({'message': message})))
+        result = AppointmentChatbot().analyze_user_input(message)
+
+        self.assertEqual(events['analysis']['specializations'], result['specializations'])
+        self.assertEqual(events['message']['response'], result['message'])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post({'message': '  '}).status_code, 400)
+        response = self.client.post(
+            reverse('appointment:chatbot_stream'), 'not json', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ChatbotConversationTestCase(TestCase):
+    """Test follow-up turns filtering the cached candidate doctors"""
+
+    def setUp(self):
+        cache.clear()
+        tomorrow = date.today() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior = create_doctor('conv_senior', 'Cardiology', 15)
+            self.junior = create_doctor('conv_junior', 'Cardiology', 4)
+            AppointmentSlot.objects.create(doctor=self.senior, date=tomorrow, slot_type='afternoon_1')
+            AppointmentSlot.objects.create(doctor=self.junior, date=tomorrow, slot_type='morning_1')
+        self.client.force_login(create_patient('conv_patient').user)
+        self.url = reverse('appointment:chatbot_analyze')
+
+    def say(self, message):
+        return self.client.post(self.url, json.dumps({'message': message}), content_type='application/json').json()
+
+    def test_parse_refinement(self):
+        self.assertEqual(parse_refinement('only doctors with 10+ years'), {'min_experience': 10})
+        self.assertEqual(parse_refinement('Morning slots please'), {'slot_period': 'morning'})
+        self.assertEqual(parse_refinement('thanks'), {})
+        self.assertEqual(parse_refinement('10 years of experience'), {'min_experience': 10})
+        # Durations and times of day describe symptoms, not filters
+        self.assertEqual(parse_refinement("I've been coughing for 2 years"), {})
+        self.assertEqual(parse_refinement('it gets worse every morning'), {})
+
+    def test_follow_ups_filter_cached_candidates(self):
+        first = self.say('I have arrhythmia')
+        self.assertIsNone(first['refinement'])
+        self.assertEqual(len(first['doctors']), 2)
+
+        with self.assertNumQueries(2):  # session and user lookups only
+            second = self.say('only doctors with 10+ years')
+        self.assertEqual([d['id'] for d in second['doctors']], [self.senior.id])
+        self.assertEqual(second['specializations'], first['specializations'])
+
+        # Filters accumulate; the slot check is one query over the candidates
+        with self.assertNumQueries(3):
+            third = self.say('morning slots')
+        self.assertEqual(third['doctors'], [])
+        self.assertEqual(third['refinement'], {'min_experience': 10, 'slot_period': 'morning'})
+
+    def test_inflected_symptoms_restart_analysis(self):
+        """Symptoms without an exact phrase match still start a fresh analysis"""
+        self.say('I have chest pain')
+
+        for message in ["I've been coughing for 2 years", 'coughing a lot, 10+ years doctors please']:
+            with self.subTest(message=message):
+                result = self.say(message)
+                self.assertIsNone(result['refinement'])
+                self.assertEqual(result['specializations'][0]['name'], 'Pulmonology')
+
+    def test_new_symptoms_restart_analysis(self):
+        self.say('I have arrhythmia')
+
+        result = self.say('actually it is asthma, 10 years now')
+
+        self.assertIsNone(result['refinement'])
+        self.assertEqual(result['specializations'][0]['name'], 'Pulmonology')
+
+    def test_recommendations_and_candidates_ranked_once(self):
+        chatbot = AppointmentChatbot()
+        conversation = Conversation(session_key='ranked_once')
+        analysis = chatbot._analyze('I have arrhythmia')
+
+        with mock.patch.object(chatbot, '_get_recommended_doctors', wraps=chatbot._get_recommended_doctors) as rank:
+            doctors = chatbot._recommend(analysis, {}, conversation)
+
+        rank.assert_called_once()
+        self.assertEqual(doctors, conversation.candidates[:10])
+        self.assertEqual([d['id'] for d in doctors], [self.senior.id, self.junior.id])
+
+    def test_state_is_bounded(self):
+        conversation = Conversation(session_key='bounded')
+        conversation.start([], 50, [{'id': i, 'experience_years': i} for i in range(MAX_CANDIDATES + 10)])
+        self.assertEqual(len(conversation.candidates), MAX_CANDIDATES)
+
+        conversation.turns = MAX_TURNS
+        self.assertFalse(conversation.active)
+        self.assertIsNone(AppointmentChatbot()._refine(conversation, 'morning slots', {}))
+
+
+class ChatbotKnowledgeTestCase(TestCase):
+    """Test the shared chatbot knowledge tables"""
+
+    def test_knowledge_shared_and_immutable(self):
+        """Chatbots share one pre-indexed knowledge object that cannot be mutated"""
+        first, second = AppointmentChatbot(), AppointmentChatbot()
+
+        self.assertIs(first.knowledge, second.knowledge)
+        self.assertIs(first.matcher, second.matcher)
+        with self.assertRaises(TypeError):
+            first.disease_specialization_map['new disease'] = ('Cardiology',)
+        self.assertIn('arrhythmia', first.specialization_diseases['Cardiology'])
+        self.assertIn('Cardiology', first.keyword_specializations['heart'])
+
+    def test_specialization_info(self):
+        chatbot = AppointmentChatbot()
+
+        self.assertEqual(chatbot.get_specialization_info('Cardiology')['treats'][0], 'Heart disease')
+        self.assertEqual(chatbot.get_specialization_info('Urology')['description'], 'Urology specialist')
+        self.assertEqual(len(chatbot.get_quick_suggestions()), 10)
+
+    def test_reload_on_file_change(self):
+        """Editing the data file is picked up without a restart"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'knowledge.json')
+            with open(path, 'w') as f:
+                json.dump({'disease_specializations': {'gout': ['Rheumatology']}}, f)
+
+            with mock.patch.object(chatbot_module, 'KNOWLEDGE_FILE', path):
+                self.assertEqual(dict(get_knowledge().disease_specialization_map), {'gout': ('Rheumatology',)})
+
+                with open(path, 'w') as f:
+                    json.dump({'disease_specializations': {'sciatica': ['Neurology']}}, f)
+                os.utime(path, (0, get_knowledge().mtime + 1))
+
+                self.assertIn('sciatica', get_knowledge().disease_specialization_map)
+
+        chatbot_module.reload_knowledge()
+
+
+class DoctorDirectoryTestCase(TestCase):
+    """Test chatbot recommendations served from the cached doctor directory"""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior = create_doctor('dir_senior', 'Cardiology', 20)
+            self.junior = create_doctor('dir_junior', 'Cardiology', 3)
+            self.neuro = create_doctor('dir_neuro', 'Neurology', 8)
+        self.chatbot = AppointmentChatbot()
+        self.cardiology = [{'name': 'Cardiology', 'relevance': 30}]
+
+    def test_recommendations_hit_no_database_once_warm(self):
+        self.chatbot._get_recommended_doctors(self.cardiology, {})
+
+        with self.assertNumQueries(0):
+            doctors = self.chatbot._get_recommended_doctors(self.cardiology, {})
+
+        self.assertEqual([d['id'] for d in doctors], [self.senior.id, self.junior.id])
+        self.assertEqual(doctors[0]['name'], 'John Smith')
+        self.assertEqual(doctors[0]['relevance_score'], 100)
+
+    def test_merges_specializations_by_experience(self):
+        specializations = [{'name': 'Neurology'}, {'name': 'Cardiology'}]
+
+        top = get_directory().top_doctors([s['name'] for s in specializations], limit=2)
+
+        self.assertEqual([d['id'] for d in top], [self.senior.id, self.neuro.id])
+
+    def test_min_experience_filter(self):
+        """The chatbot form posts min_experience as a string"""
+        doctors = self.chatbot._get_recommended_doctors(self.cardiology, {'min_experience': '5'})
+
+        self.assertEqual([d['id'] for d in doctors], [self.senior.id])
+
+    def test_invalidated_on_approval_change(self):
+        self.chatbot._get_recommended_doctors(self.cardiology, {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior.approval_status = 'rejected'
+            self.senior.save()
+        doctors = self.chatbot._get_recommended_doctors(self.cardiology, {})
+
+        self.assertEqual([d['id'] for d in doctors], [self.junior.id])
+
+    def test_invalidated_on_name_change_but_not_login(self):
+        directory = get_directory()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior.user.last_login = timezone.now()
+            self.senior.user.save(update_fields=['last_login'])
+        self.assertIs(get_directory(), directory)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.senior.user.first_name = 'Jane'
+            self.senior.user.save()
+        self.assertEqual(get_directory().top_doctors(['Cardiology'])[0]['name'], 'Jane Smith')
+
+
+class ConcurrentBookingTestCase(TransactionTestCase):
+    """Fire many parallel bookings at one slot"""
+
+    WORKERS = 8
+
+    def setUp(self):
+        self.doctor = create_doctor()
+        self.slot = AppointmentSlot.objects.create(
+            doctor=self.doctor,
+            date=date.today() + timedelta(days=1),
+            slot_type='morning_1'
+        )
+        self.patients = [create_patient(f'patient_{i}') for i in range(self.WORKERS)]
+
+    def test_parallel_bookings_single_winner(self):
+        """Exactly one concurrent booking wins; the rest are told the slot is taken"""
+        barrier = threading.Barrier(self.WORKERS)
+        results = []
+        errors = []
+
+        def worker(patient):
+            try:
+                barrier.wait()
+                results.append(book_slot(patient, self.slot.id, 'Concurrent booking'))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(p,)) for p in self.patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(1 for r in results if r.success), 1)
+        self.assertEqual(
+            sum(1 for r in results if r.status == BookingResult.TAKEN),
+            self.WORKERS - 1
+        )
+        self.assertEqual(Appointment.objects.filter(appointment_slot=self.slot).count(), 1)
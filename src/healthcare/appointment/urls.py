@@ -11,8 +11,10 @@ urlpatterns = [
     # Chatbot URLs
     path('chatbot/', views.appointment_chatbot, name='chatbot'),
     path('api/chatbot/analyze/', views.chatbot_analyze, name='chatbot_analyze'),
+    path('api/chatbot/stream/', views.chatbot_stream, name='chatbot_stream'),
     path('api/chatbot/suggestions/', views.chatbot_suggestions, name='chatbot_suggestions'),
     path('api/specialization/<str:specialization>/', views.specialization_info, name='specialization_info'),
     path('api/specialization/<str:specialization>/doctors/', views.specialization_doctors_links, name='specialization_doctors_links'),
+    path('api/specialization/<str:specialization>/next-slots/', views.next_available_slots, name='next_available_slots'),
     path('api/doctor/<int:doctor_id>/availability/', views.doctor_availability, name='doctor_availability'),
 ] 
\ No newline at end of file
@@ -1,11 +1,22 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.utils.cache import patch_cache_control
 import json
-from .models import Appointment
+from datetime import date, datetime, timedelta
+from doctor.models import Doctor
+from .models import Appointment, AppointmentSlot
+from healthcare.async_views import async_condition, async_login_required, async_require_http_methods
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_patient
+from .availability import aget_cached_payload, availability_etag
 from .chatbot import AppointmentChatbot
+from .conversation import load_conversation, save_conversation
+from .services import find_next_available_slots
 
 def appointment_home(request):
     return HttpResponse("""
@@ -20,7 +31,9 @@ def appointment_home(request):
     """)
 
 def appointment_list(request):
-    appointments = Appointment.objects.all()[:10]  # Show latest 10 appointments
+    appointments = Appointment.objects.select_related(
+        'patient__user', 'doctor__user'
+    )[:10]  # Show latest 10 appointments
     
     appointment_html = ""
     for apt in appointments:
@@ -63,7 +76,7 @@ def appointment_chatbot(request):
     """Main chatbot interface for appointment recommendations"""
     try:
         from patient.models import Patient
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         return render(request, 'appointment/chatbot_error.html', {
             'error': 'Patient profile not found. Please complete your profile first.'
@@ -79,9 +92,10 @@ def appointment_chatbot(request):
     
     return render(request, 'appointment/chatbot.html', context)
 
-@login_required
-@require_http_methods(["POST"])
-def chatbot_analyze(request):
+@async_login_required
+@async_require_http_methods(["POST"])
+@read_from_replica
+async def chatbot_analyze(request):
     """API endpoint for chatbot analysis"""
     try:
         data = json.loads(request.body)
@@ -93,16 +107,25 @@ def chatbot_analyze(request):
                 'error': 'Please provide a message describing your condition or symptoms.'
             }, status=400)
         
-        # Initialize chatbot and analyze
+        # Initialize chatbot and analyze; follow-ups reuse the session's candidates
         chatbot = AppointmentChatbot()
-        result = chatbot.analyze_user_input(user_message, criteria)
+        conversation = await sync_to_async(load_conversation)(request.session.session_key)
+        result = await chatbot.aanalyze_user_input(
+            user_message, criteria,
+            use_ml=bool(data.get('use_ml')),
+            conversation=conversation
+        )
+        await sync_to_async(save_conversation)(conversation)
         
         return JsonResponse({
             'success': True,
             'response': result['message'],
             'doctors': result['recommended_doctors'],
             'specializations': result['specializations'],
-            'confidence': result['confidence']
+            'confidence': result['confidence'],
+            'matches': result['matches'],
+            'ml_analysis': result['ml_analysis'],
+            'refinement': result['refinement']
         })
         
     except json.JSONDecodeError:
@@ -114,6 +137,52 @@ def chatbot_analyze(request):
             'error': f'An error occurred: {str(e)}'
         }, status=500)
 
+@login_required
+@require_http_methods(["POST"])
+def chatbot_stream(request):
+    """Server-sent events variant of chatbot_analyze"""
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'error': 'Invalid JSON data provided.'
+        }, status=400)
+    
+    user_message = data.get('message', '').strip()
+    if not user_message:
+        return JsonResponse({
+            'error': 'Please provide a message describing your condition or symptoms.'
+        }, status=400)
+    
+    conversation = load_conversation(request.session.session_key)
+    
+    def events():
+        yield from AppointmentChatbot().stream_analysis(
+            user_message,
+            data.get('criteria', {}),
+            use_ml=bool(data.get('use_ml')),
+            conversation=conversation
+        )
+        save_conversation(conversation)
+    
+    response = StreamingHttpResponse(_sse_stream(events()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _sse_stream(events):
+    try:
+        for event, payload in events:
+            yield _sse_event(event, payload)
+    except Exception as e:
+        yield _sse_event('error', {'error': f'An error occurred: {str(e)}'})
+        return
+    yield _sse_event('done', {})
+
+def _sse_event(event, payload):
+    return f'event: {event}\ndata: {json.dumps(payload, cls=DjangoJSONEncoder)}\n\n'
+
 @login_required
 def chatbot_suggestions(request):
     """API endpoint for quick suggestions"""
@@ -135,47 +204,24 @@ def specialization_info(request, specialization):
         'info': info
     })
 
-@login_required
-def doctor_availability(request, doctor_id):
+def _doctor_availability_etag(request, doctor_id):
+    return availability_etag('doctor', doctor_id, date.today())
+
+
+@async_login_required
+@async_condition(etag_func=_doctor_availability_etag)
+async def doctor_availability(request, doctor_id):
     """API endpoint to check doctor availability"""
     try:
-        from doctor.models import Doctor
-        from appointment.models import AppointmentSlot
-        from datetime import date, timedelta
-        
-        doctor = Doctor.objects.get(id=doctor_id, approval_status='approved')
-        
-        # Get available slots for the next 30 days
         today = date.today()
-        end_date = today + timedelta(days=30)
-        
-        available_slots = AppointmentSlot.objects.filter(
-            doctor=doctor,
-            date__range=[today, end_date],
-            appointment__isnull=True
-        ).order_by('date', 'slot_type')[:20]
+        payload = await aget_cached_payload(
+            'doctor', doctor_id, today,
+            lambda: _build_doctor_availability(doctor_id, today)
+        )
         
-        slots_data = []
-        for slot in available_slots:
-            slots_data.append({
-                'id': slot.id,
-                'date': slot.date.strftime('%Y-%m-%d'),
-                'slot_type': slot.slot_type,
-                'slot_display': slot.get_slot_type_display(),
-                'start_time': slot.start_time.strftime('%H:%M'),
-                'end_time': slot.end_time.strftime('%H:%M')
-            })
-        
-        return JsonResponse({
-            'doctor': {
-                'id': doctor.id,
-                'name': doctor.user.get_full_name(),
-                'specialization': doctor.specialization,
-                'experience_years': doctor.experience_years,
-                'phone': doctor.phone
-            },
-            'available_slots': slots_data
-        })
+        response = JsonResponse(payload)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
         
     except Doctor.DoesNotExist:
         return JsonResponse({
@@ -186,6 +232,40 @@ def doctor_availability(request, doctor_id):
             'error': f'An error occurred: {str(e)}'
         }, status=500)
 
+async def _build_doctor_availability(doctor_id, today):
+    """Build the availability payload for the next 30 days"""
+    doctor = await Doctor.objects.select_related('user').aget(id=doctor_id, approval_status='approved')
+    
+    end_date = today + timedelta(days=30)
+    
+    available_slots = AppointmentSlot.objects.filter(
+        doctor=doctor,
+        date__range=[today, end_date],
+        appointment__isnull=True
+    ).order_by('date', 'slot_type')[:20]
+    
+    slots_data = []
+    async for slot in available_slots:
+        slots_data.append({
+            'id': slot.id,
+            'date': slot.date.strftime('%Y-%m-%d'),
+            'slot_type': slot.slot_type,
+            'slot_display': slot.get_slot_type_display(),
+            'start_time': slot.start_time.strftime('%H:%M'),
+            'end_time': slot.end_time.strftime('%H:%M')
+        })
+    
+    return {
+        'doctor': {
+            'id': doctor.id,
+            'name': doctor.user.get_full_name(),
+            'specialization': doctor.specialization,
+            'experience_years': doctor.experience_years,
+            'phone': doctor.phone
+        },
+        'available_slots': slots_data
+    }
+
 @login_required
 def specialization_doctors_links(request, specialization):
     """API endpoint to get direct links to doctors by specialization"""
@@ -225,3 +305,56 @@ def specialization_doctors_links(request, specialization):
         return JsonResponse({
             'error': f'An error occurred: {str(e)}'
         }, status=500)
+
+
+@login_required
+def next_available_slots(request, specialization):
+    """API endpoint for the earliest free slots across a specialization"""
+    try:
+        start_date = request.GET.get('start')
+        end_date = request.GET.get('end')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return JsonResponse({
+            'error': 'Invalid start, end or limit parameter.'
+        }, status=400)
+    
+    slot_types = [slot_type for slot_type in request.GET.get('slot_types', '').split(',') if slot_type]
+    unknown = [slot_type for slot_type in slot_types if slot_type not in AppointmentSlot.SLOT_TIMES]
+    if unknown:
+        return JsonResponse({
+            'error': f"Unknown slot type: {', '.join(unknown)}. "
+                     f"Choose from {', '.join(AppointmentSlot.SLOT_TIMES)}."
+        }, status=400)
+    
+    slots = find_next_available_slots(
+        specialization,
+        start_date=start_date,
+        end_date=end_date,
+        slot_types=slot_types,
+        limit=limit
+    )
+    
+    slots_data = []
+    for slot in slots:
+        slots_data.append({
+            'id': slot.id,
+            'date': slot.date.strftime('%Y-%m-%d'),
+            'slot_type': slot.slot_type,
+            'slot_display': slot.get_slot_type_display(),
+            'start_time': slot.start_time.strftime('%H:%M'),
+            'end_time': slot.end_time.strftime('%H:%M'),
+            'doctor': {
+                'id': slot.doctor.id,
+                'name': slot.doctor.user.get_full_name(),
+                'experience_years': slot.doctor.experience_years,
+            },
+            'booking_link': f'/patient/appointments/book/{slot.id}/',
+        })
+    
+    return JsonResponse({
+        'specialization': specialization,
+        'slots': slots_data
+    })
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Login throughput benchmark for the capped bcrypt hasher
+
+    python benchmark_login.py [--threads 16] [--logins 200] [--rounds 12] [--workers N]
+
+Migrates a throwaway SQLite database, registers patients, then posts to
+the patient login view from many threads and reports logins per second,
+logins per second per hashing slot (one slot per core by default)
+and how long hashes waited for a slot.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--logins', type=int, default=200, help='total logins')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt work factor')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='concurrent hashes (PASSWORD_HASHING_WORKERS)')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='healthcare-bench-')
+    os.environ.update({
+        'DB_ENGINE': 'sqlite3',
+        'DB_NAME': os.path.join(tmp, 'bench.sqlite3'),
+        'SQLITE_TUNING': 'True',
+        'PASSWORD_BCRYPT_ROUNDS': str(args.rounds),
+        'PASSWORD_HASHING_WORKERS': str(args.workers),
+    })
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare.settings')
+    sys.path.insert(0, BASE_DIR)
+
+    import django
+    django.setup()
+
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    from healthcare.hashers import hashing_stats
+    from patient.models import Patient
+
+    call_command('migrate', verbosity=0)
+    password = make_password('bench-pass-123')
+    for i in range(args.threads):
+        user = User.objects.create(username=f'bench_{i}', password=password, first_name='Bench')
+        Patient.objects.create(user=user)
+    connection.close()
+    hashing_stats.reset()
+
+    url = reverse('patient:login')
+    per_thread = args.logins // args.threads
+    failures = []
+
+    def login(index):
+        client = Client()
+        try:
+            for _ in range(per_thread):
+                response = client.post(url, {'username': f'bench_{index}', 'password': 'bench-pass-123'})
+                if response.status_code != 302:
+                    failures.append(response.status_code)
+                client.cookies.clear()
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=login, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    logins = per_thread * args.threads
+    stats = hashing_stats.snapshot()
+    print(f'rounds={args.rounds} workers={args.workers} clients={args.threads}')
+    print(f'logins/s           {logins / elapsed:8.1f}')
+    print(f'logins/s/core      {logins / elapsed / args.workers:8.1f}')
+    print(f'hashes per login   {stats["hashes"] / logins:8.2f}')
+    print(f'avg hash ms        {stats["avg_hash_ms"]:8.1f}')
+    print(f'avg slot wait ms   {stats["avg_wait_ms"]:8.1f}')
+    print(f'max slot wait ms   {stats["max_wait_ms"]:8.1f}')
+    if failures:
+        print(f'failed logins      {len(failures):8}')
+
+
+if __name__ == '__main__':
+    main()
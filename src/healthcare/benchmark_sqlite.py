@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+SQLite concurrency benchmark: default settings vs SQLITE_TUNING
+
+    python benchmark_sqlite.py [--threads 8] [--operations 50]
+
+Each run migrates a fresh database file, then concurrent threads book
+slots (appointment.services.book_slot) and save quick self-tests while
+reader threads keep listing available slots. Each mode runs in its own
+process so the settings are read fresh.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+READERS = 2
+
+
+def run_worker(threads, operations):
+    """Run the benchmark against the configured database and print JSON results"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare.settings')
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import OperationalError, connection, transaction
+
+    from appointment.models import AppointmentSlot
+    from appointment.services import BookingResult, book_slot
+    from doctor.models import Doctor
+    from patient.models import Patient
+    from selftest.models import SelfTest, Symptom, SymptomReport
+
+    call_command('migrate', verbosity=0)
+
+    doctor = Doctor.objects.create(
+        user=User.objects.create_user(username='bench_doctor', password='x'),
+        specialization='Cardiology',
+        license_number='BENCH-1',
+        approval_status='approved',
+    )
+    patients = [
+        Patient.objects.create(user=User.objects.create_user(username=f'bench_patient_{i}', password='x'))
+        for i in range(threads)
+    ]
+    symptoms = [
+        Symptom.objects.create(name=name, category='General')
+        for name in ('Headache', 'Fever', 'Cough')
+    ]
+    slot_types = list(AppointmentSlot.SLOT_TIMES)
+    days = -(-threads * operations // len(slot_types))
+    AppointmentSlot.objects.bulk_create([
+        AppointmentSlot(doctor=doctor, date=date.today() + timedelta(days=day + 1), slot_type=slot_type)
+        for day in range(days)
+        for slot_type in slot_types
+    ])
+    slot_ids = list(AppointmentSlot.objects.order_by('id').values_list('id', flat=True))
+    connection.close()
+
+    counts = {'booked': 0, 'busy': 0, 'saved': 0, 'locked': 0, 'reads': 0}
+    counts_lock = threading.Lock()
+    done = threading.Event()
+
+    def count(key):
+        with counts_lock:
+            counts[key] += 1
+
+    def book(index):
+        patient = patients[index]
+        try:
+            for slot_id in slot_ids[index::threads][:operations]:
+                result = book_slot(patient, slot_id, 'benchmark')
+                count('booked' if result.status == BookingResult.BOOKED else 'busy')
+        finally:
+            connection.close()
+
+    def save_quick_test(index):
+        patient = patients[index]
+        try:
+            for _ in range(operations):
+                try:
+                    # Same writes as the quick_test view
+                    with transaction.atomic():
+                        self_test = SelfTest.objects.create(
+                            patient=patient, risk_level='low', predicted_diseases=[]
+                        )
+                        for symptom in symptoms:
+                            SymptomReport.objects.create(
+                                self_test=self_test, symptom=symptom, severity=2, duration_days=1
+                            )
+                    count('saved')
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    count('locked')
+        finally:
+            connection.close()
+
+    def read():
+        try:
+            while not done.is_set():
+                list(AppointmentSlot.objects.filter(is_available=True).values_list('id', flat=True)[:50])
+                count('reads')
+        finally:
+            connection.close()
+
+    writers = [threading.Thread(target=book, args=(i,)) for i in range(threads)]
+    writers += [threading.Thread(target=save_quick_test, args=(i,)) for i in range(threads)]
+    readers = [threading.Thread(target=read) for _ in range(READERS)]
+
+    started = time.perf_counter()
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    counts['seconds'] = round(elapsed, 3)
+    print(json.dumps(counts))
+
+
+def run_mode(tuned, threads, operations):
+    """Run one benchmark process against a fresh database file"""
+    with tempfile.TemporaryDirectory(prefix='healthcare-bench-') as tmp:
+        env = dict(
+            os.environ,
+            DB_ENGINE='sqlite3',
+            DB_NAME=os.path.join(tmp, 'bench.sqlite3'),
+            SQLITE_TUNING=str(tuned),
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', '--threads', str(threads), '--operations', str(operations)],
+            cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='booking threads and quick-test threads')
+    parser.add_argument('--operations', type=int, default=50, help='operations per thread')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.threads, args.operations)
+        return
+
+    print(f'{"mode":8} {"bookings/s":>11} {"tests/s":>9} {"reads/s":>9} {"busy":>6} {"locked":>7}')
+    for label, tuned in (('default', False), ('tuned', True)):
+        result = run_mode(tuned, args.threads, args.operations)
+        seconds = result['seconds']
+        print(
+            f'{label:8} {result["booked"] / seconds:11.1f} {result["saved"] / seconds:9.1f} '
+            f'{result["reads"] / seconds:9.1f} {result["busy"]:6} {result["locked"]:7}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import transaction
 from django.utils import timezone
 from django.contrib import messages
 from .models import Doctor
+from .signals import doctors_bulk_updated
 
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
@@ -9,6 +12,7 @@ class DoctorAdmin(admin.ModelAdmin):
     list_filter = ['approval_status', 'specialization', 'experience_years', 'created_at']
     search_fields = ['user__first_name', 'user__last_name', 'license_number', 'specialization']
     readonly_fields = ['created_at', 'updated_at', 'approved_by', 'approved_at']
+    list_select_related = ['user']
     
     fieldsets = (
         ('Doctor Information', {
@@ -26,15 +30,11 @@ class DoctorAdmin(admin.ModelAdmin):
     actions = ['approve_doctors', 'reject_doctors']
     
     def approve_doctors(self, request, queryset):
-        updated = 0
-        for doctor in queryset.filter(approval_status='pending'):
-            doctor.approval_status = 'approved'
-            doctor.approved_by = request.user
-            doctor.approved_at = timezone.now()
-            doctor.user.is_active = True  # Activate the user account
-            doctor.user.save()
-            doctor.save()
-            updated += 1
+        updated = self._bulk_set_status(
+            queryset, 'approved', is_active=True,  # Activate the user accounts
+            approved_by=request.user,
+            approved_at=timezone.now()
+        )
         
         self.message_user(
             request,
@@ -44,13 +44,7 @@ class DoctorAdmin(admin.ModelAdmin):
     approve_doctors.short_description = "Approve selected doctors"
     
     def reject_doctors(self, request, queryset):
-        updated = 0
-        for doctor in queryset.filter(approval_status='pending'):
-            doctor.approval_status = 'rejected'
-            doctor.user.is_active = False  # Deactivate the user account
-            doctor.user.save()
-            doctor.save()
-            updated += 1
+        updated = self._bulk_set_status(queryset, 'rejected', is_active=False)  # Deactivate the user accounts
         
         self.message_user(
             request,
@@ -59,14 +53,38 @@ class DoctorAdmin(admin.ModelAdmin):
         )
     reject_doctors.short_description = "Reject selected doctors"
     
+    def _bulk_set_status(self, queryset, status, is_active, **fields):
+        """
+        Move pending doctors to ``status`` with one UPDATE per table.
+        
+        update() skips post_save, so doctors_bulk_updated is sent once on
+        commit to invalidate the doctor directory and availability caches.
+        """
+        with transaction.atomic():
+            # Evaluate the selection once; the locks keep it pending until commit
+            doctor_ids = list(
+                queryset.filter(approval_status='pending').select_for_update().values_list('id', flat=True)
+            )
+            if not doctor_ids:
+                return 0
+            
+            User.objects.filter(doctor__id__in=doctor_ids).update(is_active=is_active)
+            updated = Doctor.objects.filter(id__in=doctor_ids).update(
+                approval_status=status, updated_at=timezone.now(), **fields
+            )
+            
+            transaction.on_commit(
+                lambda: doctors_bulk_updated.send(sender=Doctor, doctor_ids=doctor_ids)
+            )
+        return updated
+    
     def save_model(self, request, obj, form, change):
         if change and 'approval_status' in form.changed_data:
+            # Only the active flag changes, so don't re-save the whole user row
             if obj.approval_status == 'approved':
                 obj.approved_by = request.user
                 obj.approved_at = timezone.now()
-                obj.user.is_active = True
-                obj.user.save()
+                User.objects.filter(pk=obj.user_id).update(is_active=True)
             elif obj.approval_status == 'rejected':
-                obj.user.is_active = False
-                obj.user.save()
+                User.objects.filter(pk=obj.user_id).update(is_active=False)
         super().save_model(request, obj, form, change)
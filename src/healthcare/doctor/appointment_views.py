@@ -2,22 +2,31 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
+from django.db.models import Count, Q
 from django.utils import timezone
-from django.db.models import Q
 from datetime import datetime, timedelta, time, date
 from calendar import monthrange
 import json
 
 from .models import Doctor
+from appointment.availability import get_cached_payload
 from appointment.models import Appointment, AppointmentSlot
 from appointment.forms import AppointmentSlotForm, BulkSlotCreationForm, AppointmentStatusForm
-from patient.models import Patient
+from patient.search import search_patients
+from healthcare.async_views import async_login_required
+from healthcare.keyset import InvalidCursor, keyset_page, page_querystrings
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_doctor
+
+SLOT_LIST_PAGE_SIZE = 50
+SLOT_LIST_ORDERING = ('-date', 'slot_type', 'id')
 
 @login_required
+@read_from_replica
 def appointment_calendar(request):
     """Main calendar view for doctor appointment slots"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         
         # Check if doctor is approved
         if not doctor.is_approved:
@@ -37,12 +46,15 @@ def appointment_calendar(request):
     first_day = date(year, month, 1)
     last_day = date(year, month, monthrange(year, month)[1])
     
-    # Get appointment slots for the month
-    slots = AppointmentSlot.objects.filter(
-        doctor=doctor,
-        date__gte=first_day,
-        date__lte=last_day
-    ).prefetch_related('appointment__patient__user').order_by('date', 'slot_type')
+    # Get appointment slots for the month, cached under the doctor's availability version
+    slots = get_cached_payload(
+        f'calendar:{first_day:%Y-%m}', doctor.id, today,
+        lambda: list(AppointmentSlot.objects.filter(
+            doctor=doctor,
+            date__gte=first_day,
+            date__lte=last_day
+        ).prefetch_related('appointment__patient__user').order_by('date', 'slot_type'))
+    )
     
     # Group slots by date
     slots_by_date = {}
@@ -63,14 +75,11 @@ def appointment_calendar(request):
         next_month = date(year, month + 1, 1)
     
     # Get today's slots
-    today_slots = slots.filter(date=today)
+    today_slots = [slot for slot in slots if slot.date == today]
     
     # Get upcoming slots (next 7 days)
     week_end = today + timedelta(days=7)
-    upcoming_slots = slots.filter(
-        date__gt=today,
-        date__lte=week_end
-    )[:5]
+    upcoming_slots = [slot for slot in slots if today < slot.date <= week_end][:5]
     
     context = {
         'doctor': doctor,
@@ -91,7 +100,7 @@ def appointment_calendar(request):
 def create_appointment_slots(request):
     """Create new appointment slots"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         if not doctor.is_approved:
             messages.error(request, 'Your account is not yet approved.')
             return redirect('doctor:auth_login')
@@ -132,7 +141,7 @@ def create_appointment_slots(request):
 def bulk_create_slots(request):
     """Create multiple appointment slots across date range"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         if not doctor.is_approved:
             messages.error(request, 'Your account is not yet approved.')
             return redirect('doctor:auth_login')
@@ -190,7 +199,7 @@ def bulk_create_slots(request):
 def slot_detail(request, slot_id):
     """View appointment slot details"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         if not doctor.is_approved:
             messages.error(request, 'Your account is not yet approved.')
             return redirect('doctor:auth_login')
@@ -226,7 +235,7 @@ def slot_detail(request, slot_id):
 def delete_slot(request, slot_id):
     """Delete appointment slot"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         if not doctor.is_approved:
             messages.error(request, 'Your account is not yet approved.')
             return redirect('doctor:auth_login')
@@ -255,10 +264,11 @@ def delete_slot(request, slot_id):
     return render(request, 'doctor/appointments/delete_slot.html', context)
 
 @login_required
+@read_from_replica
 def appointment_list(request):
     """List all appointment slots with filtering"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         if not doctor.is_approved:
             messages.error(request, 'Your account is not yet approved.')
             return redirect('doctor:auth_login')
@@ -272,7 +282,7 @@ def appointment_list(request):
     slot_type_filter = request.GET.get('slot_type', '')
     
     # Base queryset
-    slots = AppointmentSlot.objects.filter(doctor=doctor).prefetch_related('appointment__patient__user')
+    slots = AppointmentSlot.objects.filter(doctor=doctor).select_related('appointment__patient__user')
     
     # Apply filters
     if status_filter == 'available':
@@ -290,11 +300,26 @@ def appointment_list(request):
     if slot_type_filter:
         slots = slots.filter(slot_type=slot_type_filter)
     
-    # Order by date and slot type
-    slots = slots.order_by('-date', 'slot_type')
+    # Summary counts for all matching slots in one query
+    summary = slots.aggregate(
+        total=Count('id'),
+        booked=Count('id', filter=Q(appointment__patient__isnull=False)),
+    )
+    summary['available'] = summary['total'] - summary['booked']
+    
+    # Keyset pages, newest date first, seeking on the (doctor, date, slot_type) index
+    try:
+        page = keyset_page(slots, SLOT_LIST_ORDERING, request.GET.get('cursor'), SLOT_LIST_PAGE_SIZE)
+    except InvalidCursor:
+        page = keyset_page(slots, SLOT_LIST_ORDERING, None, SLOT_LIST_PAGE_SIZE)
+    first_query, next_query = page_querystrings(request.GET, page)
     
     context = {
-        'slots': slots,
+        'slots': page.items,
+        'summary': summary,
+        'is_first_page': not request.GET.get('cursor'),
+        'first_query': first_query,
+        'next_query': next_query,
         'doctor': doctor,
         'status_filter': status_filter,
         'date_filter': date_filter,
@@ -358,11 +383,11 @@ def delete_appointment(request, appointment_id):
     """Legacy view - redirect to slot detail"""
     return redirect('doctor:appointment_detail', appointment_id=appointment_id)
 
-@login_required
-def patient_search_api(request):
+@async_login_required
+async def patient_search_api(request):
     """API endpoint for patient search"""
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = await Doctor.objects.aget(user=request.user)
         if not doctor.is_approved:
             return JsonResponse({'error': 'Not authorized'}, status=403)
     except Doctor.DoesNotExist:
@@ -372,16 +397,11 @@ def patient_search_api(request):
     if len(query) < 2:
         return JsonResponse({'patients': []})
     
-    # Search patients by name or email
-    patients = Patient.objects.filter(
-        Q(user__first_name__icontains=query) |
-        Q(user__last_name__icontains=query) |
-        Q(user__email__icontains=query),
-        user__is_active=True
-    ).select_related('user')[:10]
+    # Search patients by name or email through the trigram index
+    patients = search_patients(query)
     
     patient_data = []
-    for patient in patients:
+    async for patient in patients:
         patient_data.append({
             'id': patient.id,
             'name': patient.user.get_full_name(),
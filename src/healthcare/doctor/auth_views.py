@@ -5,7 +5,8 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
-from rest_framework_simplejwt.tokens import RefreshToken
+from healthcare.profiles import RoleProfile
+from healthcare.tokens import issue_tokens, last_login_batcher
 from .forms import DoctorRegistrationForm, DoctorLoginForm
 from .models import Doctor
 import json
@@ -46,9 +47,8 @@ class DoctorLoginView(View):
     def post(self, request):
         form = DoctorLoginForm(data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
+            # The form already authenticated the user; don't hash the password twice
+            user = form.get_user()
             
             if user is not None:
                 # Check if user is a doctor
@@ -64,7 +64,7 @@ class DoctorLoginView(View):
                         login(request, user)
                         
                         # Generate JWT tokens
-                        refresh = RefreshToken.for_user(user)
+                        refresh = issue_tokens(user, RoleProfile('doctor', doctor))
                         access_token = refresh.access_token
                         
                         # Store tokens in session for web interface
@@ -119,7 +119,8 @@ class DoctorAPILoginView(View):
                         }, status=403)
                     
                     # Generate JWT tokens
-                    refresh = RefreshToken.for_user(user)
+                    refresh = issue_tokens(user, RoleProfile('doctor', doctor))
+                    last_login_batcher.record(user.pk)
                     access_token = refresh.access_token
                     
                     return JsonResponse({
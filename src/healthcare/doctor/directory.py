@@ -0,0 +1,86 @@
+import heapq
+import threading
+import time
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
+
+from django.core.cache import cache
+
+from healthcare.caching import get_or_build, make_key
+from healthcare.routers import primary_reads
+
+from .models import Doctor
+
+
+# The directory is held per process; a generation counter in the shared
+# cache tells every process when to rebuild after a doctor changes. The
+# built directory is shared through the cache too, so only one process
+# queries the database per generation.
+GENERATION_KEY = 'doctor_directory:generation'
+DIRECTORY_TIMEOUT = 60 * 60
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+class DoctorDirectory:
+    """Approved doctors grouped by specialization, sorted by experience"""
+
+    def __init__(self, doctors: Iterable[Doctor], generation=None):
+        self.generation = generation
+        by_specialization = {}
+        for doctor in doctors:
+            by_specialization.setdefault(doctor.specialization, []).append({
+                'id': doctor.id,
+                'name': doctor.user.get_full_name(),
+                'specialization': doctor.specialization,
+                'experience_years': doctor.experience_years,
+                'phone': doctor.phone,
+                'license_number': doctor.license_number,
+            })
+        self.by_specialization: Dict[str, Tuple[dict, ...]] = {
+            spec: tuple(entries) for spec, entries in by_specialization.items()
+        }
+
+    def top_doctors(self, specializations: Iterable[str], min_experience: int = 0,
+                    limit: int = 10) -> List[dict]:
+        """Merge the per-specialization lists into the most experienced doctors"""
+        lists = [self.by_specialization.get(spec, ()) for spec in dict.fromkeys(specializations)]
+        merged = heapq.merge(*lists, key=lambda entry: (-entry['experience_years'], entry['id']))
+        eligible = (entry for entry in merged if entry['experience_years'] >= min_experience)
+        return [dict(entry) for entry in islice(eligible, limit)]
+
+
+def get_directory() -> DoctorDirectory:
+    """Return the process-wide directory, rebuilding it if it was invalidated"""
+    global _directory
+    # Generations start from a timestamp so an evicted counter can't
+    # resurrect a directory cached under an old generation
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+    directory = _directory
+    if directory is None or directory.generation != generation:
+        # Built from the primary: a lagging replica would cache stale doctors
+        with _directory_lock, primary_reads():
+            directory = _directory = get_or_build(
+                make_key('doctor_directory', generation), partial(_build_directory, generation),
+                DIRECTORY_TIMEOUT
+            )
+    return directory
+
+
+def _build_directory(generation) -> DoctorDirectory:
+    doctors = Doctor.objects.filter(
+        approval_status='approved'
+    ).select_related('user').order_by('-experience_years', 'id')
+    return DoctorDirectory(doctors, generation)
+
+
+def invalidate_directory() -> None:
+    """Force every process to rebuild its directory on next use"""
+    global _directory
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+    _directory = None
@@ -0,0 +1,45 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from healthcare.profiles import invalidate_role_profiles
+from .directory import invalidate_directory
+from .models import Doctor
+
+
+# Sent once, after commit, when doctors are changed with queryset.update()
+# (which skips post_save) or their users are saved; receivers get the
+# affected ``doctor_ids``
+doctors_bulk_updated = Signal()
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def doctor_changed(sender, instance, **kwargs):
+    """Rebuild the doctor directory after a profile or approval change"""
+    transaction.on_commit(invalidate_directory)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def doctor_profile_changed(sender, instance, **kwargs):
+    """Drop the cached role profile, which carries the approval status"""
+    transaction.on_commit(partial(invalidate_role_profiles, [instance.user_id]))
+
+
+@receiver(post_save, sender=User)
+def doctor_user_changed(sender, instance, update_fields=None, **kwargs):
+    """Doctor display names come from the user; ignore last_login updates"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    doctor_ids = list(Doctor.objects.filter(user_id=instance.id).values_list('id', flat=True))
+    if doctor_ids:
+        # Also reaches appointment.signals, whose payloads carry the name
+        transaction.on_commit(partial(doctors_bulk_updated.send, sender=Doctor, doctor_ids=doctor_ids))
+
+
+@receiver(doctors_bulk_updated)
+def doctors_bulk_changed(sender, doctor_ids, **kwargs):
+    invalidate_directory()
+    invalidate_role_profiles(Doctor.objects.filter(id__in=doctor_ids).values_list('user_id', flat=True))
@@ -1,12 +1,21 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import date, time, datetime, timedelta
+from django.contrib import admin
+from doctor.admin import DoctorAdmin
 from doctor.models import Doctor
+from doctor.directory import get_directory
 from patient.models import Patient
 from appointment.models import AppointmentSlot, Appointment
+from appointment.availability import get_availability_version
+from healthcare.testing import QueryCountAssertionsMixin, create_doctor, create_patient
 import json
+from unittest import mock
 
 
 class DoctorAppointmentTestCase(TestCase):
@@ -590,4 +599,251 @@ class DoctorAppointmentIntegrationTest(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+
+class DoctorDashboardQueryTest(TestCase):
+    """Query budget for the doctor dashboard"""
+    
+    def setUp(self):
+        """Create a doctor with today's, upcoming and completed appointments"""
+        cache.clear()
+        self.client = Client()
+        
+        self.doctor_user = User.objects.create_user(
+            username='dashboard_doctor',
+            password='testpass123',
+            first_name='Dash',
+            last_name='Board'
+        )
+        self.doctor = Doctor.objects.create(
+            user=self.doctor_user,
+            specialization='Cardiology',
+            license_number='DASH123456',
+            approval_status='approved',
+            approved_at=timezone.now()
+        )
+        
+        today = date.today()
+        for i, (slot_date, slot_type, status) in enumerate([
+            (today, 'morning_1', 'scheduled'),
+            (today, 'morning_2', None),
+            (today + timedelta(days=2), 'afternoon_1', 'confirmed'),
+            (today + timedelta(days=3), 'afternoon_2', 'scheduled'),
+            (today + timedelta(days=4), 'morning_1', None),
+            (today - timedelta(days=2), 'morning_1', 'completed'),
+        ]):
+            slot = AppointmentSlot.objects.create(doctor=self.doctor, date=slot_date, slot_type=slot_type)
+            if status:
+                patient_user = User.objects.create_user(
+                    username=f'dashboard_patient_{i}',
+                    password='testpass123',
+                    first_name='Patient',
+                    last_name=str(i)
+                )
+                Appointment.objects.create(
+                    patient=Patient.objects.create(user=patient_user),
+                    doctor=self.doctor,
+                    appointment_slot=slot,
+                    appointment_date=timezone.make_aware(datetime.combine(slot_date, slot.start_time)),
+                    status=status
+                )
+        
+        self.client.force_login(self.doctor_user)
+    
+    def test_dashboard_query_count(self):
+        """Session, user, doctor, the slot and appointment aggregates and the two slot lists"""
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('doctor:dashboard'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_slots'], 6)
+        self.assertEqual(response.context['booked_slots'], 4)
+        self.assertEqual(response.context['available_slots'], 2)
+        self.assertEqual(response.context['today_slot_count'], 2)
+        self.assertEqual(response.context['completed_appointments'], 1)
+    
+    def test_dashboard_stats_invalidated_on_status_change(self):
+        """Completing an appointment refreshes the cached counters"""
+        self.client.get(reverse('doctor:dashboard'))
+        
+        appointment = Appointment.objects.get(status='confirmed')
+        appointment.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        
+        response = self.client.get(reverse('doctor:dashboard'))
+        self.assertEqual(response.context['completed_appointments'], 2)
+    
+    def test_dashboard_counts_completed_appointments_without_slot(self):
+        """Completed appointments are counted even when they have no slot"""
+        Appointment.objects.create(
+            patient=Patient.objects.first(),
+            doctor=self.doctor,
+            appointment_date=timezone.now() - timedelta(days=7),
+            status='completed'
+        )
+        
+        response = self.client.get(reverse('doctor:dashboard'))
+        
+        self.assertEqual(response.context['completed_appointments'], 2)
+        self.assertEqual(response.context['total_slots'], 6)
+
+
+class DoctorListingQueryTest(QueryCountAssertionsMixin, TestCase):
+    """Doctor listing views must not issue per-row queries"""
+    
+    def setUp(self):
+        cache.clear()
+        self.doctor = create_doctor('listing_doctor')
+        self.doctor_user = self.doctor.user
+        self.rows = 0
+        self.add_rows(2)
+    
+    def add_rows(self, count):
+        """Add booked slots, each with its own patient and doctor"""
+        for _ in range(count):
+            self.rows += 1
+            slot = AppointmentSlot.objects.create(
+                doctor=self.doctor,
+                date=date.today() + timedelta(days=self.rows),
+                slot_type='morning_1'
+            )
+            Appointment.objects.create(
+                patient=create_patient(f'listing_patient_{self.rows}'),
+                doctor=self.doctor,
+                appointment_slot=slot,
+                appointment_date=timezone.now() + timedelta(days=self.rows)
+            )
+            create_doctor(f'listing_doctor_{self.rows}', approval_status='pending')
+    
+    def test_appointment_list(self):
+        self.client.force_login(self.doctor_user)
+        # Warm the cached role profile so both renders run the same queries
+        self.client.get(reverse('doctor:appointment_list'))
+        self.assertConstantQueries(reverse('doctor:appointment_list'), lambda: self.add_rows(3))
+    
+    @mock.patch('doctor.appointment_views.SLOT_LIST_PAGE_SIZE', 2)
+    def test_appointment_list_pages(self):
+        """Slots are keyset-paginated, newest date first; the summary covers every page"""
+        self.add_rows(3)
+        self.client.force_login(self.doctor_user)
+        url = reverse('doctor:appointment_list')
+        
+        seen = []
+        response = self.client.get(url, {'status': 'booked'})
+        self.assertEqual(response.context['summary'], {'total': 5, 'booked': 5, 'available': 0})
+        while True:
+            seen.extend(slot.id for slot in response.context['slots'])
+            if not response.context['next_query']:
+                break
+            self.assertIn('status=booked', response.context['next_query'])
+            response = self.client.get(f"{url}?{response.context['next_query']}")
+        
+        expected = list(AppointmentSlot.objects.order_by('-date', 'slot_type', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+    
+    def test_admin_changelist(self):
+        self.client.force_login(User.objects.create_superuser('listing_admin', 'admin@test.com', 'x'))
+        self.assertConstantQueries(reverse('admin:doctor_doctor_changelist'), lambda: self.add_rows(3))
+
+class DoctorAdminBulkActionTest(TestCase):
+    """Approve/reject actions must not issue per-doctor queries"""
+    
+    def setUp(self):
+        cache.clear()
+        self.admin_user = User.objects.create_superuser('bulk_admin', 'admin@test.com', 'x')
+        self.client.force_login(self.admin_user)
+        self.count = 0
+    
+    def add_pending(self, count):
+        doctors = []
+        for _ in range(count):
+            self.count += 1
+            doctors.append(Doctor.objects.create(
+                user=User.objects.create_user(username=f'bulk_doctor_{self.count}', password='x', is_active=False),
+                specialization='Neurology',
+                license_number=f'BULK-{self.count}'
+            ))
+        return doctors
+    
+    def run_action(self, action, doctors):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(reverse('admin:doctor_doctor_changelist'), {
+                    'action': action,
+                    '_selected_action': [doctor.id for doctor in doctors],
+                })
+        self.assertEqual(response.status_code, 302)
+        return len(context.captured_queries)
+    
+    def test_approve_is_constant_query(self):
+        get_directory()
+        version = get_availability_version()
+        
+        few = self.run_action('approve_doctors', self.add_pending(2))
+        many_doctors = self.add_pending(20)
+        many = self.run_action('approve_doctors', many_doctors)
+        
+        self.assertEqual(few, many)
+        doctor = Doctor.objects.select_related('user', 'approved_by').get(id=many_doctors[0].id)
+        self.assertEqual(doctor.approval_status, 'approved')
+        self.assertEqual(doctor.approved_by, self.admin_user)
+        self.assertIsNotNone(doctor.approved_at)
+        self.assertTrue(doctor.user.is_active)
+        
+        # One batched invalidation: directory and availability caches see the change
+        self.assertEqual(len(get_directory().top_doctors(['Neurology'], limit=50)), 22)
+        self.assertGreater(get_availability_version(), version)
+        self.assertGreater(get_availability_version(doctor.id), version)
+    
+    def test_reject_only_touches_pending(self):
+        pending = self.add_pending(2)
+        approved = self.add_pending(1)[0]
+        Doctor.objects.filter(id=approved.id).update(approval_status='approved')
+        
+        self.run_action('reject_doctors', pending + [approved])
+        
+        self.assertEqual(
+            dict(Doctor.objects.values_list('id', 'approval_status')),
+            {pending[0].id: 'rejected', pending[1].id: 'rejected', approved.id: 'approved'}
+        )
+        self.assertFalse(User.objects.get(doctor=pending[0]).is_active)
+    
+    def test_selection_evaluated_once(self):
+        """The pending filter runs once; both UPDATEs target the selected ids"""
+        doctors = self.add_pending(3)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as context:
+                DoctorAdmin(Doctor, admin.site)._bulk_set_status(Doctor.objects.all(), 'rejected', is_active=False)
+        
+        pending_filters = [q['sql'] for q in context.captured_queries if "'pending'" in q['sql']]
+        self.assertEqual(len(pending_filters), 1)
+        self.assertTrue(pending_filters[0].startswith('SELECT'))
+        self.assertEqual(Doctor.objects.filter(approval_status='rejected').count(), len(doctors))
+
+
+class DoctorRoleProfileTest(TestCase):
+    """The cached doctor profile follows approval changes"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='role_doctor', password='testpass123')
+        self.doctor = Doctor.objects.create(
+            user=self.user, specialization='Cardiology', license_number='ROLE-1'
+        )
+        self.client.force_login(self.user)
+    
+    def test_approval_reaches_cached_profile(self):
+        response = self.client.get(reverse('doctor:appointment_calendar'))
+        self.assertRedirects(response, reverse('doctor:auth_login'), fetch_redirect_response=False)
+        
+        self.doctor.approval_status = 'approved'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor.save()
+        
+        response = self.client.get(reverse('doctor:appointment_calendar'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['doctor'].user, self.user)
+
+
 # Run tests with: python manage.py test doctor.tests
@@ -7,14 +7,17 @@ from datetime import timedelta
 from .models import Doctor
 from .forms import DoctorProfileForm
 from appointment.models import Appointment
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_doctor
 
 def doctor_home(request):
     return render(request, 'doctor/home.html')
 
 @login_required
+@read_from_replica
 def doctor_dashboard(request):
     try:
-        doctor = Doctor.objects.get(user=request.user)
+        doctor = get_doctor(request)
         
         # Check if doctor is approved
         if not doctor.is_approved:
@@ -24,11 +27,12 @@ def doctor_dashboard(request):
         # Get today's appointment slots
         today = timezone.now().date()
         from appointment.models import AppointmentSlot
+        from appointment.services import get_doctor_dashboard_stats
         
         today_slots = AppointmentSlot.objects.filter(
             doctor=doctor,
             date=today
-        ).prefetch_related('appointment__patient__user').order_by('slot_type')
+        ).select_related('appointment__patient__user').order_by('slot_type')
         
         # Get upcoming booked appointments (next 7 days)
         week_end = today + timedelta(days=7)
@@ -37,7 +41,7 @@ def doctor_dashboard(request):
             date__gt=today,
             date__lte=week_end,
             appointment__isnull=False
-        ).prefetch_related('appointment__patient__user').order_by('date', 'slot_type')[:5]
+        ).select_related('appointment__patient__user').order_by('date', 'slot_type')[:5]
         
         # Get recent completed appointments (last 7 days)
         week_start = today - timedelta(days=7)
@@ -48,31 +52,19 @@ def doctor_dashboard(request):
             status='completed'
         ).select_related('patient__user').order_by('-appointment_date')[:5]
         
-        # Calculate statistics
-        total_slots = AppointmentSlot.objects.filter(doctor=doctor).count()
-        booked_slots = AppointmentSlot.objects.filter(
-            doctor=doctor,
-            appointment__isnull=False
-        ).count()
-        available_slots = AppointmentSlot.objects.filter(
-            doctor=doctor,
-            appointment__isnull=True,
-            date__gte=today
-        ).count()
-        completed_appointments = Appointment.objects.filter(
-            doctor=doctor, 
-            status='completed'
-        ).count()
+        # Calculate statistics in a single aggregate query
+        stats = get_doctor_dashboard_stats(doctor)
         
         context = {
             'doctor': doctor,
             'today_slots': today_slots,
             'upcoming_slots': upcoming_slots,
             'recent_appointments': recent_appointments,
-            'total_slots': total_slots,
-            'booked_slots': booked_slots,
-            'available_slots': available_slots,
-            'completed_appointments': completed_appointments,
+            'total_slots': stats['total_slots'],
+            'booked_slots': stats['booked_slots'],
+            'available_slots': stats['available_slots'],
+            'today_slot_count': stats['today_slots'],
+            'completed_appointments': stats['completed_appointments'],
             'today': today,
         }
         
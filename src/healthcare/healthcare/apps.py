@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class HealthcareConfig(AppConfig):
+    """Project-wide hooks that don't belong to any one app"""
+
+    name = 'healthcare'
+
+    def ready(self):
+        from .sqlite import apply_pragmas
+
+        connection_created.connect(apply_pragmas, dispatch_uid='healthcare.sqlite.apply_pragmas')
@@ -0,0 +1,98 @@
+import asyncio
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# Django 4.2's login_required, require_http_methods and condition only wrap
+# sync views; these are the async equivalents used by the JSON APIs.
+
+_executor = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Bounded pool for CPU-bound work (matching, inference) off the event loop"""
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'ASYNC_CPU_WORKERS', None) or min(4, os.cpu_count() or 1)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cpu-bound')
+    return _executor
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """
+    Run ``func`` on the bounded CPU pool.
+
+    Only for code that doesn't touch the ORM: pool threads don't get
+    Django's per-request connection handling. Use sync_to_async for that.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), partial(func, *args, **kwargs))
+
+
+def async_login_required(view_func):
+    """login_required for async views"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        # Resolving request.user hits the session and user tables
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def async_require_http_methods(request_method_list):
+    """require_http_methods for async views"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                return HttpResponseNotAllowed(request_method_list)
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """condition() for async views; the validator functions stay synchronous"""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(_validators)(
+                etag_func, last_modified_func, request, *args, **kwargs
+            )
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def _validators(etag_func, last_modified_func, request, *args, **kwargs):
+    etag = etag_func(request, *args, **kwargs) if etag_func else None
+    if etag is not None:
+        etag = quote_etag(etag)
+
+    last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+    if last_modified:
+        if not timezone.is_aware(last_modified):
+            last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+        last_modified = int(last_modified.timestamp())
+    return etag, last_modified
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import math
+import random
+import time
+import uuid
+from functools import partial, wraps
+
+from django.core.cache import cache
+
+
+# Cache-aside with stampede protection. Entries are stored as
+# (value, build_seconds, expires_at) so readers can refresh a hot key
+# slightly before it expires (probabilistic early expiration, "XFetch"):
+# the slower the build, the earlier a refresh becomes likely. Only the
+# caller that wins the lock rebuilds; everyone else keeps serving the
+# current value, or waits briefly for the winner on a cold miss. The lock
+# holds a per-caller token, so a caller only releases a lock it took.
+VERSION_KEY = 'cache_aside:version:{}'
+LOCK_KEY = '{}:lock'
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.02
+EARLY_EXPIRATION_BETA = 1.0
+
+
+def make_key(namespace, version, *parts) -> str:
+    """Build a cache key; ``parts`` are hashed so any value is key-safe"""
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'{namespace}:{version}:{digest}'
+
+
+def get_namespace_version(namespace) -> int:
+    return cache.get_or_set(VERSION_KEY.format(namespace), 1, timeout=None)
+
+
+def bump_namespace_version(namespace) -> None:
+    """Make every key built with the namespace version unreachable"""
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def get_or_build(key, build, timeout, beta=EARLY_EXPIRATION_BETA, lock_timeout=LOCK_TIMEOUT):
+    """Return the cached value for ``key``, calling ``build()`` at most once across callers"""
+    entry = cache.get(key)
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry[0]
+
+    lock, token = LOCK_KEY.format(key), uuid.uuid4().hex
+    locked = cache.add(lock, token, timeout=lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        entry = _wait_for(key, lock_timeout)
+        if entry is not None:
+            return entry[0]
+
+    try:
+        started = time.monotonic()
+        value = build()
+        cache.set(key, _entry(value, time.monotonic() - started, timeout), timeout=timeout)
+    finally:
+        # A caller that gave up waiting builds without the lock and must
+        # not release the winner's; nor may a slow winner release a lock
+        # retaken after its own expired
+        if locked and cache.get(lock) == token:
+            cache.delete(lock)
+    return value
+
+
+async def aget_or_build(key, build, timeout, beta=EARLY_EXPIRATION_BETA, lock_timeout=LOCK_TIMEOUT):
+    """Async get_or_build; ``build`` is a coroutine function"""
+    entry = await cache.aget(key)
+    if entry is not None and not _should_refresh(entry, beta):
+        return entry[0]
+
+    lock, token = LOCK_KEY.format(key), uuid.uuid4().hex
+    locked = await cache.aadd(lock, token, timeout=lock_timeout)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(WAIT_INTERVAL)
+            entry = await cache.aget(key)
+            if entry is not None:
+                return entry[0]
+
+    try:
+        started = time.monotonic()
+        value = await build()
+        await cache.aset(key, _entry(value, time.monotonic() - started, timeout), timeout=timeout)
+    finally:
+        if locked and await cache.aget(lock) == token:
+            await cache.adelete(lock)
+    return value
+
+
+def cache_aside(namespace, timeout, version=None, beta=EARLY_EXPIRATION_BETA):
+    """
+    Cache a function's results by its arguments.
+
+    Keys embed ``version(*args, **kwargs)`` when given, otherwise the
+    namespace version, which ``func.invalidate()`` bumps.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key_version = version(*args, **kwargs) if version else get_namespace_version(namespace)
+            key = make_key(namespace, key_version, args, sorted(kwargs.items()))
+            return get_or_build(key, partial(func, *args, **kwargs), timeout, beta)
+        wrapper.invalidate = partial(bump_namespace_version, namespace)
+        return wrapper
+    return decorator
+
+
+def _entry(value, build_seconds, timeout):
+    expires_at = time.time() + timeout if timeout else math.inf
+    return value, build_seconds, expires_at
+
+
+def _should_refresh(entry, beta) -> bool:
+    _, build_seconds, expires_at = entry
+    # 1 - random() is in (0, 1], so the log is always defined
+    return time.time() - build_seconds * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _wait_for(key, lock_timeout):
+    """Poll for the value another caller is building"""
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
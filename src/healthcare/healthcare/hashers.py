@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import BCryptSHA256PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+
+# bcrypt releases the GIL while hashing, so a semaphore caps how many
+# hashes one process runs at once: during a login rush extra requests wait
+# for a hashing slot instead of oversubscribing the CPU and slowing every
+# other request. The hash still runs on the request's own thread, which
+# blocks while it waits; the cap is per process, so with several worker
+# processes size PASSWORD_HASHING_WORKERS to cores / processes.
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+class HashingStats:
+    """Wait-time counters for the hashing cap"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hashes = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.total_hash_time = 0.0
+
+    def record(self, wait: float, hash_time: float) -> None:
+        with self._lock:
+            self.hashes += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.total_hash_time += hash_time
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'hashes': self.hashes,
+                'avg_wait_ms': 1000 * self.total_wait / self.hashes if self.hashes else 0.0,
+                'max_wait_ms': 1000 * self.max_wait,
+                'avg_hash_ms': 1000 * self.total_hash_time / self.hashes if self.hashes else 0.0,
+            }
+
+
+hashing_stats = HashingStats()
+
+
+def get_hashing_semaphore() -> threading.BoundedSemaphore:
+    global _semaphore
+    if _semaphore is None:
+        with _semaphore_lock:
+            if _semaphore is None:
+                slots = getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count() or 1
+                _semaphore = threading.BoundedSemaphore(slots)
+    return _semaphore
+
+
+def run_hashing(func, *args):
+    """Run ``func`` once a hashing slot is free, recording how long it waited"""
+    semaphore = get_hashing_semaphore()
+    submitted = time.monotonic()
+    with semaphore:
+        started = time.monotonic()
+        try:
+            return func(*args)
+        finally:
+            finished = time.monotonic()
+            wait = started - submitted
+            hashing_stats.record(wait, finished - started)
+            if wait > getattr(settings, 'PASSWORD_HASHING_SLOW_WAIT', 1.0):
+                logger.warning('Password hash waited %.0f ms for a hashing slot', wait * 1000)
+
+
+class CappedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """
+    BCryptSHA256PasswordHasher with a configurable work factor, capped at
+    PASSWORD_HASHING_WORKERS concurrent hashes per process.
+
+    Keeps the ``bcrypt_sha256`` algorithm name, so existing hashes verify
+    unchanged; Django's must_update() sees a different PASSWORD_BCRYPT_ROUNDS
+    and rehashes the password on the user's next successful login.
+    """
+
+    @property
+    def rounds(self):
+        return getattr(settings, 'PASSWORD_BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+    def encode(self, password, salt):
+        return run_hashing(super().encode, password, salt)
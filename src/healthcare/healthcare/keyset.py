@@ -0,0 +1,109 @@
+import base64
+import datetime
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.db.models import Q
+
+
+# Keyset ("seek") pagination: a page starts right after the last row of the
+# previous one, found through the ordering columns instead of OFFSET, so
+# every page costs the same index range scan however deep it is. The
+# ordering must end in a unique column (normally ``id``) and its columns
+# must not be NULL.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    items: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _encode_value(value):
+    # Unlike DjangoJSONEncoder, keep microseconds: a truncated timestamp
+    # would skip rows
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values) -> str:
+    payload = json.dumps(list(values), default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering) -> list:
+    """The typed ordering values stored in ``cursor``; raises InvalidCursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Malformed cursor.')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Cursor does not match this listing.')
+    try:
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except Exception:
+        raise InvalidCursor('Cursor does not match this listing.')
+
+
+def keyset_filter(ordering, values) -> Q:
+    """Rows strictly after ``values`` in ``ordering``: (a > x) OR (a = x AND b > y) ..."""
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        column = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{column}__{lookup}': value})
+        equal[column] = value
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20) -> KeysetPage:
+    """One page of ``queryset`` in ``ordering``, starting after ``cursor``"""
+    ordering = tuple(ordering)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+
+    # One extra row tells whether there is a next page, without a COUNT
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return KeysetPage(items)
+    items = items[:page_size]
+    last = items[-1]
+    values = [getattr(last, queryset.model._meta.get_field(name.lstrip('-')).attname) for name in ordering]
+    return KeysetPage(items, encode_cursor(values))
+
+
+def page_querystrings(query_dict, page: KeysetPage, param='cursor'):
+    """Querystrings for the first and the next page, keeping the other GET parameters"""
+    params = query_dict.copy()
+    params.pop(param, None)
+    first = params.urlencode()
+    if not page.has_next:
+        return first, None
+    params[param] = page.next_cursor
+    return first, params.urlencode()
+
+
+def capped_count(queryset, cap):
+    """
+    ``(count, exact)``: COUNT(*) that stops after ``cap`` rows, so a total
+    shown next to keyset pages doesn't scan a long history. ``count`` is
+    ``cap`` when ``exact`` is False.
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count <= cap
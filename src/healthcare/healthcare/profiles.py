@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from healthcare.routers import primary_reads
+
+
+# A user's Patient or Doctor row (with the doctor's approval status) is
+# cached per user and dropped by the doctor/patient signals when it
+# changes, so authenticated pages don't query it on every request.
+PROFILE_KEY = 'role_profile:{}'
+PROFILE_TIMEOUT = 15 * 60
+
+
+@dataclass
+class RoleProfile:
+    """The user's role ('patient', 'doctor' or None) and its profile row"""
+    role: Optional[str] = None
+    profile: object = None
+
+
+def load_role_profile(user) -> RoleProfile:
+    if not user.is_authenticated:
+        return RoleProfile()
+    key = PROFILE_KEY.format(user.pk)
+    role_profile = cache.get(key)
+    if role_profile is None:
+        role_profile = _query_role_profile(user)
+        cache.set(key, role_profile, timeout=PROFILE_TIMEOUT)
+    if role_profile.profile is not None:
+        # Reuse the request's user instead of loading it again
+        role_profile.profile.user = user
+    return role_profile
+
+
+def invalidate_role_profiles(user_ids) -> None:
+    cache.delete_many([PROFILE_KEY.format(user_id) for user_id in user_ids])
+
+
+def get_patient(request):
+    """The request user's Patient; raises Patient.DoesNotExist like objects.get()"""
+    from patient.models import Patient
+    role_profile = request.role_profile
+    if role_profile.role != 'patient':
+        raise Patient.DoesNotExist('User has no patient profile.')
+    return role_profile.profile
+
+
+def get_doctor(request):
+    """The request user's Doctor; raises Doctor.DoesNotExist like objects.get()"""
+    from doctor.models import Doctor
+    role_profile = request.role_profile
+    if role_profile.role != 'doctor':
+        raise Doctor.DoesNotExist('User has no doctor profile.')
+    return role_profile.profile
+
+
+def _query_role_profile(user) -> RoleProfile:
+    from django.contrib.auth.models import User
+
+    # One query for both reverse one-to-ones; cached across requests, so
+    # never from a lagging replica
+    with primary_reads():
+        row = User.objects.select_related('patient', 'doctor').filter(pk=user.pk).first()
+    for role in ('patient', 'doctor'):
+        profile = getattr(row, role, None) if row is not None else None
+        if profile is not None:
+            # Keep the user (and its password hash) out of the cache
+            profile._state.fields_cache.pop('user', None)
+            return RoleProfile(role, profile)
+    return RoleProfile()
+
+
+class RoleProfileMiddleware(MiddlewareMixin):
+    """Attach a lazily resolved ``request.role_profile``; must follow AuthenticationMiddleware"""
+
+    def process_request(self, request):
+        request.role_profile = SimpleLazyObject(lambda: load_role_profile(request.user))
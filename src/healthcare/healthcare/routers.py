@@ -0,0 +1,142 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.utils.deprecation import MiddlewareMixin
+
+
+# Reads go to the replica only inside views or blocks marked with
+# read_from_replica/replica_reads, never inside a transaction on the
+# primary, and never for a client that wrote in the last
+# REPLICA_PIN_SECONDS (so a booking confirmation reads its own write).
+# Outside a request, a write keeps the rest of that context on the primary.
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'primary_pin'
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_pinned = contextvars.ContextVar('primary_pinned', default=False)
+_wrote = contextvars.ContextVar('primary_wrote', default=False)
+_replica_down_until = 0.0
+_replica_up_until = 0.0
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def replica_available() -> bool:
+    """
+    Whether the replica is configured and accepting connections; either
+    answer is remembered for REPLICA_RETRY_SECONDS
+    """
+    global _replica_down_until, _replica_up_until
+    if not replica_configured():
+        return False
+    now = time.monotonic()
+    if now < _replica_down_until:
+        return False
+    if now < _replica_up_until:
+        return True
+    retry_seconds = getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+    try:
+        connections[REPLICA_ALIAS].ensure_connection()
+    except OperationalError:
+        # Serve from the primary until the replica has had time to recover
+        _replica_down_until = now + retry_seconds
+        return False
+    _replica_up_until = now + retry_seconds
+    return True
+
+
+@contextmanager
+def replica_reads():
+    """Send reads in this block to the replica when it is safe to"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Keep reads in this block on the primary, e.g. when filling a shared cache"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica(view_func):
+    """Run a read-only view (sync or async) inside replica_reads()"""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Primary/replica router with read-your-writes pinning"""
+
+    def db_for_read(self, model, **hints):
+        if not replica_configured():
+            return None
+        if (
+            _replica_reads.get()
+            and not _pinned.get()
+            and not _wrote.get()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+            and replica_available()
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """
+    Pin a client to the primary for REPLICA_PIN_SECONDS after it writes.
+
+    The pin is a short-lived cookie, so it follows the browser across
+    workers without a session or cache lookup. Must come before
+    SessionMiddleware so session saves count as writes.
+    """
+
+    def process_request(self, request):
+        _pinned.set(PIN_COOKIE in request.COOKIES)
+        _wrote.set(False)
+
+    def process_response(self, request, response):
+        if _wrote.get() and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,20 +45,25 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     
     # Healthcare apps
+    'healthcare',
     'doctor',
     'patient',
     'appointment',
     'selftest',
+    'api',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'healthcare.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'healthcare.profiles.RoleProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,14 +92,101 @@ WSGI_APPLICATION = 'healthcare.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite by default. Multi-worker deployments set DB_ENGINE=postgresql and
+# the DB_* connection variables (environment or .env file).
+DB_ENGINE = config('DB_ENGINE', default='sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='healthcare'),
+            'USER': config('DB_USER', default='healthcare'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Persistent connections, checked before reuse so a restarted
+            # server or pooler doesn't fail the first query of a request
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            # Transaction-mode poolers (PgBouncer) can't keep server-side
+            # cursors open across transactions
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_POOLER', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+
+# Optional read replica for read-only views (healthcare/routers.py). Set
+# DB_REPLICA_HOST (PostgreSQL) or DB_REPLICA_NAME (SQLite file); without
+# either, every query uses the primary.
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_REPLICA_HOST:
+        DATABASES['replica']['HOST'] = DB_REPLICA_HOST
+        DATABASES['replica']['PORT'] = config('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', ''))
+    if DB_REPLICA_NAME:
+        DATABASES['replica']['NAME'] = DB_REPLICA_NAME
+
+DATABASE_ROUTERS = ['healthcare.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+# Seconds a replica health check is trusted: an unreachable replica is
+# skipped, a reachable one is not checked again
+REPLICA_RETRY_SECONDS = 30
+
+# Opt-in WAL mode, busy timeout and cache pragmas for SQLite connections
+# (healthcare/sqlite.py); SQLITE_PRAGMAS overrides individual values.
+SQLITE_TUNING = config('SQLITE_TUNING', default=False, cast=bool)
+SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# CACHE_BACKEND picks one of the backends below; CACHE_LOCATION overrides
+# its default location. LocMem is per process, so multi-worker deployments
+# should use a shared backend (file, redis or memcached).
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'healthcare'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(tempfile.gettempdir(), 'healthcare-cache')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='healthcare'),
     }
 }
 
 
+# Sessions: 'db' (default), 'cached_db' (reads served from the cache above,
+# written through to the database) or 'cache' (cache only; needs a shared,
+# persistent cache)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + config('SESSION_BACKEND', default='db')
+
+
 # Password validation moved to bottom of file with bcrypt configuration
 
 
@@ -121,12 +217,17 @@ from datetime import timedelta
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'django.contrib.auth.backends.ModelBackend',
+        # Verifies access tokens from their claims alone (healthcare/tokens.py)
+        'healthcare.tokens.StatelessJWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # /api/v1/...; request.version holds the version
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ('v1',),
+    'DEFAULT_VERSION': 'v1',
 }
 
 SIMPLE_JWT = {
@@ -134,7 +235,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # API logins record last_login in batches (healthcare/tokens.py)
+    'UPDATE_LAST_LOGIN': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'VERIFYING_KEY': None,
@@ -149,20 +251,50 @@ SIMPLE_JWT = {
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'healthcare.tokens.ClaimsUser',
+    'TOKEN_REFRESH_SERIALIZER': 'healthcare.tokens.RoleTokenRefreshSerializer',
     'JTI_CLAIM': 'jti',
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# How often each process reloads revoked token IDs, and how often batched
+# API last_login updates are written
+JWT_REVOCATION_SYNC_SECONDS = config('JWT_REVOCATION_SYNC_SECONDS', default=30, cast=int)
+JWT_LAST_LOGIN_FLUSH_SECONDS = config('JWT_LAST_LOGIN_FLUSH_SECONDS', default=10, cast=int)
+
+# Delta sync (/api/v1/changes/): how long new changes wait before they are
+# served, so slower transactions with earlier sequence numbers can commit,
+# and how long entries are kept (pruned by `manage.py prune_changes`)
+CHANGE_FEED_SETTLE_SECONDS = config('CHANGE_FEED_SETTLE_SECONDS', default=1, cast=int)
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+
 # Password validation - Removed restrictions for flexible password creation
 AUTH_PASSWORD_VALIDATORS = []
 
-# Use bcrypt for password hashing
+# Use bcrypt for password hashing, capped per process (healthcare/hashers.py)
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'healthcare.hashers.CappedBCryptSHA256PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.Argon2PasswordHasher',
 ]
+
+# bcrypt work factor (2**rounds iterations). Changing it rehashes each
+# password on the user's next login.
+PASSWORD_BCRYPT_ROUNDS = config('PASSWORD_BCRYPT_ROUNDS', default=12, cast=int)
+# Passwords one process hashes at once; further logins and registrations
+# wait on their own thread. Per process: divide the cores between workers.
+PASSWORD_HASHING_WORKERS = config('PASSWORD_HASHING_WORKERS', default=os.cpu_count() or 1, cast=int)
+# Log a warning when a hash waited longer than this many seconds for a slot
+PASSWORD_HASHING_SLOW_WAIT = 1.0
+
+# Dashboard counters cache lifetime in seconds (0 disables caching)
+DASHBOARD_STATS_TIMEOUT = 30
+
+# Worker threads for CPU-bound work (chatbot matching, ML inference) in async views
+ASYNC_CPU_WORKERS = 4
+
+# Chatbot conversation state lifetime in seconds
+CHATBOT_CONVERSATION_TTL = 30 * 60
@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from doctor.models import Doctor
+from patient.models import Patient
+
+
+def create_doctor(username='booking_doctor', specialization='Cardiology', experience_years=10,
+                  approval_status='approved'):
+    """A doctor whose user logs in with password ``testpass123``"""
+    user = User.objects.create_user(
+        username=username,
+        email=f'{username}@test.com',
+        password='testpass123',
+        first_name='John',
+        last_name='Smith'
+    )
+    return Doctor.objects.create(
+        user=user,
+        specialization=specialization,
+        license_number=f'LIC-{username}',
+        experience_years=experience_years,
+        approval_status=approval_status,
+        approved_at=timezone.now() if approval_status == 'approved' else None
+    )
+
+
+def create_patient(username='booking_patient'):
+    """A patient whose user logs in with password ``testpass123``"""
+    user = User.objects.create_user(
+        username=username,
+        email=f'{username}@test.com',
+        password='testpass123',
+        first_name='Jane',
+        last_name='Doe'
+    )
+    return Patient.objects.create(user=user)
+
+
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for catching N+1 queries in listing views.
+
+    ``assertConstantQueries`` renders a page, adds more rows, renders it
+    again and fails if the number of queries grew with the row count.
+    """
+
+    def count_queries(self, url, data=None, client=None):
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data or {})
+        self.assertEqual(response.status_code, 200, f'{url} returned {response.status_code}')
+        return len(context.captured_queries), context
+
+    def assertConstantQueries(self, url, add_rows, data=None, client=None):
+        """Assert that ``url`` issues the same number of queries after ``add_rows()``"""
+        before, _ = self.count_queries(url, data, client)
+        add_rows()
+        after, context = self.count_queries(url, data, client)
+        if after != before:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f'{url} issued {before} queries before adding rows and {after} after; '
+                f'listing is not constant-query:\n{queries}'
+            )
+        return after
@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from healthcare import caching, routers
+
+
+class SQLitePragmaTestCase(TestCase):
+    """Opt-in SQLite tuning applied on connection_created"""
+
+    def open_connection(self, path):
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path}, alias='pragma_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_when_enabled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.settings(SQLITE_TUNING=True, SQLITE_PRAGMAS={'busy_timeout': 1234}):
+                wrapper = self.open_connection(os.path.join(tmp, 'tuned.sqlite3'))
+                self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+                self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+                # 1 = NORMAL, 2 = MEMORY
+                self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+                self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+                wrapper.close()
+
+    def test_defaults_untouched_when_disabled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.settings(SQLITE_TUNING=False):
+                wrapper = self.open_connection(os.path.join(tmp, 'plain.sqlite3'))
+                self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+                wrapper.close()
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+    """Replica routing, read-your-writes pinning and fallback"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.replica_available = routers.replica_available
+        for name in ('replica_configured', 'replica_available'):
+            patcher = mock.patch.object(routers, name, return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_alias(self):
+        return self.router.db_for_read(User)
+
+    def in_request(self, func, cookies=None):
+        """Run ``func`` as a replica view behind ReplicaPinningMiddleware in a fresh context"""
+        def view(request):
+            return HttpResponse(func())
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        middleware = routers.ReplicaPinningMiddleware(routers.read_from_replica(view))
+        return contextvars.Context().run(middleware, request)
+
+    def test_no_replica_configured(self):
+        routers.replica_configured.return_value = False
+        with routers.replica_reads():
+            self.assertIsNone(self.read_alias())
+
+    def test_reads_follow_designation(self):
+        def reads():
+            self.assertEqual(self.read_alias(), 'default')
+            with routers.replica_reads():
+                self.assertEqual(self.read_alias(), 'replica')
+                with routers.primary_reads():
+                    self.assertEqual(self.read_alias(), 'default')
+        # Fresh context: writes from other tests leave this thread marked as a writer
+        contextvars.Context().run(reads)
+
+    def test_write_pins_client_to_primary(self):
+        def write_then_read():
+            before = self.read_alias()
+            self.router.db_for_write(User)
+            return f'{before},{self.read_alias()}'
+
+        response = self.in_request(write_then_read)
+        self.assertEqual(response.content, b'replica,default')
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        response = self.in_request(self.read_alias, cookies={routers.PIN_COOKIE: '1'})
+        self.assertEqual(response.content, b'default')
+
+        response = self.in_request(self.read_alias)
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_unreachable_replica_falls_back(self):
+        replica = mock.Mock()
+        replica.ensure_connection.side_effect = OperationalError('connection refused')
+        self.addCleanup(setattr, routers, '_replica_down_until', 0.0)
+        with mock.patch.object(routers, 'connections', {'replica': replica}):
+            self.assertFalse(self.replica_available())
+            self.assertFalse(self.replica_available())
+        # The second call doesn't retry until REPLICA_RETRY_SECONDS have passed
+        replica.ensure_connection.assert_called_once()
+
+    def test_healthy_replica_checked_once(self):
+        replica = mock.Mock()
+        self.addCleanup(setattr, routers, '_replica_up_until', 0.0)
+        with mock.patch.object(routers, 'connections', {'replica': replica}):
+            self.assertTrue(self.replica_available())
+            self.assertTrue(self.replica_available())
+        replica.ensure_connection.assert_called_once()
+
+
+class CacheAsideTestCase(SimpleTestCase):
+    """Versioned cache-aside with stampede protection"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def build():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        def worker(results):
+            barrier.wait()
+            results.append(caching.get_or_build('stampede', build, 60))
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_expiring_entry_served_while_refreshing(self):
+        cache.set('hot', ('old', 1.0, time.time()), timeout=60)
+        # Another caller holds the refresh lock: keep serving the old value
+        cache.add(caching.LOCK_KEY.format('hot'), 1)
+        self.assertEqual(caching.get_or_build('hot', lambda: 'new', 60), 'old')
+
+        cache.delete(caching.LOCK_KEY.format('hot'))
+        self.assertEqual(caching.get_or_build('hot', lambda: 'new', 60), 'new')
+        self.assertEqual(caching.get_or_build('hot', lambda: 'newer', 60), 'new')
+
+    def test_only_lock_owner_releases(self):
+        lock = caching.LOCK_KEY.format('held')
+        cache.add(lock, 'other-token')
+
+        # Gives up waiting, builds without the lock and leaves it alone
+        self.assertEqual(caching.get_or_build('held', lambda: 'value', 60, lock_timeout=0.05), 'value')
+        self.assertEqual(cache.get(lock), 'other-token')
+
+        cache.delete(lock)
+        caching.get_or_build('free', lambda: 'value', 60)
+        self.assertIsNone(cache.get(caching.LOCK_KEY.format('free')))
+
+    def test_decorator_versions(self):
+        calls = []
+
+        @caching.cache_aside('test_namespace', timeout=60)
+        def double(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEqual([double(2), double(2), double(3)], [4, 4, 6])
+        self.assertEqual(calls, [2, 3])
+
+        double.invalidate()
+        self.assertEqual(double(2), 4)
+        self.assertEqual(calls, [2, 3, 2])
+
+    def test_async_build_once(self):
+        calls = []
+
+        async def build():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def run():
+            return await asyncio.gather(*[caching.aget_or_build('async', build, 60) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), ['value'] * 5)
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,33 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from healthcare.tokens import revoke_token
+
+
+# Kept apart from healthcare.tokens: DRF imports authentication classes
+# while loading its views, so that module must not import DRF views.
+
+
+@api_view(['POST'])
+def revoke_tokens(request):
+    """
+    Log an API client out: revoke its access token and, if given, one of
+    its own refresh tokens. Session-authenticated callers have no access
+    token, so only the refresh token is revoked.
+    """
+    refresh = request.data.get('refresh')
+    if refresh:
+        try:
+            refresh = RefreshToken(refresh)
+        except TokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            return Response({'error': 'Token belongs to another user'}, status=status.HTTP_403_FORBIDDEN)
+        revoke_token(refresh)
+    if request.auth is not None:
+        revoke_token(request.auth)
+    return Response(status=status.HTTP_205_RESET_CONTENT)
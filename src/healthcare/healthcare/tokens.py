@@ -0,0 +1,273 @@
+import atexit
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from healthcare.profiles import RoleProfile, load_role_profile
+from healthcare.routers import primary_reads
+
+logger = logging.getLogger(__name__)
+
+# Each revocation sync re-reads rows blacklisted within this many sync
+# intervals before the previous one
+REVOCATION_SYNC_OVERLAP = 3
+
+
+# API requests are authenticated from the access token alone: the role,
+# profile id and doctor approval status travel as claims, so no user or
+# profile row is loaded. Claims are re-read whenever a refresh token is
+# exchanged, so they are at most ACCESS_TOKEN_LIFETIME old. Revoked JTIs
+# are kept in a per-process bloom filter, synced from the blacklist table
+# every JWT_REVOCATION_SYNC_SECONDS; only a filter hit costs a query.
+
+
+def set_role_claims(token, role_profile: RoleProfile) -> None:
+    profile = role_profile.profile
+    token['role'] = role_profile.role
+    token['profile_id'] = profile.pk if profile is not None else None
+    token['approval_status'] = profile.approval_status if role_profile.role == 'doctor' else None
+
+
+class RoleRefreshToken(RefreshToken):
+    """RefreshToken that carries role claims and re-reads them when exchanged"""
+
+    def __init__(self, token=None, verify=True):
+        super().__init__(token, verify)
+        if token is not None:
+            from django.contrib.auth.models import User
+            user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+            set_role_claims(self, load_role_profile(User(pk=user_id)))
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RoleRefreshToken
+
+
+def issue_tokens(user, role_profile: RoleProfile = None) -> RoleRefreshToken:
+    """A refresh token (and, via ``.access_token``, an access token) with role claims"""
+    refresh = RoleRefreshToken.for_user(user)
+    set_role_claims(refresh, role_profile or load_role_profile(user))
+    return refresh
+
+
+class ClaimsUser(TokenUser):
+    """Stateless request user; custom claims such as ``role`` read as attributes"""
+
+    @property
+    def is_patient(self) -> bool:
+        return self.token.get('role') == 'patient'
+
+    @property
+    def is_doctor(self) -> bool:
+        return self.token.get('role') == 'doctor'
+
+    @property
+    def is_approved_doctor(self) -> bool:
+        return self.is_doctor and self.token.get('approval_status') == 'approved'
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item) -> None:
+        for index in self._indexes(item):
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self.count += 1
+
+    def __contains__(self, item) -> bool:
+        return all(self._bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(item))
+
+
+class RevocationFilter:
+    """Bloom filter of blacklisted JTIs with an LRU of confirmed revocations"""
+
+    def __init__(self, capacity=10000, lru_size=1024):
+        self._lock = threading.Lock()
+        self._initial_capacity = capacity
+        self._lru_size = lru_size
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._bloom = BloomFilter(self._initial_capacity)
+            self._synced_through = None
+            self._synced_at = -math.inf
+            self._confirmed = OrderedDict()
+
+    def add(self, jti) -> None:
+        with self._lock:
+            self._bloom.add(jti)
+            self._remember(jti)
+
+    def is_revoked(self, jti) -> bool:
+        self.sync()
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            if jti in self._confirmed:
+                self._confirmed.move_to_end(jti)
+                return True
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        with primary_reads():
+            revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if revoked:
+            # Revocations are permanent; false positives are not cached, as
+            # the token may still be revoked later
+            with self._lock:
+                self._remember(jti)
+        return revoked
+
+    def sync(self, force=False) -> None:
+        """Load JTIs blacklisted since the last sync, at most every JWT_REVOCATION_SYNC_SECONDS"""
+        interval = getattr(settings, 'JWT_REVOCATION_SYNC_SECONDS', 30)
+        if not force and time.monotonic() < self._synced_at + interval:
+            return
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+        with self._lock:
+            if not force and time.monotonic() < self._synced_at + interval:
+                return
+            started = timezone.now()
+            revocations = BlacklistedToken.objects.filter(token__expires_at__gt=started)
+            if self._synced_through is not None:
+                # Rows become visible in commit order, not in id or
+                # blacklisted_at order, so re-read a window of recent rows
+                # to pick up transactions that committed after the last sync
+                overlap = timedelta(seconds=REVOCATION_SYNC_OVERLAP * interval)
+                revocations = revocations.filter(blacklisted_at__gte=self._synced_through - overlap)
+            with primary_reads():
+                jtis = [jti for jti in revocations.values_list('token__jti', flat=True) if jti not in self._bloom]
+            if self._bloom.count + len(jtis) > self._bloom.capacity:
+                # Grow by rebuilding from every unexpired revocation
+                with primary_reads():
+                    jtis = list(
+                        BlacklistedToken.objects
+                        .filter(token__expires_at__gt=started)
+                        .values_list('token__jti', flat=True)
+                    )
+                self._bloom = BloomFilter(max(self._bloom.capacity, len(jtis)) * 2)
+            for jti in jtis:
+                self._bloom.add(jti)
+            self._synced_through = started
+            self._synced_at = time.monotonic()
+
+    def _remember(self, jti) -> None:
+        self._confirmed[jti] = True
+        self._confirmed.move_to_end(jti)
+        while len(self._confirmed) > self._lru_size:
+            self._confirmed.popitem(last=False)
+
+
+revocation_filter = RevocationFilter()
+
+
+def revoke_token(token) -> None:
+    """Blacklist a token of any type and drop it from this process at once"""
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+    jti = token[api_settings.JTI_CLAIM]
+    outstanding, created = OutstandingToken.objects.get_or_create(
+        jti=jti,
+        defaults={
+            'user_id': token.get(api_settings.USER_ID_CLAIM),
+            'token': str(token),
+            'expires_at': datetime_from_epoch(token['exp']),
+        },
+    )
+    BlacklistedToken.objects.get_or_create(token=outstanding)
+    revocation_filter.add(jti)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT authentication without a user query; rejects revoked access tokens"""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocation_filter.is_revoked(token[api_settings.JTI_CLAIM]):
+            raise InvalidToken(_('Token has been revoked'))
+        return token
+
+
+class LastLoginBatcher:
+    """
+    Collect API logins and write ``last_login`` for all of them in one
+    UPDATE every JWT_LAST_LOGIN_FLUSH_SECONDS, from a background thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+
+    def record(self, user_id, when=None) -> None:
+        with self._lock:
+            self._pending[user_id] = when or timezone.now()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='last-login-batcher', daemon=True)
+                self._thread.start()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write pending logins now; returns how many users were updated"""
+        from django.contrib.auth.models import User
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        User.objects.filter(pk__in=pending).update(last_login=Case(
+            *[When(pk=user_id, then=Value(when)) for user_id, when in pending.items()],
+            output_field=DateTimeField(),
+        ))
+        return len(pending)
+
+    def _run(self):
+        while True:
+            time.sleep(getattr(settings, 'JWT_LAST_LOGIN_FLUSH_SECONDS', 10))
+            try:
+                self.flush()
+            except Exception:
+                # last_login is best effort; never let the thread die
+                logger.exception('Could not write batched last_login updates')
+            finally:
+                connection.close()
+
+
+last_login_batcher = LastLoginBatcher()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        last_login_batcher.flush()
+    except Exception:
+        logger.exception('Could not write batched last_login updates at exit')
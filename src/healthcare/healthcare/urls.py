@@ -15,8 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.http import HttpResponse
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from healthcare.token_views import revoke_tokens
 
 def home_view(request):
     return HttpResponse("""
@@ -105,4 +108,7 @@ urlpatterns = [
     path('patient/', include('patient.urls')),
     path('appointment/', include('appointment.urls')),
     path('selftest/', include('selftest.urls')),
+    re_path(r'^api/(?P<version>v1)/', include('api.urls')),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/revoke/', revoke_tokens, name='token_revoke'),
 ]
@@ -7,3 +7,4 @@ class PatientAdmin(admin.ModelAdmin):
     list_filter = ['gender', 'created_at']
     search_fields = ['user__first_name', 'user__last_name', 'phone', 'emergency_contact']
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['user']
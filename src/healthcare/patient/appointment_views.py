@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.db.models import Q
 from datetime import date, timedelta, datetime
 from calendar import monthrange
@@ -11,13 +12,21 @@ import calendar
 from .models import Patient
 from doctor.models import Doctor
 from appointment.models import AppointmentSlot, Appointment
+from appointment.availability import (
+    ALL_DOCTORS, aget_cached_payload, availability_etag, get_cached_payload,
+)
+from appointment.services import BookingResult, book_slot, get_patient_dashboard_stats
+from healthcare.async_views import async_condition, async_login_required
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_patient
 
 
 @login_required
+@read_from_replica
 def patient_appointment_calendar(request):
     """Display calendar with available appointment slots"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Please complete your patient profile first.")
         return redirect('patient:profile')
@@ -52,14 +61,16 @@ def patient_appointment_calendar(request):
             else:
                 calendar_days.append(date(year, month, day))
     
-    # Get available appointment slots for the month
-    available_slots = AppointmentSlot.objects.filter(
-        date__range=[first_day, last_day],
-        date__gte=date.today()  # Only future dates
-    ).select_related('doctor', 'doctor__user').prefetch_related('appointment')
-    
-    # Filter only available slots (no appointment booked)
-    available_slots = [slot for slot in available_slots if not hasattr(slot, 'appointment')]
+    # Get available (unbooked, future) slots for the month, shared by all
+    # patients and cached under the all-doctors availability version
+    available_slots = get_cached_payload(
+        f'calendar:{first_day:%Y-%m}', ALL_DOCTORS, date.today(),
+        lambda: list(AppointmentSlot.objects.filter(
+            date__range=[first_day, last_day],
+            date__gte=date.today(),
+            appointment__isnull=True
+        ).select_related('doctor', 'doctor__user'))
+    )
     
     # Get patient's current appointments for the month
     patient_appointments = Appointment.objects.filter(
@@ -91,10 +102,11 @@ def patient_appointment_calendar(request):
 
 
 @login_required
+@read_from_replica
 def patient_appointment_list(request):
     """Display list of patient's current appointments"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Please complete your patient profile first.")
         return redirect('patient:profile')
@@ -140,7 +152,7 @@ def patient_appointment_list(request):
 def book_appointment(request, slot_id):
     """Book an appointment slot"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Please complete your patient profile first.")
         return redirect('patient:profile')
@@ -167,17 +179,19 @@ def book_appointment(request, slot_id):
                 'slot': slot,
             })
         
-        # Create the appointment
-        appointment = Appointment.objects.create(
-            patient=patient,
-            doctor=slot.doctor,
-            appointment_slot=slot,
-            appointment_date=timezone.make_aware(
-                timezone.datetime.combine(slot.date, slot.start_time)
-            ),
-            status='scheduled',
-            reason=reason
-        )
+        # Claim the slot atomically; concurrent bookings get a clean "taken" result
+        result = book_slot(patient, slot.id, reason)
+        
+        if result.status == BookingResult.BUSY:
+            messages.error(request, "We couldn't book this slot right now. Please try again.")
+            return render(request, 'patient/appointments/book.html', {
+                'patient': patient,
+                'slot': slot,
+            })
+        
+        if not result.success:
+            messages.error(request, "This appointment slot is no longer available.")
+            return redirect('patient:appointment_calendar')
         
         messages.success(request, f"Appointment booked successfully with Dr. {slot.doctor.user.get_full_name()} on {slot.date} at {slot.start_time}.")
         return redirect('patient:appointment_list')
@@ -194,7 +208,7 @@ def book_appointment(request, slot_id):
 def appointment_detail(request, appointment_id):
     """View appointment details"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Please complete your patient profile first.")
         return redirect('patient:profile')
@@ -217,7 +231,7 @@ def appointment_detail(request, appointment_id):
 def cancel_appointment(request, appointment_id):
     """Cancel an appointment"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Please complete your patient profile first.")
         return redirect('patient:profile')
@@ -259,8 +273,16 @@ def cancel_appointment(request, appointment_id):
     return render(request, 'patient/appointments/cancel.html', context)
 
 
-@login_required
-def available_slots_api(request):
+def _available_slots_etag(request):
+    date_str = request.GET.get('date')
+    if not date_str:
+        return None
+    return availability_etag('slots', request.GET.get('doctor_id'), date_str)
+
+
+@async_login_required
+@async_condition(etag_func=_available_slots_etag)
+async def available_slots_api(request):
     """API endpoint to get available slots for a specific date and doctor"""
     date_str = request.GET.get('date')
     doctor_id = request.GET.get('doctor_id')
@@ -277,17 +299,19 @@ def available_slots_api(request):
     if slot_date < date.today():
         return JsonResponse({'slots': []})
     
-    # Base query for available slots
-    slots_query = AppointmentSlot.objects.filter(date=slot_date).select_related('doctor', 'doctor__user')
-    
-    # Filter by doctor if specified
-    if doctor_id:
-        slots_query = slots_query.filter(doctor_id=doctor_id)
-    
-    # Get only available slots (no appointment booked)
-    available_slots = []
-    for slot in slots_query:
-        if not hasattr(slot, 'appointment'):
+    async def build_payload():
+        # Base query for available slots
+        slots_query = AppointmentSlot.objects.filter(
+            date=slot_date,
+            appointment__isnull=True
+        ).select_related('doctor', 'doctor__user')
+        
+        # Filter by doctor if specified
+        if doctor_id:
+            slots_query = slots_query.filter(doctor_id=doctor_id)
+        
+        available_slots = []
+        async for slot in slots_query:
             available_slots.append({
                 'id': slot.id,
                 'doctor_name': slot.doctor.user.get_full_name(),
@@ -297,15 +321,19 @@ def available_slots_api(request):
                 'start_time': slot.start_time.strftime('%H:%M'),
                 'end_time': slot.end_time.strftime('%H:%M'),
             })
+        return {'slots': available_slots}
     
-    return JsonResponse({'slots': available_slots})
+    response = JsonResponse(await aget_cached_payload('slots', doctor_id, slot_date, build_payload))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
+@read_from_replica
 def patient_dashboard_appointments(request):
     """Dashboard view showing upcoming appointments and quick actions"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         return redirect('patient:profile')
     
@@ -325,18 +353,16 @@ def patient_dashboard_appointments(request):
         appointment_slot__date__lt=today
     ).select_related('appointment_slot', 'doctor', 'doctor__user').order_by('-appointment_slot__date')[:3]
     
-    # Get appointment statistics
-    total_appointments = Appointment.objects.filter(patient=patient).count()
-    completed_appointments = Appointment.objects.filter(patient=patient, status='completed').count()
-    cancelled_appointments = Appointment.objects.filter(patient=patient, status='cancelled').count()
+    # Get appointment statistics in a single aggregate query
+    stats = get_patient_dashboard_stats(patient)
     
     context = {
         'patient': patient,
         'upcoming_appointments': upcoming_appointments,
         'recent_appointments': recent_appointments,
-        'total_appointments': total_appointments,
-        'completed_appointments': completed_appointments,
-        'cancelled_appointments': cancelled_appointments,
+        'total_appointments': stats['total_appointments'],
+        'completed_appointments': stats['completed_appointments'],
+        'cancelled_appointments': stats['cancelled_appointments'],
     }
     
     return render(request, 'patient/appointments/dashboard.html', context) 
\ No newline at end of file
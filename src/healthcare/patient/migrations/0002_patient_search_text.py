@@ -0,0 +1,90 @@
+# Generated by Django 4.2.21 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+# The SQL and search text below are frozen copies of patient/search.py at the
+# time of this migration; later changes there must not alter it.
+
+SQLITE_INDEX_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patient_search_fts USING fts5("
+    "search_text, content='patient_patient', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS patient_search_fts_ai AFTER INSERT ON patient_patient BEGIN "
+    "INSERT INTO patient_search_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS patient_search_fts_ad AFTER DELETE ON patient_patient BEGIN "
+    "INSERT INTO patient_search_fts(patient_search_fts, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS patient_search_fts_au AFTER UPDATE OF search_text ON patient_patient BEGIN "
+    "INSERT INTO patient_search_fts(patient_search_fts, rowid, search_text) "
+    "VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO patient_search_fts(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "INSERT INTO patient_search_fts(patient_search_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS patient_search_fts_ai",
+    "DROP TRIGGER IF EXISTS patient_search_fts_ad",
+    "DROP TRIGGER IF EXISTS patient_search_fts_au",
+    "DROP TABLE IF EXISTS patient_search_fts",
+]
+
+POSTGRESQL_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS patient_search_trgm_idx ON patient_patient "
+    "USING gin (search_text gin_trgm_ops)",
+]
+
+POSTGRESQL_DROP_SQL = [
+    "DROP INDEX IF EXISTS patient_search_trgm_idx",
+]
+
+
+def search_text_for(user):
+    return ' '.join(
+        part for part in (user.first_name, user.last_name, user.email) if part
+    ).lower()
+
+
+def fill_search_text(apps, schema_editor):
+    Patient = apps.get_model('patient', 'Patient')
+    patients = list(Patient.objects.using(schema_editor.connection.alias).select_related('user'))
+    for patient in patients:
+        patient.search_text = search_text_for(patient.user)
+    Patient.objects.using(schema_editor.connection.alias).bulk_update(
+        patients, ['search_text'], batch_size=1000
+    )
+
+
+def create_trigram_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_INDEX_SQL,
+        'postgresql': POSTGRESQL_INDEX_SQL,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_trigram_index(apps, schema_editor):
+    statements = {
+        'sqlite': SQLITE_DROP_SQL,
+        'postgresql': POSTGRESQL_DROP_SQL,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patient', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_text',
+            field=models.CharField(blank=True, editable=False, max_length=556),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -17,6 +17,9 @@ class Patient(models.Model):
     emergency_phone = models.CharField(max_length=15, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Lowercase "first last email", kept in sync by patient.signals for search;
+    # 150 + 150 + 254 characters plus two spaces
+    search_text = models.CharField(max_length=556, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name}"
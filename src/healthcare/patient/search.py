@@ -0,0 +1,111 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Patient
+
+
+# Typeahead never needs more than this many patients
+MAX_RESULTS = 10
+# Shortest term the trigram indexes can answer
+TRIGRAM_LENGTH = 3
+
+FTS_TABLE = 'patient_search_fts'
+
+# SQLite: external-content FTS5 table with the trigram tokenizer (SQLite
+# 3.34+), kept in sync with patient_patient.search_text by triggers.
+# Django rebuilds SQLite tables on most ALTERs, which drops the triggers;
+# ensure_search_index() puts them back after every migrate.
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"search_text, content='patient_patient', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON patient_patient BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON patient_patient BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_text ON patient_patient BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_TRIGGERS = {f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# PostgreSQL: GIN trigram index, used by LIKE '%term%'
+POSTGRESQL_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS patient_search_trgm_idx ON patient_patient "
+    "USING gin (search_text gin_trgm_ops)",
+]
+
+POSTGRESQL_DROP_SQL = [
+    "DROP INDEX IF EXISTS patient_search_trgm_idx",
+]
+
+
+def search_text_for(user) -> str:
+    """The denormalised, lowercase text a patient is searched by"""
+    return ' '.join(
+        part for part in (user.first_name, user.last_name, user.email) if part
+    ).lower()
+
+
+def ensure_search_index(using: str = 'default') -> bool:
+    """
+    Recreate the SQLite FTS table and triggers if a table rebuild dropped
+    them, and reindex; returns whether anything was missing
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'patient_patient'"
+        )
+        if SQLITE_TRIGGERS <= {row[0] for row in cursor.fetchall()}:
+            return False
+        # Not migrated (far enough) yet
+        if 'patient_patient' not in connection.introspection.table_names(cursor):
+            return False
+        columns = connection.introspection.get_table_description(cursor, 'patient_patient')
+        if 'search_text' not in {column.name for column in columns}:
+            return False
+        for statement in SQLITE_INDEX_SQL:
+            cursor.execute(statement)
+    return True
+
+
+def search_patients(query: str, limit: int = MAX_RESULTS, using: str = 'default'):
+    """
+    Active patients whose name or email contains ``query``.
+
+    Terms of three or more characters go through the trigram index
+    (FTS5 on SQLite, pg_trgm on PostgreSQL). Shorter terms can't use
+    trigrams and keep the plain substring search over name and email.
+    """
+    term = ' '.join(query.lower().split())
+    limit = max(1, min(limit, MAX_RESULTS))
+    patients = Patient.objects.using(using).filter(user__is_active=True).select_related('user')
+
+    if len(term) < TRIGRAM_LENGTH:
+        patients = patients.filter(
+            Q(user__first_name__icontains=term) |
+            Q(user__last_name__icontains=term) |
+            Q(user__email__icontains=term)
+        )
+    elif connections[using].vendor == 'sqlite':
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        patients = patients.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (phrase,))
+        )
+    else:
+        patients = patients.filter(search_text__contains=term)
+
+    return patients[:limit]
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from healthcare.profiles import invalidate_role_profiles
+from .models import Patient
+from .search import ensure_search_index, search_text_for
+
+
+# Sent once, after commit, when patients' names or emails change; receivers
+# get the affected ``user_ids``
+patients_renamed = Signal()
+
+
+@receiver(pre_save, sender=Patient)
+def patient_search_text(sender, instance, **kwargs):
+    """Denormalise the user's name and email for patient search"""
+    instance.search_text = search_text_for(instance.user)
+
+
+@receiver(post_save, sender=User)
+def patient_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Keep search text in sync with name and email changes"""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    renamed = Patient.objects.filter(user=instance).exclude(
+        search_text=search_text_for(instance)
+    ).update(search_text=search_text_for(instance))
+    if renamed:
+        transaction.on_commit(partial(patients_renamed.send, sender=Patient, user_ids=[instance.id]))
+
+
+@receiver([post_save, post_delete], sender=Patient)
+def patient_profile_changed(sender, instance, **kwargs):
+    """Drop the cached role profile of the patient's user"""
+    transaction.on_commit(partial(invalidate_role_profiles, [instance.user_id]))
+
+
+def patient_search_index(sender, using='default', **kwargs):
+    """Put back the FTS triggers if a migration rebuilt patient_patient"""
+    ensure_search_index(using)
@@ -1,3 +1,371 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from doctor.models import Doctor
+from appointment.models import Appointment, AppointmentSlot
+from healthcare.hashers import hashing_stats, run_hashing
+from healthcare.testing import QueryCountAssertionsMixin
+from healthcare.tokens import StatelessJWTAuthentication, issue_tokens, last_login_batcher, revocation_filter
+from .models import Patient
+from .search import MAX_RESULTS, SQLITE_TRIGGERS, ensure_search_index, search_patients
+
+
+class PatientDashboardQueryTestCase(TestCase):
+    """Test the query budget of the patient dashboard"""
+
+    def setUp(self):
+        cache.clear()
+        doctor_user = User.objects.create_user(
+            username='dash_doctor', password='testpass123', first_name='John', last_name='Smith'
+        )
+        self.doctor = Doctor.objects.create(
+            user=doctor_user,
+            specialization='Cardiology',
+            license_number='DASH-DOC',
+            approval_status='approved',
+            approved_at=timezone.now()
+        )
+        self.user = User.objects.create_user(
+            username='dash_patient', password='testpass123', first_name='Jane', last_name='Doe'
+        )
+        self.patient = Patient.objects.create(user=self.user)
+
+        for offset, (slot_type, status) in enumerate([
+            ('morning_1', 'scheduled'), ('morning_2', 'completed'), ('afternoon_1', 'cancelled'),
+        ]):
+            slot = AppointmentSlot.objects.create(
+                doctor=self.doctor,
+                date=date.today() + timedelta(days=offset + 1),
+                slot_type=slot_type
+            )
+            Appointment.objects.create(
+                patient=self.patient,
+                doctor=self.doctor,
+                appointment_slot=slot,
+                appointment_date=timezone.now() + timedelta(days=offset + 1),
+                status=status
+            )
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_dashboard_query_count(self):
+        """Session, user, patient, upcoming list and one stats aggregate"""
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('patient:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_appointments'], 3)
+        self.assertEqual(response.context['completed_appointments'], 1)
+
+    def test_dashboard_stats_cached_and_invalidated(self):
+        """Cached counters are dropped when an appointment changes state"""
+        self.client.get(reverse('patient:dashboard'))
+
+        # Session, user and upcoming list; the profile and counters are cached
+        with self.assertNumQueries(3):
+            self.client.get(reverse('patient:dashboard'))
+
+        appointment = Appointment.objects.get(status='scheduled')
+        appointment.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+
+        response = self.client.get(reverse('patient:dashboard'))
+        self.assertEqual(response.context['completed_appointments'], 2)
+
+    @override_settings(DASHBOARD_STATS_TIMEOUT=0)
+    def test_dashboard_stats_uncached(self):
+        """Caching can be turned off"""
+        self.client.get(reverse('patient:dashboard'))
+
+        with self.assertNumQueries(4):
+            self.client.get(reverse('patient:dashboard'))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_sessions(self):
+        """With cached_db sessions a warm dashboard only queries the user and upcoming list"""
+        self.client.force_login(self.user)
+        self.client.get(reverse('patient:dashboard'))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('patient:dashboard'))
+        self.assertEqual(response.context['patient'], self.patient)
+
+    def test_profile_created_after_first_request(self):
+        """A cached 'no profile' answer is dropped once the profile exists"""
+        user = User.objects.create_user(username='late_patient', password='testpass123')
+        self.client.force_login(user)
+        response = self.client.get(reverse('patient:appointment_calendar'))
+        self.assertRedirects(response, reverse('patient:profile'), fetch_redirect_response=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            patient = Patient.objects.create(user=user)
+
+        response = self.client.get(reverse('patient:appointment_calendar'))
+        self.assertEqual(response.context['patient'], patient)
+
+
+class PatientAdminQueryTestCase(QueryCountAssertionsMixin, TestCase):
+    """The patient changelist must not issue per-row queries"""
+
+    def add_patients(self, count):
+        for _ in range(count):
+            user = User.objects.create_user(username=f'admin_patient_{Patient.objects.count()}', password='x')
+            Patient.objects.create(user=user)
+
+    def test_admin_changelist(self):
+        self.add_patients(2)
+        self.client.force_login(User.objects.create_superuser('patient_admin', 'admin@test.com', 'x'))
+        self.assertConstantQueries(reverse('admin:patient_patient_changelist'), lambda: self.add_patients(3))
+
+
+class PatientSearchTestCase(TestCase):
+    """Test the trigram-indexed patient search"""
+
+    def setUp(self):
+        self.ann = self.create_patient('ann', 'Ann', 'Whitmore', 'ann.w@example.com')
+        self.bob = self.create_patient('bob', 'Bob', 'Annandale', 'bob@clinic.org')
+        self.carl = self.create_patient('carl', 'Carl', 'Jones', 'carl@example.com')
+
+    def create_patient(self, username, first_name, last_name, email, **extra):
+        user = User.objects.create_user(
+            username=username, password='x', first_name=first_name, last_name=last_name, email=email, **extra
+        )
+        return Patient.objects.create(user=user)
+
+    def ids(self, query, **kwargs):
+        return sorted(patient.id for patient in search_patients(query, **kwargs))
+
+    def test_search_text_follows_user(self):
+        self.assertEqual(self.ann.search_text, 'ann whitmore ann.w@example.com')
+
+        self.ann.user.last_name = 'Smith'
+        self.ann.user.save()
+
+        self.assertEqual(Patient.objects.get(id=self.ann.id).search_text, 'ann smith ann.w@example.com')
+        self.assertEqual(self.ids('smith'), [self.ann.id])
+        self.assertEqual(self.ids('whitmore'), [])
+
+    def test_substring_match_on_name_and_email(self):
+        self.assertEqual(self.ids('ANN'), [self.ann.id, self.bob.id])
+        self.assertEqual(self.ids('clinic.org'), [self.bob.id])
+        self.assertEqual(self.ids('nes'), [self.carl.id])
+        self.assertEqual(self.ids('"; drop'), [])
+
+    def test_short_terms_match_anywhere(self):
+        self.assertEqual(self.ids('ca'), [self.carl.id])
+        self.assertEqual(self.ids('AN'), [self.ann.id, self.bob.id])
+        self.assertEqual(self.ids('or'), [self.ann.id, self.bob.id])
+
+    def test_dropped_triggers_are_recreated(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite FTS triggers')
+        self.assertFalse(ensure_search_index())
+        with connection.cursor() as cursor:
+            for trigger in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        dora = self.create_patient('dora', 'Dora', 'Quigley', 'dora@example.com')
+        self.assertEqual(self.ids('quigley'), [])
+
+        self.assertTrue(ensure_search_index())
+
+        self.assertEqual(self.ids('quigley'), [dora.id])
+        self.ann.user.last_name = 'Quigley'
+        self.ann.user.save()
+        self.assertEqual(self.ids('quigley'), [self.ann.id, dora.id])
+
+    def test_inactive_excluded_and_results_capped(self):
+        self.create_patient('dora', 'Dora', 'Annex', 'dora@example.com', is_active=False)
+        self.assertEqual(self.ids('anne'), [])
+
+        for i in range(MAX_RESULTS + 5):
+            self.create_patient(f'many{i}', 'Example', f'Person{i}', f'many{i}@example.com')
+        self.assertEqual(len(search_patients('example', limit=100)), MAX_RESULTS)
+
+    def test_doctor_api(self):
+        doctor_user = User.objects.create_user(username='search_doctor', password='x')
+        Doctor.objects.create(
+            user=doctor_user, specialization='Cardiology', license_number='LIC-search',
+            approval_status='approved', approved_at=timezone.now()
+        )
+        self.client.force_login(doctor_user)
+
+        response = self.client.get(reverse('doctor:patient_search_api'), {'q': 'annan'})
+
+        self.assertEqual([p['id'] for p in response.json()['patients']], [self.bob.id])
+
+
+@override_settings(PASSWORD_BCRYPT_ROUNDS=4)
+class PatientLoginHashingTestCase(TestCase):
+    """Logins hash once on the capped bcrypt hasher and pick up work factor changes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='hash_patient', password='testpass123')
+        Patient.objects.create(user=self.user)
+        hashing_stats.reset()
+
+    def login(self):
+        return self.client.post(reverse('patient:login'), {'username': 'hash_patient', 'password': 'testpass123'})
+
+    def test_login_hashes_once(self):
+        self.assertRedirects(self.login(), reverse('patient:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(hashing_stats.snapshot()['hashes'], 1)
+
+    def test_rehash_on_login(self):
+        self.assertTrue(self.user.password.startswith('bcrypt_sha256$$2b$04$'))
+
+        with self.settings(PASSWORD_BCRYPT_ROUNDS=5):
+            self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('bcrypt_sha256$$2b$05$'))
+        self.assertTrue(self.user.check_password('testpass123'))
+
+    def test_hashes_run_on_the_calling_thread(self):
+        threads = []
+        run_hashing(lambda: threads.append(threading.current_thread()))
+
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(hashing_stats.snapshot()['hashes'], 1)
+
+
+@override_settings(PASSWORD_BCRYPT_ROUNDS=4, JWT_LAST_LOGIN_FLUSH_SECONDS=3600)
+class PatientAPITokenTestCase(TestCase):
+    """API tokens carry role claims, verify without queries and can be revoked"""
+
+    def setUp(self):
+        cache.clear()
+        revocation_filter.reset()
+        last_login_batcher.flush()
+        self.user = User.objects.create_user(username='api_patient', password='testpass123')
+        self.patient = Patient.objects.create(user=self.user)
+
+    def api_login(self):
+        response = self.client.post(
+            reverse('patient:api_login'),
+            json.dumps({'username': 'api_patient', 'password': 'testpass123'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def authenticate(self, access_token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_login_returns_role_claims(self):
+        token = AccessToken(self.api_login()['access_token'])
+
+        self.assertEqual(token['role'], 'patient')
+        self.assertEqual(token['profile_id'], self.patient.id)
+        self.assertIsNone(token['approval_status'])
+
+    def test_authenticate_without_queries(self):
+        access_token = self.api_login()['access_token']
+        revocation_filter.sync(force=True)
+
+        with self.assertNumQueries(0):
+            user, token = self.authenticate(access_token)
+
+        self.assertEqual(user.id, self.user.id)
+        self.assertTrue(user.is_patient)
+        self.assertFalse(user.is_approved_doctor)
+
+    def test_refresh_keeps_role_claims(self):
+        tokens = self.api_login()
+
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh_token']})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.json()['access'])['role'], 'patient')
+
+    def test_revoked_tokens_rejected(self):
+        tokens = self.api_login()
+
+        response = self.client.post(
+            reverse('token_revoke'),
+            {'refresh': tokens['refresh_token']},
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access_token']}",
+        )
+
+        self.assertEqual(response.status_code, 205)
+        with self.assertRaises(InvalidToken):
+            self.authenticate(tokens['access_token'])
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh_token']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_revoke_with_session(self):
+        tokens = self.api_login()
+        self.client.login(username='api_patient', password='testpass123')
+
+        response = self.client.post(reverse('token_revoke'), {'refresh': tokens['refresh_token']})
+
+        self.assertEqual(response.status_code, 205)
+        response = self.client.post(reverse('token_refresh'), {'refresh': tokens['refresh_token']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_cannot_revoke_another_users_token(self):
+        other = User.objects.create_user(username='api_other', password='testpass123')
+        Patient.objects.create(user=other)
+        other_refresh = issue_tokens(other)
+        access_token = self.api_login()['access_token']
+
+        response = self.client.post(
+            reverse('token_revoke'),
+            {'refresh': str(other_refresh)},
+            HTTP_AUTHORIZATION=f'Bearer {access_token}',
+        )
+
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(other_refresh)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_revocations_sync_across_processes(self):
+        access_token = self.api_login()['access_token']
+        self.client.post(reverse('token_revoke'), HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        # A process that has not seen the revocation picks it up on its next sync
+        revocation_filter.reset()
+
+        with self.assertRaises(InvalidToken):
+            self.authenticate(access_token)
+
+    def test_late_committed_revocation_synced(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+        expires_at = timezone.now() + timedelta(hours=1)
+        early, late = (
+            OutstandingToken.objects.create(user=self.user, jti=jti, token=jti, expires_at=expires_at)
+            for jti in ('early-jti', 'late-jti')
+        )
+        BlacklistedToken.objects.create(id=100, token=late)
+        revocation_filter.sync(force=True)
+        # A transaction that took id 50 commits only after the sync above
+        BlacklistedToken.objects.create(id=50, token=early)
+
+        revocation_filter.sync(force=True)
+
+        self.assertTrue(revocation_filter.is_revoked('early-jti'))
+        self.assertTrue(revocation_filter.is_revoked('late-jti'))
+
+    def test_last_login_batched(self):
+        self.api_login()
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        self.assertEqual(last_login_batcher.pending(), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(last_login_batcher.flush(), 1)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
@@ -4,6 +4,8 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Patient
 from .forms import PatientProfileForm
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_patient
 
 def patient_home(request):
     return HttpResponse("""
@@ -18,12 +20,14 @@ def patient_home(request):
     """)
 
 @login_required
+@read_from_replica
 def patient_dashboard(request):
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
         
         # Import here to avoid circular imports
         from appointment.models import Appointment
+        from appointment.services import get_patient_dashboard_stats
         from datetime import date, timedelta
         
         # Get upcoming appointments (next 7 days)
@@ -36,15 +40,14 @@ def patient_dashboard(request):
             status__in=['scheduled', 'confirmed']
         ).select_related('appointment_slot', 'doctor', 'doctor__user').order_by('appointment_slot__date', 'appointment_slot__slot_type')[:3]
         
-        # Get appointment statistics
-        total_appointments = Appointment.objects.filter(patient=patient).count()
-        completed_appointments = Appointment.objects.filter(patient=patient, status='completed').count()
+        # Get appointment statistics in a single aggregate query
+        stats = get_patient_dashboard_stats(patient)
         
         context = {
             'patient': patient,
             'upcoming_appointments': upcoming_appointments,
-            'total_appointments': total_appointments,
-            'completed_appointments': completed_appointments,
+            'total_appointments': stats['total_appointments'],
+            'completed_appointments': stats['completed_appointments'],
         }
         
         return render(request, 'patient/dashboard.html', context)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Run the test suite against SQLite and PostgreSQL
+
+    python run_test_matrix.py [test labels...]
+
+PostgreSQL uses the DB_* settings from the environment when DB_HOST is set;
+otherwise a throwaway cluster is started with initdb/pg_ctl from PATH and
+removed afterwards.
+"""
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+
+DEFAULT_LABELS = ['healthcare', 'doctor', 'patient', 'appointment', 'selftest.tests', 'api']
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port():
+    """Ask the OS for an unused TCP port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_postgres():
+    """Start a temporary PostgreSQL cluster and yield its DB_* environment"""
+    if os.environ.get('DB_HOST'):
+        yield {}
+        return
+
+    for binary in ('initdb', 'pg_ctl'):
+        if shutil.which(binary) is None:
+            raise RuntimeError(f'{binary} not found; install PostgreSQL or set DB_HOST')
+
+    data_dir = tempfile.mkdtemp(prefix='healthcare-pg-')
+    port = free_port()
+    try:
+        subprocess.run(
+            ['initdb', '-D', data_dir, '-U', 'healthcare', '--auth=trust', '--no-sync'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        subprocess.run(
+            ['pg_ctl', '-D', data_dir, '-w', '-l', os.path.join(data_dir, 'server.log'),
+             '-o', f'-p {port} -k {data_dir} -c fsync=off', 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        try:
+            yield {
+                'DB_NAME': 'healthcare',
+                'DB_USER': 'healthcare',
+                'DB_PASSWORD': '',
+                'DB_HOST': '127.0.0.1',
+                'DB_PORT': str(port),
+            }
+        finally:
+            subprocess.run(['pg_ctl', '-D', data_dir, '-m', 'fast', 'stop'], stdout=subprocess.DEVNULL)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def run_suite(engine, labels, extra_env=None):
+    """Run manage.py test with DB_ENGINE set, returning the exit code"""
+    env = dict(os.environ, DB_ENGINE=engine, **(extra_env or {}))
+    print('=' * 80)
+    print(f'{engine}: manage.py test {" ".join(labels)}')
+    print('=' * 80)
+    return subprocess.call([sys.executable, 'manage.py', 'test', *labels], cwd=BASE_DIR, env=env)
+
+
+def main():
+    labels = sys.argv[1:] or DEFAULT_LABELS
+    results = {'sqlite3': run_suite('sqlite3', labels)}
+
+    try:
+        with local_postgres() as env:
+            results['postgresql'] = run_suite('postgresql', labels, env)
+    except (RuntimeError, subprocess.CalledProcessError) as exc:
+        print(f'postgresql: could not start server: {exc}')
+        results['postgresql'] = 1
+
+    print()
+    for engine, code in results.items():
+        print(f'{engine:12} {"OK" if code == 0 else "FAILED"}')
+    return 0 if all(code == 0 for code in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,6 +22,7 @@ class SelfTestAdmin(admin.ModelAdmin):
     list_filter = ['risk_level', 'created_at']
     search_fields = ['patient__user__first_name', 'patient__user__last_name', 'ai_recommendation']
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['patient__user']
     inlines = [SymptomReportInline]
 
 
@@ -30,3 +31,4 @@ class SymptomReportAdmin(admin.ModelAdmin):
     list_display = ['self_test', 'symptom', 'severity', 'duration_days']
     list_filter = ['severity', 'symptom', 'duration_days']
     search_fields = ['symptom__name', 'self_test__patient__user__first_name']
+    list_select_related = ['self_test__patient__user', 'symptom']
@@ -1,8 +1,15 @@
 import json
 import os
+import threading
 from typing import List, Dict, Tuple
 from django.conf import settings
-from .ml_models import HealthMLEngine
+from healthcare.caching import cache_aside
+from .batching import PredictionBatcher
+from .extraction import SYMPTOMS_FILE, get_symptom_extractor
+from .ml_models import get_ml_engine
+
+
+SYMPTOM_SEARCH_TIMEOUT = 60 * 60
 
 
 class HealthAIEngine:
@@ -11,7 +18,8 @@ class HealthAIEngine:
     def __init__(self):
         self.symptoms_data = self._load_symptoms()
         self.diseases_data = self._load_diseases()
-        self.ml_engine = HealthMLEngine()
+        self.ml_engine = get_ml_engine()
+        self.batcher = PredictionBatcher(lambda X: self.ml_engine.predict_proba_batch(X)[1])
         
         # Train models if not already trained
         if not self.ml_engine.is_trained:
@@ -19,9 +27,8 @@ class HealthAIEngine:
     
     def _load_symptoms(self) -> Dict:
         """Load symptoms data from JSON file"""
-        file_path = os.path.join(settings.BASE_DIR, 'selftest', 'data', 'symptoms.json')
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(SYMPTOMS_FILE, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except FileNotFoundError:
             return {"symptoms": []}
@@ -94,6 +101,35 @@ class HealthAIEngine:
         # Fallback to rule-based prediction
         return self._rule_based_prediction(symptom_reports)
     
+    def predict_from_text(self, text: str, limit: int = 3) -> Dict:
+        """
+        Extract symptoms from free text and rank diseases with the ML ensemble
+        
+        Concurrent callers are batched into one predict_proba call per model.
+        """
+        extractor = get_symptom_extractor()
+        symptom_reports = extractor.extract(text)
+        if not symptom_reports or not self.ml_engine.is_trained:
+            return {'symptoms': symptom_reports, 'predicted_diseases': []}
+        
+        probabilities = self.batcher.predict(extractor.feature_vector(symptom_reports))
+        diseases = self.ml_engine.disease_encoder.classes_
+        
+        predicted = []
+        for i in probabilities.argsort()[::-1]:
+            if diseases[i] == 'Other' or probabilities[i] <= 0:
+                continue
+            disease_info = self.ml_engine._get_disease_info(diseases[i])
+            predicted.append({
+                'name': str(diseases[i]),
+                'probability': round(float(probabilities[i]) * 100, 1),
+                'specialist': disease_info.get('specialist', 'General Practitioner')
+            })
+            if len(predicted) == limit:
+                break
+        
+        return {'symptoms': symptom_reports, 'predicted_diseases': predicted}
+    
     def _rule_based_prediction(self, symptom_reports: List[Dict]) -> Dict:
         """Rule-based prediction as fallback when ML models fail"""
         # Extract symptom names and severities
@@ -259,4 +295,31 @@ class HealthAIEngine:
     
     def force_retrain_models(self) -> Dict[str, float]:
         """Force retrain all ML models"""
-        return self.ml_engine.train_models()
\ No newline at end of file
+        return self.ml_engine.train_models()
+
+
+_ai_engine = None
+_ai_engine_lock = threading.Lock()
+
+
+def get_ai_engine() -> HealthAIEngine:
+    """Return the process-wide engine instead of reloading data and models per request"""
+    global _ai_engine
+    if _ai_engine is None:
+        with _ai_engine_lock:
+            if _ai_engine is None:
+                _ai_engine = HealthAIEngine()
+    return _ai_engine
+
+
+def _symptoms_version(*args, **kwargs):
+    try:
+        return os.stat(SYMPTOMS_FILE).st_mtime_ns
+    except OSError:
+        return 0
+
+
+@cache_aside('symptom_search', timeout=SYMPTOM_SEARCH_TIMEOUT, version=_symptoms_version)
+def search_symptoms(query: str, limit: int = 10) -> List[Dict]:
+    """Cached HealthAIEngine.search_symptoms, keyed by the symptom file's mtime"""
+    return get_ai_engine().search_symptoms(query, limit=limit)
@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Sequence
+
+import numpy as np
+
+
+class PredictionBatcher:
+    """
+    Coalesce concurrent single-row predictions into one model call.
+
+    ``predict`` enqueues a feature vector and blocks on a future. A worker
+    thread takes the first pending row, waits up to ``max_wait`` seconds
+    for more (at most ``max_batch``), stacks them and calls
+    ``predict_rows`` once for the batch.
+    """
+
+    def __init__(self, predict_rows: Callable[[np.ndarray], Sequence], max_batch: int = 32,
+                 max_wait: float = 0.005):
+        self.predict_rows = predict_rows
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, features: np.ndarray) -> Future:
+        future = Future()
+        self._pending.put((features, future))
+        self._ensure_worker()
+        return future
+
+    def predict(self, features: np.ndarray, timeout: float = 5.0):
+        return self.submit(features).result(timeout=timeout)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name='prediction-batcher', daemon=True
+                    )
+                    self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch) -> None:
+        futures = [future for _, future in batch]
+        try:
+            results = self.predict_rows(np.vstack([features for features, _ in batch]))
+        except Exception as exc:
+            for future in futures:
+                future.set_exception(exc)
+            return
+        for future, result in zip(futures, results):
+            future.set_result(result)
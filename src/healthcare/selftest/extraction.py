@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+from typing import Dict, List
+
+import numpy as np
+from django.conf import settings
+
+from appointment.matcher import PhraseMatcher
+
+
+SYMPTOMS_FILE = os.path.join(settings.BASE_DIR, 'selftest', 'data', 'symptoms.json')
+
+DEFAULT_SEVERITY = 2
+
+# Words that set the severity of every symptom in a message (SymptomReport scale)
+SEVERITY_WORDS = {
+    'mild': 1,
+    'slight': 1,
+    'moderate': 2,
+    'bad': 3,
+    'severe': 3,
+    'very bad': 4,
+    'very severe': 4,
+    'terrible': 4,
+    'unbearable': 4,
+    'extreme': 4,
+}
+
+
+class SymptomExtractor:
+    """
+    Map free text onto the ``symptoms.json`` vocabulary.
+
+    Symptom names, their keywords and severity words are compiled into one
+    phrase matcher, so a message is turned into symptom reports, and from
+    there into the feature vector the ML models were trained on, in a single
+    pass. The feature order is the order of ``symptoms.json``.
+    """
+
+    def __init__(self, symptoms: List[Dict]):
+        self.symptom_names = [symptom['name'] for symptom in symptoms]
+        self.feature_index = {name.lower(): i for i, name in enumerate(self.symptom_names)}
+
+        self.phrase_symptoms = {}
+        for i, symptom in enumerate(symptoms):
+            for phrase in [symptom['name'], *symptom.get('keywords', [])]:
+                indices = self.phrase_symptoms.setdefault(phrase.lower(), [])
+                if i not in indices:
+                    indices.append(i)
+
+        self.matcher = PhraseMatcher(list(self.phrase_symptoms) + list(SEVERITY_WORDS))
+
+    def extract(self, text: str) -> List[Dict]:
+        """Return symptom reports for every symptom mentioned in ``text``"""
+        severity = None
+        found = []
+        for match in self.matcher.find_all(text):
+            if match.phrase in SEVERITY_WORDS:
+                severity = max(severity or 0, SEVERITY_WORDS[match.phrase])
+            for i in self.phrase_symptoms.get(match.phrase, ()):
+                if i not in found:
+                    found.append(i)
+
+        return [
+            {
+                'symptom_name': self.symptom_names[i],
+                'severity': severity or DEFAULT_SEVERITY,
+                'duration_days': 1,
+            }
+            for i in found
+        ]
+
+    def feature_vector(self, symptom_reports: List[Dict]) -> np.ndarray:
+        """Severity per symptom, in the feature order used for training"""
+        features = np.zeros(len(self.symptom_names))
+        for report in symptom_reports:
+            i = self.feature_index.get(report['symptom_name'].lower())
+            if i is not None:
+                features[i] = report['severity']
+        return features
+
+    def vectorize(self, text: str) -> np.ndarray:
+        return self.feature_vector(self.extract(text))
+
+
+_extractor = None
+_extractor_lock = threading.Lock()
+
+
+def get_symptom_extractor() -> SymptomExtractor:
+    """Return the process-wide extractor built from ``symptoms.json``"""
+    global _extractor
+    if _extractor is None:
+        with _extractor_lock:
+            if _extractor is None:
+                try:
+                    with open(SYMPTOMS_FILE, 'r', encoding='utf-8') as f:
+                        symptoms = json.load(f).get('symptoms', [])
+                except FileNotFoundError:
+                    symptoms = []
+                _extractor = SymptomExtractor(symptoms)
+    return _extractor
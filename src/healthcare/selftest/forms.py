@@ -1,7 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import SelfTest, SymptomReport, Symptom
-from .ai_engine import HealthAIEngine
+from .ai_engine import get_ai_engine
 
 
 
@@ -14,7 +14,7 @@ class QuickTestForm(forms.Form):
         super().__init__(*args, **kwargs)
         
         # Initialize AI engine to get symptoms
-        ai_engine = HealthAIEngine()
+        ai_engine = get_ai_engine()
         symptoms = ai_engine.symptoms_data.get('symptoms', [])
         
         # Create dynamic fields for symptoms
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-19 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('selftest', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='selftest',
+            index=models.Index(fields=['patient', 'created_at', 'id'], name='selftest_patient_created_idx'),
+        ),
+    ]
@@ -13,6 +13,8 @@ from sklearn.neural_network import MLPClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
 import logging
+import threading
+from .extraction import get_symptom_extractor
 
 logger = logging.getLogger(__name__)
 
@@ -297,21 +299,13 @@ class HealthMLEngine:
     def _prepare_input_features(self, symptom_reports: List[Dict]) -> Optional[np.ndarray]:
         """Prepare input features for ML models"""
         try:
-            symptoms_list = [s['name'].lower() for s in self.symptoms_data.get('symptoms', [])]
+            extractor = get_symptom_extractor()
             
-            if not symptoms_list:
+            if not extractor.symptom_names:
                 return None
             
             # Create feature vector
-            features = np.zeros(len(symptoms_list))
-            
-            for report in symptom_reports:
-                symptom_name = report['symptom_name'].lower()
-                severity = report['severity']
-                
-                if symptom_name in symptoms_list:
-                    idx = symptoms_list.index(symptom_name)
-                    features[idx] = severity
+            features = extractor.feature_vector(symptom_reports)
             
             # Scale features
             features_scaled = self.scaler.transform(features.reshape(1, -1))[0]
@@ -322,6 +316,40 @@ class HealthMLEngine:
             logger.error(f"Error preparing input features: {str(e)}")
             return None
     
+    def predict_proba_batch(self, features: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        """
+        Ensemble disease probabilities for a batch of raw feature vectors
+        
+        Each model is called once for the whole batch and the probabilities
+        are averaged, weighted by the model's test accuracy.
+        
+        Returns:
+            (disease names, array of shape (len(features), len(disease names)))
+        """
+        diseases = list(self.disease_encoder.classes_)
+        if not self.is_trained or not len(features):
+            return diseases, np.zeros((len(features), len(diseases)))
+        
+        X_scaled = self.scaler.transform(features)
+        combined = np.zeros((len(features), len(diseases)))
+        total_weight = 0.0
+        
+        for name, model in self.trained_models.items():
+            try:
+                proba = model.predict_proba(X_scaled)
+            except Exception as e:
+                logger.error(f"Error predicting with {name}: {str(e)}")
+                continue
+            
+            weight = self.model_accuracies.get(name, {}).get('test_accuracy', 0.5)
+            combined[:, model.classes_] += weight * proba
+            total_weight += weight
+        
+        if total_weight:
+            combined /= total_weight
+        
+        return diseases, combined
+    
     def _ensemble_predict(self, predictions: Dict, confidences: Dict) -> Tuple[str, float, str]:
         """Ensemble prediction using weighted voting"""
         disease_votes = {}
@@ -519,4 +547,18 @@ class HealthMLEngine:
                 'status': 'trained' if name in self.trained_models else 'failed'
             }
         
-        return comparison 
\ No newline at end of file
+        return comparison 
+
+
+_ml_engine = None
+_ml_engine_lock = threading.Lock()
+
+
+def get_ml_engine() -> HealthMLEngine:
+    """Return the process-wide engine so trained models are loaded only once"""
+    global _ml_engine
+    if _ml_engine is None:
+        with _ml_engine_lock:
+            if _ml_engine is None:
+                _ml_engine = HealthMLEngine()
+    return _ml_engine
@@ -45,6 +45,10 @@ class SelfTest(models.Model):
         ordering = ['-created_at']
         verbose_name = "Self Test"
         verbose_name_plural = "Self Tests"
+        indexes = [
+            # Keyset pagination of a patient's history
+            models.Index(fields=['patient', 'created_at', 'id'], name='selftest_patient_created_idx'),
+        ]
 
 
 class SymptomReport(models.Model):
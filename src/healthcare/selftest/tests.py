@@ -1,10 +1,17 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
 from patient.models import Patient
 from .models import SelfTest, Symptom, SymptomReport
-from .ai_engine import HealthAIEngine
+from .ai_engine import HealthAIEngine, get_ai_engine
+from .batching import PredictionBatcher
+from .extraction import get_symptom_extractor
+from .ml_models import get_ml_engine
+from healthcare.testing import QueryCountAssertionsMixin, create_patient
 import json
+import numpy as np
+from unittest import mock
 
 
 class SelfTestModelTests(TestCase):
@@ -450,6 +457,127 @@ class SelfTestFormTests(TestCase):
         self.assertIn('Very Severe', choice_labels[3])
 
 
+
+class SelfTestListingQueryTests(QueryCountAssertionsMixin, TestCase):
+    """Test history and admin changelists must not issue per-row queries"""
+    
+    def setUp(self):
+        cache.clear()
+        self.patient = create_patient('historypatient')
+        self.user = self.patient.user
+        self.symptoms = [
+            Symptom.objects.create(name='Fever', category='General'),
+            Symptom.objects.create(name='Cough', category='Respiratory'),
+        ]
+        self.add_tests(2)
+    
+    def add_tests(self, count):
+        for _ in range(count):
+            self_test = SelfTest.objects.create(patient=self.patient, risk_level='low')
+            for symptom in self.symptoms:
+                SymptomReport.objects.create(
+                    self_test=self_test, symptom=symptom, severity=2, duration_days=1
+                )
+    
+    def test_history_query_count(self):
+        """History renders symptom counts without a query per test"""
+        self.client.force_login(self.user)
+        # Warm the cached role profile so both renders run the same queries
+        self.client.get(reverse('selftest:test_history'))
+        self.assertConstantQueries(reverse('selftest:test_history'), lambda: self.add_tests(3))
+        
+        response = self.client.get(reverse('selftest:test_history'))
+        self.assertContains(response, '2 symptoms')
+    
+    @mock.patch('selftest.views.HISTORY_PAGE_SIZE', 2)
+    @mock.patch('selftest.views.HISTORY_COUNT_LIMIT', 4)
+    def test_history_pages(self):
+        """History follows keyset cursors, newest first, with a capped total"""
+        self.add_tests(3)
+        self.client.force_login(self.user)
+        url = reverse('selftest:test_history')
+        
+        seen = []
+        response = self.client.get(url)
+        self.assertContains(response, '4+ tests')
+        while True:
+            seen.extend(test.id for test in response.context['tests'])
+            if not response.context['next_query']:
+                break
+            response = self.client.get(f"{url}?{response.context['next_query']}")
+        
+        expected = list(SelfTest.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+    
+    def test_history_invalid_cursor(self):
+        self.client.force_login(self.user)
+        
+        response = self.client.get(reverse('selftest:test_history'), {'cursor': 'garbage'})
+        
+        self.assertEqual(len(response.context['tests']), 2)
+    
+    def test_admin_changelists(self):
+        self.client.force_login(User.objects.create_superuser('selftest_admin', 'admin@test.com', 'x'))
+        for url in [
+            reverse('admin:selftest_selftest_changelist'),
+            reverse('admin:selftest_symptomreport_changelist'),
+        ]:
+            self.assertConstantQueries(url, lambda: self.add_tests(2))
+
+
+class SymptomExtractionTests(TestCase):
+    """Test the shared text-to-symptom extractor and batched ML predictions"""
+    
+    def setUp(self):
+        self.extractor = get_symptom_extractor()
+    
+    def test_extract_names_and_keywords(self):
+        reports = self.extractor.extract('Severe headache, feeling queasy and a runny nose')
+        
+        self.assertEqual(
+            [report['symptom_name'] for report in reports],
+            ['Headache', 'Nausea', 'Runny Nose']
+        )
+        self.assertTrue(all(report['severity'] == 3 for report in reports))
+    
+    def test_feature_vector_matches_training_order(self):
+        vector = self.extractor.vectorize('fever and a cough')
+        ml_engine = get_ml_engine()
+        symptoms_list = [s['name'].lower() for s in ml_engine.symptoms_data['symptoms']]
+        
+        self.assertEqual(len(vector), len(symptoms_list))
+        self.assertEqual(vector[symptoms_list.index('fever')], 2)
+        self.assertEqual(vector[symptoms_list.index('cough')], 2)
+        self.assertEqual(vector.sum(), 4)
+    
+    def test_engines_are_shared(self):
+        self.assertIs(get_ai_engine(), get_ai_engine())
+        self.assertIs(HealthAIEngine().ml_engine, get_ml_engine())
+    
+    def test_batcher_coalesces_pending_rows(self):
+        batch_sizes = []
+        
+        def predict_rows(X):
+            batch_sizes.append(len(X))
+            return X.sum(axis=1)
+        
+        batcher = PredictionBatcher(predict_rows, max_wait=0.2)
+        futures = [batcher.submit(np.full(3, i)) for i in range(5)]
+        
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 3, 6, 9, 12])
+        self.assertEqual(batch_sizes, [5])
+    
+    def test_predict_from_text(self):
+        result = get_ai_engine().predict_from_text('fever and a cough')
+        
+        self.assertEqual([s['symptom_name'] for s in result['symptoms']], ['Fever', 'Cough'])
+        for disease in result['predicted_diseases']:
+            self.assertNotEqual(disease['name'], 'Other')
+            self.assertIn('specialist', disease)
+        
+        self.assertEqual(get_ai_engine().predict_from_text('hello'), {'symptoms': [], 'predicted_diseases': []})
+
+
 def run_all_tests():
     """Run all tests and print results"""
     import unittest
@@ -4,13 +4,21 @@ from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
-from django.core.paginator import Paginator
+from django.db.models import Count
+from healthcare.async_views import async_login_required, run_cpu_bound
+from healthcare.keyset import InvalidCursor, capped_count, keyset_page, page_querystrings
+from healthcare.routers import read_from_replica
+from healthcare.profiles import get_patient
 from patient.models import Patient
 from .models import SelfTest, Symptom, SymptomReport
 from .forms import QuickTestForm
-from .ai_engine import HealthAIEngine
+from .ai_engine import get_ai_engine, search_symptoms
 import json
 
+HISTORY_PAGE_SIZE = 10
+HISTORY_ORDERING = ('-created_at', '-id')
+HISTORY_COUNT_LIMIT = 1000
+
 
 def selftest_home(request):
     """Self-test system homepage"""
@@ -21,10 +29,11 @@ def selftest_home(request):
 
 
 @login_required
+@read_from_replica
 def selftest_dashboard(request):
     """Patient self-test dashboard with history and analytics"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Patient profile not found. Please contact support.")
         return redirect('selftest:home')
@@ -84,12 +93,12 @@ def quick_test(request):
             })
         
         # Analyze with AI
-        ai_engine = HealthAIEngine()
+        ai_engine = get_ai_engine()
         analysis_result = ai_engine.analyze_symptoms(symptom_reports)
         
         # Save to database
         try:
-            patient = Patient.objects.get(user=request.user)
+            patient = get_patient(request)
             self_test = SelfTest.objects.create(
                 patient=patient,
                 risk_level=analysis_result['risk_level'],
@@ -134,7 +143,7 @@ def quick_test(request):
             })
     
     # GET request - show quick test form
-    ai_engine = HealthAIEngine()
+    ai_engine = get_ai_engine()
     initial_symptoms = ai_engine.search_symptoms("", limit=10)
     
     context = {
@@ -145,13 +154,12 @@ def quick_test(request):
     return render(request, 'selftest/quick_test.html', context)
 
 
-@login_required
-def quick_symptom_search_api(request):
+@async_login_required
+async def quick_symptom_search_api(request):
     """API endpoint for quick test symptom search"""
-    query = request.GET.get('q', '')
-    ai_engine = HealthAIEngine()
+    query = request.GET.get('q', '').strip().lower()
     
-    symptoms = ai_engine.search_symptoms(query, limit=10)
+    symptoms = await run_cpu_bound(search_symptoms, query, limit=10)
     
     return JsonResponse({
         'success': True,
@@ -164,7 +172,7 @@ def quick_symptom_search_api(request):
 def analysis_results(request, test_id):
     """Display AI analysis results for a specific test"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
         self_test = get_object_or_404(SelfTest, id=test_id, patient=patient)
     except Patient.DoesNotExist:
         messages.error(request, "Patient profile not found.")
@@ -186,15 +194,15 @@ def analysis_results(request, test_id):
 
 
 @login_required
+@read_from_replica
 def test_history(request):
     """View test history with filtering and pagination"""
     try:
-        patient = Patient.objects.get(user=request.user)
+        patient = get_patient(request)
     except Patient.DoesNotExist:
         messages.error(request, "Patient profile not found.")
         return redirect('selftest:home')
     
-    # Get all tests for this patient
     tests = SelfTest.objects.filter(patient=patient)
     
     # Filter by risk level if specified
@@ -202,14 +210,26 @@ def test_history(request):
     if risk_filter and risk_filter in ['low', 'medium', 'high', 'urgent']:
         tests = tests.filter(risk_level=risk_filter)
     
-    # Pagination
-    paginator = Paginator(tests, 10)  # 10 tests per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: every page is an index seek on (patient, created_at, id),
+    # and the total stops counting at HISTORY_COUNT_LIMIT
+    total, total_exact = capped_count(tests, HISTORY_COUNT_LIMIT)
+    tests = tests.annotate(
+        symptom_count=Count('symptom_reports')
+    ).defer('ai_recommendation', 'additional_notes')
+    try:
+        page = keyset_page(tests, HISTORY_ORDERING, request.GET.get('cursor'), HISTORY_PAGE_SIZE)
+    except InvalidCursor:
+        page = keyset_page(tests, HISTORY_ORDERING, None, HISTORY_PAGE_SIZE)
+    first_query, next_query = page_querystrings(request.GET, page)
     
     context = {
         'title': 'Test History',
-        'page_obj': page_obj,
+        'tests': page.items,
+        'is_first_page': not request.GET.get('cursor'),
+        'first_query': first_query,
+        'next_query': next_query,
+        'total': total,
+        'total_exact': total_exact,
         'risk_filter': risk_filter,
     }
     